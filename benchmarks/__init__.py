@@ -0,0 +1 @@
+"""Offline benchmarks for the hotel agent (no network required)."""
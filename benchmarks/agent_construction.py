@@ -0,0 +1,63 @@
+"""Benchmark: per-message agent construction overhead.
+
+Compares the old per-message path (a new HotelAgent, and therefore a freshly
+compiled LangGraph, for every Telegram message) with the shared agent, where
+each message only builds a lightweight TurnContext.
+
+Usage:
+    python -m benchmarks.agent_construction [--messages 500]
+"""
+
+import argparse
+import statistics
+import time
+from unittest.mock import MagicMock
+
+from src.agent.core import HotelAgent, TurnContext
+from src.database.seed import HOTEL_ID
+from src.services.conversation_service import ConversationService
+from src.services.pms_service import PMSService
+
+
+def _measure(label: str, fn, messages: int) -> list[float]:
+    samples = []
+    for _ in range(messages):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:<28} mean={statistics.mean(samples):8.3f}ms "
+        f"p95={sorted(samples)[int(len(samples) * 0.95) - 1]:8.3f}ms "
+        f"total={sum(samples):9.1f}ms"
+    )
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+
+    client = MagicMock()
+    session = MagicMock()
+
+    def per_message_agent() -> None:
+        # Old behaviour: the graph is rebuilt and compiled for every message
+        HotelAgent(client=client)
+        TurnContext(PMSService(session), ConversationService(session), HOTEL_ID)
+
+    shared = HotelAgent(client=client)
+
+    def shared_agent() -> None:
+        # New behaviour: only the per-turn dependencies are created
+        assert shared.graph is not None
+        TurnContext(PMSService(session), ConversationService(session), HOTEL_ID)
+
+    print(f"Per-message construction overhead ({args.messages} messages)")
+    before = _measure("before (compile per message)", per_message_agent, args.messages)
+    after = _measure("after (shared graph)", shared_agent, args.messages)
+    print(f"speedup: {statistics.mean(before) / statistics.mean(after):.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Offline end-to-end load test: simulated Telegram guests against a stub LLM.
+
+Drives ``handle_message`` with synthetic updates for N concurrent guests.
+Each guest sends a message, waits for the reply and thinks before the next
+one. Turns go through the real debouncer, mailbox, agent graph, SQLite
+database (a temporary file) and Anthropic SDK. The SDK is pointed at
+``StubLLMServer`` with configurable latency, error rate and tool-use
+scripts. No network or Telegram token is needed.
+
+Reports turn latency (last message sent -> final reply visible) as
+p50/p95/p99, time to the first visible reply, turns per second, DB commits
+per turn and event-loop lag.
+
+Usage:
+    python -m benchmarks.load_test [--guests 50] [--turns 5] [--latency 0.5]
+        [--error-rate 0.0] [--script mixed] [--think 0.5] [--no-streaming]
+        [--llm-concurrency 8]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.stub_llm_server import (
+    StubLLMServer,
+    text_reply,
+    tool_rounds,
+    tool_use_reply,
+)
+from src import bot
+from src.agent import core, llm_client
+from src.agent.admission import llm_admission
+from src.agent.history import history_summarizer
+from src.agent.resilience import llm_stats
+from src.config import settings
+from src.database.database import Base
+from src.database.seed import get_bookings_data, seed_database
+from src.services.analytics_service import AnalyticsService
+
+# Messages spread over the intents (some classified locally, some by the LLM)
+GUEST_MESSAGES = [
+    "Hola!",
+    "A que hora es el check-in?",
+    "Tienen WiFi? Cual es la clave?",
+    "Necesito toallas extra en la habitacion",
+    "Como llego desde el aeropuerto?",
+    "Quiero reservar una habitacion para el fin de semana",
+    "Aceptan mascotas?",
+    "Me podrian recomendar algo para hacer esta noche?",
+]
+
+# Tools the stub asks for, round by round, before answering with text
+TOOL_SCRIPTS: dict[str, list[tuple[str, dict]]] = {
+    "none": [],
+    "faq": [("search_faq", {"query": "wifi"})],
+    "amenities": [("get_hotel_amenities", {}), ("get_hotel_policies", {})],
+    "availability": [
+        ("get_room_types", {}),
+        (
+            "check_availability",
+            {"checkin": "2026-12-10", "checkout": "2026-12-12", "num_guests": 2},
+        ),
+    ],
+}
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, round(pct / 100 * len(ordered)) - 1)]
+
+
+def make_responder(script: str, seed: int):
+    """Stub responder: classify, then run a tool script and answer."""
+    rng = random.Random(seed)
+    scripts = [name for name in TOOL_SCRIPTS if name != "none"]
+
+    def respond(request: dict) -> dict:
+        if "tools" not in request:
+            # Intent classification or history summary
+            if request.get("max_tokens", 0) <= 50:
+                return text_reply("faq_general")
+            return text_reply("El huesped consulto por servicios del hotel.")
+
+        done = tool_rounds(request)
+        name = rng.choice(scripts) if script == "mixed" else script
+        steps = TOOL_SCRIPTS[name]
+        if done < len(steps):
+            return tool_use_reply(*steps[done])
+        return text_reply(
+            "Listo! Te paso la informacion que pediste. "
+            "Si necesitas algo mas, escribime cuando quieras."
+        )
+
+    return respond
+
+
+class FakeMessage:
+    """Duck-typed ``telegram.Message``: records when replies become visible."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.sent_at = time.perf_counter()
+        self.first_reply_at: float | None = None
+        self.last_reply_at: float | None = None
+        self.done = asyncio.Event()
+
+    def _seen(self) -> None:
+        now = time.perf_counter()
+        self.first_reply_at = self.first_reply_at or now
+        self.last_reply_at = now
+
+    async def reply_text(self, text: str) -> "FakeMessage":
+        self._seen()
+        return self
+
+    async def edit_text(self, text: str) -> "FakeMessage":
+        self._seen()
+        return self
+
+
+def _update(guest_id: int | str, message: FakeMessage) -> SimpleNamespace:
+    """Duck-typed ``telegram.Update`` with what ``handle_message`` reads."""
+    return SimpleNamespace(
+        message=message, effective_user=SimpleNamespace(id=guest_id)
+    )
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic sleep wakes up (event-loop lag)."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.samples.append(max(0.0, lag) * 1000)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def _guest(
+    guest_id: int | str, args: argparse.Namespace, rng: random.Random, done: list
+) -> None:
+    for _ in range(args.turns):
+        message = FakeMessage(rng.choice(GUEST_MESSAGES))
+        await bot.handle_message(_update(guest_id, message), None)
+        await message.done.wait()
+        done.append(message)
+        await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+
+async def _run(args: argparse.Namespace, directory: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / 'load.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await seed_database(session)
+
+    commits = 0
+
+    def count_commit(conn) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+    bot.async_session = factory
+    bot.message_debouncer.window = args.debounce
+    bot.message_debouncer.max_wait = max(args.debounce, 0.01)
+
+    # Signal each message once its turn has been answered and written
+    process_turn = bot.process_turn
+
+    async def tracked_turn(guest_phone: str, messages: list) -> None:
+        try:
+            await process_turn(guest_phone, messages)
+        finally:
+            for message in messages:
+                message.done.set()
+
+    bot.process_turn = tracked_turn
+
+    server = StubLLMServer(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        responder=make_responder(args.script, args.seed),
+        seed=args.seed,
+    )
+    async with server:
+        settings.anthropic_base_url = server.base_url
+        settings.anthropic_api_key = settings.anthropic_api_key or "stub-key"
+        llm_client.init_llm_client()
+        core.get_agent()
+
+        # Seeded guests first (their phone as user id, so the booking links)
+        phones: list[int | str] = [b["guest_phone"] for b in get_bookings_data()]
+        guest_ids = (phones + list(range(1, args.guests + 1)))[: args.guests]
+        rng = random.Random(args.seed)
+        finished: list[FakeMessage] = []
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _guest(guest_id, args, random.Random(rng.random()), finished)
+                for guest_id in guest_ids
+            )
+        )
+        elapsed = time.perf_counter() - start
+        await monitor.stop()
+        await history_summarizer.wait_idle()
+        await bot.conversation_mailbox.close()
+        await llm_client.close_llm_client()
+    async with factory() as session:
+        breakdown = await AnalyticsService(session)._latency_breakdown()
+    await engine.dispose()
+
+    turns = len(finished)
+    answered = [m for m in finished if m.last_reply_at is not None]
+    latency = [(m.last_reply_at - m.sent_at) * 1000 for m in answered]
+    first = [(m.first_reply_at - m.sent_at) * 1000 for m in answered]
+    stats = llm_stats.snapshot()
+
+    streaming = "on" if settings.telegram_streaming else "off"
+    print(
+        f"{args.guests} guests x {args.turns} turns | LLM latency "
+        f"{args.latency * 1000:.0f}ms, error rate {args.error_rate:.0%}, "
+        f"script {args.script}, streaming {streaming}"
+    )
+    print(
+        f"turn latency   p50={_percentile(latency, 50):7.0f}ms "
+        f"p95={_percentile(latency, 95):7.0f}ms p99={_percentile(latency, 99):7.0f}ms"
+    )
+    print(
+        f"first reply    p50={_percentile(first, 50):7.0f}ms "
+        f"p95={_percentile(first, 95):7.0f}ms"
+    )
+    print(
+        f"throughput     {turns / elapsed:.1f} turns/s "
+        f"({turns} turns in {elapsed:.1f}s)"
+    )
+    print(f"db commits     {commits / turns:.2f} per turn")
+    print(
+        f"loop lag       p50={statistics.median(monitor.samples):.1f}ms "
+        f"p99={_percentile(monitor.samples, 99):.1f}ms "
+        f"max={max(monitor.samples):.1f}ms"
+    )
+    print(
+        f"llm requests   {len(server.requests)} "
+        f"(peak {server.max_in_flight} in flight, {server.errors} errors injected, "
+        f"{stats['retries']} retries)"
+    )
+    print("slowest stages (p95 ms, from the turn metadata):")
+    stages = sorted(
+        ((stage, row) for stage, row in breakdown.items() if stage != "llm_rounds"),
+        key=lambda item: item[1]["p95"],
+        reverse=True,
+    )
+    for stage, row in stages[:8]:
+        print(f"  {stage:<28} p50={row['p50']:7.0f} p95={row['p95']:7.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guests", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="stub LLM seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=settings.llm_max_concurrency,
+        help="admission limit on LLM requests in flight",
+    )
+    parser.add_argument(
+        "--script", choices=[*TOOL_SCRIPTS, "mixed"], default="mixed"
+    )
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds")
+    parser.add_argument("--debounce", type=float, default=0.0)
+    parser.add_argument("--no-streaming", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    logger.remove()
+    settings.telegram_streaming = not args.no_streaming
+    llm_admission.max_concurrency = args.llm_concurrency
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_run(args, Path(tmp)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Deterministic perf suite: guest scenarios replayed from recorded LLM calls.
+
+Runs the full agent graph on a seeded SQLite file with ``ReplayClient``
+serving ``tests/fixtures/llm_recordings.json``, and reports per scenario the
+LLM calls, prompt size (estimated input tokens) and DB queries. These are
+compared with ``tests/fixtures/perf_baseline.json``; ``tests/test_recording.py``
+runs the same check in CI.
+
+Usage:
+    python -m benchmarks.perf_suite                    # replay, compare
+    python -m benchmarks.perf_suite --update-baseline  # accept current numbers
+    python -m benchmarks.perf_suite --record --stub    # re-record offline
+    python -m benchmarks.perf_suite --record           # re-record against the API
+
+Recording with ``--stub`` answers from each turn's script below through
+``StubLLMServer``; without it the API configured in settings answers (and
+the scripts are ignored). Re-record whenever a prompt or the graph changes
+the requests: replaying them raises ``MissingRecording``.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import anthropic
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.stub_llm_server import (
+    StubLLMServer,
+    text_reply,
+    tool_rounds,
+    tool_use_reply,
+)
+from src.agent.answer_cache import answer_cache
+from src.agent.core import HotelAgent
+from src.agent.llm_client import create_llm_client
+from src.agent.recording import LLMRecorder, ReplayClient
+from src.agent.tokens import estimate_tokens
+from src.database.database import Base
+from src.database.models import MessageRole, Platform
+from src.database.seed import HOTEL_ID, seed_database
+from src.services.conversation_service import ConversationService
+from src.services.pms_service import PMSService
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+RECORDINGS_PATH = FIXTURES / "llm_recordings.json"
+BASELINE_PATH = FIXTURES / "perf_baseline.json"
+
+# Allowed prompt growth over the baseline before it counts as a regression
+PROMPT_TOLERANCE = 0.05
+
+
+@dataclass
+class Turn:
+    """A guest message and the stub's script for answering it."""
+
+    text: str
+    answer: str
+    intent: str = "faq_general"  # if the LLM classifier is asked
+    tools: list[tuple[str, dict]] = field(default_factory=list)
+
+
+@dataclass
+class Scenario:
+    name: str
+    guest_phone: str
+    turns: list[Turn]
+
+
+SCENARIOS = [
+    Scenario(
+        "greeting",
+        "+5491155551234",
+        [Turn("Hola, buenas tardes!", answer="")],
+    ),
+    Scenario(
+        "booking_checkin",
+        "+5491112345678",
+        [
+            Turn(
+                "A que hora es el check-in?",
+                answer="Tu check-in es desde las 15:00hs, Juan!",
+                intent="booking_info",
+                tools=[
+                    ("get_booking_details", {"confirmation_number": "PLR-2024-001"})
+                ],
+            )
+        ],
+    ),
+    Scenario(
+        "new_booking",
+        "+5491100000001",
+        [
+            Turn(
+                "Quiero reservar una habitacion del 2026-12-10 al 2026-12-12 "
+                "para 2 personas",
+                answer="Tenemos Standard y Deluxe disponibles para esas fechas.",
+                intent="new_booking",
+                tools=[
+                    ("get_room_types", {}),
+                    (
+                        "check_availability",
+                        {
+                            "checkin": "2026-12-10",
+                            "checkout": "2026-12-12",
+                            "num_guests": 2,
+                        },
+                    ),
+                ],
+            )
+        ],
+    ),
+    Scenario(
+        "faq_follow_up",
+        "+5491198765432",
+        [
+            Turn(
+                "Tienen WiFi en las habitaciones?",
+                answer="Si, hay WiFi gratis en todo el hotel.",
+                intent="amenities_query",
+                tools=[("get_hotel_amenities", {})],
+            ),
+            Turn(
+                "Y hasta que hora sirven el desayuno?",
+                answer="El desayuno se sirve de 7:00 a 10:30.",
+                intent="faq_general",
+                tools=[("search_faq", {"query": "desayuno"})],
+            ),
+            Turn(
+                "Perfecto, muchas gracias!",
+                answer="De nada! Disfruta tu estadia.",
+                intent="greeting",
+            ),
+        ],
+    ),
+    Scenario(
+        "out_of_scope",
+        "+5491100000002",
+        [
+            Turn(
+                "Me ayudas con mi declaracion de impuestos?",
+                answer="Esa consulta excede lo que puedo resolver.",
+                intent="out_of_scope",
+            )
+        ],
+    ),
+]
+
+
+def stub_responder(scenarios: list[Scenario]):
+    """Answer each request from the script of the turn it belongs to."""
+    turns = [turn for scenario in scenarios for turn in scenario.turns]
+
+    def respond(request: dict) -> dict:
+        messages = request.get("messages", [])
+        text = json.dumps(messages, ensure_ascii=False)
+        # History holds earlier turns too: the current one is the latest seen
+        turn = [t for t in turns if t.text in text][-1]
+        if "tools" not in request:
+            return text_reply(turn.intent)
+        done = tool_rounds(request)
+        if done < len(turn.tools):
+            return tool_use_reply(*turn.tools[done])
+        return text_reply(turn.answer)
+
+    return respond
+
+
+def _prompt_tokens(request: dict) -> int:
+    return sum(
+        estimate_tokens(request.get(key)) for key in ("system", "messages", "tools")
+    )
+
+
+async def run_scenario(
+    scenario: Scenario,
+    client: Any,
+    session_factory: async_sessionmaker[AsyncSession],
+) -> dict:
+    """Play a scenario's turns as ``process_turn`` would; return its totals."""
+    answer_cache.clear()
+    agent = HotelAgent(client=client)
+    totals = {"llm_calls": 0, "prompt_tokens": 0, "db_queries": 0, "ms": 0.0}
+    missing = len(getattr(client, "missing", []))
+    async with session_factory() as session:
+        pms = PMSService(session)
+        conv_service = ConversationService(session)
+        conversation = await conv_service.get_or_create_conversation(
+            guest_phone=scenario.guest_phone,
+            hotel_id=HOTEL_ID,
+            platform=Platform.TELEGRAM,
+        )
+        booking = await pms.get_booking_by_phone(scenario.guest_phone)
+        if booking:
+            await conv_service.link_booking(
+                conversation.id, uuid.UUID(booking["id"]), commit=False
+            )
+        for turn in scenario.turns:
+            user_message = await conv_service.add_message(
+                conversation.id, MessageRole.USER, turn.text, commit=False
+            )
+            served = len(client.requests)
+            start = time.perf_counter()
+            result = await agent.process_message(
+                user_message=turn.text,
+                guest_phone=scenario.guest_phone,
+                conversation_id=conversation.id,
+                pms=pms,
+                conversation_service=conv_service,
+                hotel_id=HOTEL_ID,
+                session_factory=session_factory,
+            )
+            totals["ms"] += (time.perf_counter() - start) * 1000
+            reply = await conv_service.add_message(
+                conversation.id,
+                MessageRole.ASSISTANT,
+                result["response"],
+                intent=result["intent"],
+                commit=False,
+            )
+            if result["checkpoint"] is not None:
+                await conv_service.save_checkpoint(
+                    conversation.id,
+                    result["checkpoint"],
+                    [user_message, reply],
+                    commit=False,
+                )
+            await session.commit()
+            requests = client.requests[served:]
+            totals["llm_calls"] += len(requests)
+            totals["prompt_tokens"] += sum(_prompt_tokens(r) for r in requests)
+            totals["db_queries"] += result["metadata"]["db_queries"]
+    totals["missing"] = len(getattr(client, "missing", [])) - missing
+    return totals
+
+
+async def run_suite(
+    client: Any, session_factory: async_sessionmaker[AsyncSession]
+) -> dict[str, dict]:
+    return {
+        scenario.name: await run_scenario(scenario, client, session_factory)
+        for scenario in SCENARIOS
+    }
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    """Regressions of ``results`` against ``baseline`` (empty if none)."""
+    problems = []
+    for name, row in results.items():
+        if row.get("missing"):
+            problems.append(f"{name}: {row['missing']} requests not recorded")
+        expected = baseline.get(name)
+        if expected is None:
+            problems.append(f"{name}: no baseline (run --update-baseline)")
+            continue
+        for key in ("llm_calls", "db_queries"):
+            if row[key] > expected[key]:
+                problems.append(f"{name}: {key} {expected[key]} -> {row[key]}")
+        limit = expected["prompt_tokens"] * (1 + PROMPT_TOLERANCE)
+        if row["prompt_tokens"] > limit:
+            problems.append(
+                f"{name}: prompt_tokens {expected['prompt_tokens']} "
+                f"-> {row['prompt_tokens']}"
+            )
+    return problems
+
+
+def load_baseline() -> dict[str, dict]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+async def _seeded_factory(directory: Path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / 'perf.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await seed_database(session)
+    return engine, factory
+
+
+async def _record(args: argparse.Namespace, factory) -> None:
+    if args.stub:
+        async with StubLLMServer(responder=stub_responder(SCENARIOS)) as server:
+            client = anthropic.AsyncAnthropic(
+                api_key="stub", base_url=server.base_url, max_retries=0
+            )
+            recorder = LLMRecorder(client)
+            await run_suite(recorder, factory)
+            await client.close()
+    else:
+        client = create_llm_client()
+        recorder = LLMRecorder(client)
+        await run_suite(recorder, factory)
+        await client.close()
+    recorder.save(RECORDINGS_PATH)
+    print(f"Recorded {len(recorder.recordings)} LLM calls to {RECORDINGS_PATH}")
+
+
+async def _replay(args: argparse.Namespace, factory) -> int:
+    results = await run_suite(ReplayClient.from_file(RECORDINGS_PATH), factory)
+    baseline = load_baseline()
+    print(f"{'scenario':<18} {'llm':>4} {'prompt tok':>11} {'db q':>5} {'ms':>7}")
+    for name, row in results.items():
+        print(
+            f"{name:<18} {row['llm_calls']:>4} {row['prompt_tokens']:>11} "
+            f"{row['db_queries']:>5} {row['ms']:>7.1f}"
+        )
+    if args.update_baseline:
+        BASELINE_PATH.write_text(
+            json.dumps(
+                {
+                    name: {k: row[k] for k in ("llm_calls", "prompt_tokens", "db_queries")}
+                    for name, row in results.items()
+                },
+                indent=2,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    problems = compare(results, baseline)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+async def _main(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, factory = await _seeded_factory(Path(tmp))
+        try:
+            if args.record:
+                await _record(args, factory)
+                return 0
+            return await _replay(args, factory)
+        finally:
+            await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--stub", action="store_true", help="record offline")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    logger.remove()
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Local stand-in for the Anthropic Messages API, for offline tests and benchmarks.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length bodies) for the
+Anthropic SDK pointed at it with ``base_url``, including ``stream=True``
+requests (the whole SSE event sequence is sent as one body). Latency, error
+rate and the replies (including tool_use scripts) are configurable; the
+server records every request and the peak number of requests in flight.
+
+Usage:
+    python -m benchmarks.stub_llm_server [--port 8765] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+Responder = Callable[[dict], dict]
+
+
+def text_reply(text: str, stop_reason: str = "end_turn") -> dict:
+    """Reply content for ``text``."""
+    return {"content": [{"type": "text", "text": text}], "stop_reason": stop_reason}
+
+
+def tool_use_reply(name: str, tool_input: dict | None = None) -> dict:
+    """Reply asking for one tool call."""
+    return {
+        "content": [
+            {
+                "type": "tool_use",
+                "id": f"toolu_{uuid.uuid4().hex[:12]}",
+                "name": name,
+                "input": tool_input or {},
+            }
+        ],
+        "stop_reason": "tool_use",
+    }
+
+
+def tool_rounds(request: dict) -> int:
+    """Tool rounds already done in the request's turn.
+
+    Replayed history has assistant text only, so an assistant message with a
+    ``tool_use`` block belongs to the turn being answered.
+    """
+    return sum(
+        1
+        for message in request.get("messages", [])
+        if message["role"] == "assistant"
+        and isinstance(message["content"], list)
+        and any(block.get("type") == "tool_use" for block in message["content"])
+    )
+
+
+def default_responder(request: dict) -> dict:
+    """Classification calls get an intent; everything else a short answer."""
+    if "tools" not in request and request.get("max_tokens", 0) <= 50:
+        return text_reply("faq_general")
+    return text_reply("Listo! Respuesta de prueba.")
+
+
+class StubLLMServer:
+    """In-process fake of ``POST /v1/messages``."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        responder: Responder | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.responder = responder or default_responder
+        self.host = host
+        self.port = port
+        self.requests: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._server: asyncio.base_events.Server | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "StubLLMServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "StubLLMServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, content_type, data = await self._respond(body)
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"content-type: {content_type}\r\n"
+                    f"content-length: {len(data)}\r\n"
+                    "connection: keep-alive\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, body: bytes) -> tuple[int, str, bytes]:
+        request = json.loads(body or b"{}")
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                error = {
+                    "type": "error",
+                    "error": {"type": "overloaded_error", "message": "Overloaded"},
+                }
+                return 529, "application/json", json.dumps(error).encode("utf-8")
+            reply = self.responder(request)
+        finally:
+            self.in_flight -= 1
+
+        input_tokens = len(json.dumps(request)) // 4
+        output_tokens = sum(
+            len(block.get("text", "")) // 4 + 1 for block in reply["content"]
+        )
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:16]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "stub"),
+            "content": reply["content"],
+            "stop_reason": reply["stop_reason"],
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        }
+        if request.get("stream"):
+            return 200, "text/event-stream", _sse_events(message)
+        return 200, "application/json", json.dumps(message).encode("utf-8")
+
+
+def _sse_events(message: dict) -> bytes:
+    """The Messages streaming event sequence for a complete ``message``."""
+    events: list[dict] = [
+        {
+            "type": "message_start",
+            "message": {
+                **message,
+                "content": [],
+                "stop_reason": None,
+                "usage": {**message["usage"], "output_tokens": 1},
+            },
+        }
+    ]
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "text":
+            start = {"type": "text", "text": ""}
+            # A few deltas per block, like a real stream
+            words = block["text"].split(" ")
+            deltas = [
+                {"type": "text_delta", "text": " ".join(words[i : i + 4]) + " "}
+                for i in range(0, len(words), 4)
+            ]
+            deltas[-1]["text"] = deltas[-1]["text"][:-1]
+        else:
+            start = {**block, "input": {}}
+            deltas = [
+                {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}
+            ]
+        events.append(
+            {"type": "content_block_start", "index": index, "content_block": start}
+        )
+        events.extend(
+            {"type": "content_block_delta", "index": index, "delta": delta}
+            for delta in deltas
+        )
+        events.append({"type": "content_block_stop", "index": index})
+    events.append(
+        {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": message["usage"]["output_tokens"]},
+        }
+    )
+    events.append({"type": "message_stop"})
+    return "".join(
+        f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events
+    ).encode("utf-8")
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = StubLLMServer(
+        latency=args.latency, error_rate=args.error_rate, port=args.port
+    )
+    await server.start()
+    print(f"Stub LLM server on {server.base_url} (ANTHROPIC_BASE_URL)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
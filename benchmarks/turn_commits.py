@@ -0,0 +1,156 @@
+"""Benchmark: database commits per turn and turn throughput.
+
+Compares the old write path, where get_or_create_conversation,
+link_booking and each add_message commit on their own (the services'
+default mode), with ``process_turn``, which stages the turn's writes and
+commits them once after the reply. The agent is replaced by a stub
+(optionally sleeping to stand in for the LLM), so only the database side
+of a turn is measured, on a seeded SQLite file.
+
+Usage:
+    python -m benchmarks.turn_commits [--guests 20] [--turns 10] [--agent-latency 0]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src import bot
+from src.config import settings
+from src.database.database import Base
+from src.database.models import MessageRole, Platform
+from src.database.seed import HOTEL_ID, get_bookings_data, seed_database
+from src.services.conversation_cache import conversation_cache
+from src.services.conversation_service import ConversationService
+from src.services.pms_service import PMSService
+
+
+def _guest_phones(guests: int) -> list[str]:
+    # Seeded bookings first, so the booking link is part of the workload
+    booked = [booking["guest_phone"] for booking in get_bookings_data()]
+    extra = [f"+54911{i:08d}" for i in range(max(0, guests - len(booked)))]
+    return (booked + extra)[:guests]
+
+
+class _TelegramMessage:
+    """Just enough of ``telegram.Message`` for ``process_turn``."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    async def reply_text(self, text: str) -> None:
+        pass
+
+
+async def _agent_reply(latency: float) -> dict:
+    if latency:
+        await asyncio.sleep(latency)
+    return {"response": "Listo! Respuesta de prueba.", "intent": "faq_general"}
+
+
+async def _turn_before(factory, guest_phone: str, text: str, latency: float) -> None:
+    """The pre-change write path: every service call commits."""
+    async with factory() as session:
+        pms = PMSService(session)
+        conv_service = ConversationService(session)
+        conversation = await conv_service.get_or_create_conversation(
+            guest_phone=guest_phone, hotel_id=HOTEL_ID, platform=Platform.TELEGRAM
+        )
+        if conversation.booking_id is None:
+            booking = await pms.get_booking_by_phone(guest_phone)
+            if booking:
+                await conv_service.link_booking(
+                    conversation.id, uuid.UUID(booking["id"])
+                )
+        await conv_service.add_message(conversation.id, MessageRole.USER, text)
+        result = await _agent_reply(latency)
+        await conv_service.add_message(
+            conversation.id,
+            MessageRole.ASSISTANT,
+            result["response"],
+            intent=result["intent"],
+        )
+
+
+async def _turn_after(factory, guest_phone: str, text: str, latency: float) -> None:
+    await bot.process_turn(guest_phone, [_TelegramMessage(text)])
+
+
+async def _run(label: str, turn, args: argparse.Namespace, directory: Path) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{directory / f'{label}.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await seed_database(session)
+
+    commits = 0
+
+    def count_commit(conn) -> None:
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine.sync_engine, "commit", count_commit)
+    # Each run has its own database: drop the previous run's conversations
+    conversation_cache.clear()
+    bot.async_session = factory
+    agent = MagicMock()
+    agent.process_message = lambda **kwargs: _agent_reply(args.agent_latency)
+    bot.get_agent = lambda: agent
+
+    samples: list[float] = []
+
+    async def guest(phone: str) -> None:
+        # Each guest's turns run in order, as the conversation mailbox does
+        for i in range(args.turns):
+            start = time.perf_counter()
+            await turn(factory, phone, f"mensaje {i}", args.agent_latency)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(guest(phone) for phone in _guest_phones(args.guests)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    turns = len(samples)
+    print(
+        f"{label:<8} commits/turn={commits / turns:5.2f} "
+        f"turns/s={turns / elapsed:8.1f} "
+        f"p50={statistics.median(samples):7.1f}ms "
+        f"p95={sorted(samples)[int(turns * 0.95) - 1]:7.1f}ms"
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    settings.telegram_streaming = False
+    settings.history_summary_enabled = False
+    logger.remove()
+    print(
+        f"{args.guests} guests x {args.turns} turns "
+        f"(agent latency {args.agent_latency * 1000:.0f}ms)"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        await _run("before", _turn_before, args, Path(tmp))
+        await _run("after", _turn_after, args, Path(tmp))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guests", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--agent-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Process-wide admission control for LLM requests.
+
+Bursts of guest messages must not turn into bursts of API calls that trip
+provider rate limits. Every request first waits for:
+
+- a free slot under ``llm_max_concurrency``;
+- enough budget in the input and output tokens-per-minute buckets (output
+  is reserved at ``max_tokens`` and the unused part refunded afterwards).
+
+Waiters are served by priority (in-house guests first), then arrival order.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.config import settings
+
+# Lower is served first
+PRIORITY_IN_HOUSE = 0
+PRIORITY_BOOKED = 1
+PRIORITY_DEFAULT = 2
+PRIORITY_BACKGROUND = 3
+
+_IN_HOUSE_STATUSES = frozenset({"checked_in"})
+
+
+class AdmissionTimeout(asyncio.TimeoutError):
+    """Not admitted in time: the limit was hit locally, upstream is fine."""
+
+
+def guest_priority(booking: dict | None) -> int:
+    """Priority of a guest's LLM requests, from their booking (if any)."""
+    if not booking:
+        return PRIORITY_DEFAULT
+    if booking.get("status") in _IN_HOUSE_STATUSES:
+        return PRIORITY_IN_HOUSE
+    return PRIORITY_BOOKED
+
+
+class TokenBucket:
+    """Tokens-per-minute bucket; a rate of 0 means unlimited."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: int) -> float:
+        """Seconds until ``amount`` tokens are available (0 = now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        # A request larger than the whole bucket only waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: int) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= amount
+
+    def give_back(self, amount: int) -> None:
+        if not self.unlimited and amount > 0:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+@dataclass
+class Ticket:
+    """An admitted request; ``settle`` refunds unused output tokens."""
+
+    controller: "AdmissionController"
+    reserved_output: int
+    waited_ms: int
+    settled: bool = field(default=False)
+
+    def settle(self, usage: Any) -> None:
+        if self.settled:
+            return
+        self.settled = True
+        output = getattr(usage, "output_tokens", None)
+        if isinstance(output, int):
+            self.controller.output_bucket.give_back(self.reserved_output - output)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    input_tokens: int = field(compare=False)
+    output_tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """Concurrency limit plus token buckets, with a priority wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        input_tokens_per_minute: int = 0,
+        output_tokens_per_minute: int = 0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.input_bucket = TokenBucket(input_tokens_per_minute)
+        self.output_bucket = TokenBucket(output_tokens_per_minute)
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.total_wait_ms = 0
+        self.max_wait_ms = 0
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        priority: int = PRIORITY_DEFAULT,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        timeout: float | None = None,
+    ) -> AsyncIterator[Ticket]:
+        """Wait for admission, hold a slot for the block, then release it.
+
+        Raises ``AdmissionTimeout`` if not admitted within ``timeout``.
+        """
+        start = time.perf_counter()
+        waiter = _Waiter(
+            priority,
+            next(self._seq),
+            input_tokens,
+            output_tokens,
+            asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we gave up: hand the slot back
+                self._release()
+            else:
+                waiter.future.cancel()
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionTimeout(
+                    f"LLM request not admitted within {timeout:.1f}s"
+                ) from e
+            raise
+
+        waited_ms = int((time.perf_counter() - start) * 1000)
+        self.admitted += 1
+        self.total_wait_ms += waited_ms
+        self.max_wait_ms = max(self.max_wait_ms, waited_ms)
+        ticket = Ticket(self, output_tokens, waited_ms)
+        try:
+            yield ticket
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def admit_now(
+        self, input_tokens: int = 0, output_tokens: int = 0
+    ) -> AsyncIterator[Ticket | None]:
+        """Admit only if a slot and tokens are free right now, else yield None.
+
+        For optional requests (e.g. a hedge) that must never queue, nor take
+        a slot from a request that is already waiting.
+        """
+        if (
+            self._queue
+            or self.in_flight >= self.max_concurrency
+            or self.input_bucket.wait_time(input_tokens) > 0
+            or self.output_bucket.wait_time(output_tokens) > 0
+        ):
+            yield None
+            return
+        self.input_bucket.take(input_tokens)
+        self.output_bucket.take(output_tokens)
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield Ticket(self, output_tokens, 0)
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit queued requests, in priority order, while capacity allows."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._queue and self.in_flight < self.max_concurrency:
+            head = self._queue[0]
+            wait = max(
+                self.input_bucket.wait_time(head.input_tokens),
+                self.output_bucket.wait_time(head.output_tokens),
+            )
+            if wait > 0:
+                # Strict priority: lower-priority requests don't jump the head
+                self._wakeup = asyncio.get_running_loop().call_later(
+                    wait, self._dispatch
+                )
+                return
+            heapq.heappop(self._queue)
+            self.input_bucket.take(head.input_tokens)
+            self.output_bucket.take(head.output_tokens)
+            self.in_flight += 1
+            head.future.set_result(None)
+
+    def snapshot(self) -> dict:
+        avg_wait = self.total_wait_ms / self.admitted if self.admitted else 0
+        return {
+            "queue_depth": len(self._queue),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "admitted": self.admitted,
+            "avg_wait_ms": round(avg_wait),
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+
+def create_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=settings.llm_max_concurrency,
+        input_tokens_per_minute=settings.llm_input_tokens_per_minute,
+        output_tokens_per_minute=settings.llm_output_tokens_per_minute,
+    )
+
+
+llm_admission = create_admission_controller()
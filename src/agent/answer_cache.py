@@ -0,0 +1,109 @@
+"""Cache of guest-independent answers for repeated FAQ/amenities questions.
+
+Questions like "cual es la clave del wifi" are asked hundreds of times a day
+and always get the same answer. Entries are keyed by the intent, a
+normalized form of the question and the hotel data version, so a change to
+the hotel's amenities, policies or FAQ makes old answers unreachable.
+"""
+
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+from src.agent.intents import content_tokens, normalize_text
+from src.config import settings
+
+# Intents whose answers depend only on hotel data, never on the guest
+CACHEABLE_INTENTS = frozenset({"amenities_query", "faq_general"})
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question: accent-free, sorted content words.
+
+    "¿Cuál es la clave del WiFi?" and "clave wifi" both become "clave wifi".
+    """
+    return " ".join(sorted(set(content_tokens(normalize_text(question)))))
+
+
+class AnswerCache:
+    """In-process LRU cache with a TTL per entry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, str, str, str], tuple[float, str]] = (
+            OrderedDict()
+        )
+        self._versions: dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _key(
+        self, hotel_id: str, version: str, intent: str, question: str
+    ) -> tuple[str, str, str, str] | None:
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        if self._versions.get(hotel_id) != version:
+            # Hotel data changed: answers built from the old data are stale
+            self.invalidate_hotel(hotel_id)
+            self._versions[hotel_id] = version
+        return hotel_id, version, intent, normalized
+
+    def get(
+        self, hotel_id: str, version: str, intent: str, question: str
+    ) -> str | None:
+        """Return a cached answer, or None on a miss."""
+        key = self._key(hotel_id, version, intent, question)
+        entry = self._entries.get(key) if key else None
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(
+        self, hotel_id: str, version: str, intent: str, question: str, answer: str
+    ) -> None:
+        key = self._key(hotel_id, version, intent, question)
+        if key is None:
+            return
+        self._entries[key] = (time.monotonic(), answer)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_hotel(self, hotel_id: str) -> None:
+        """Drop every cached answer for a hotel."""
+        stale = [key for key in self._entries if key[0] == hotel_id]
+        for key in stale:
+            del self._entries[key]
+        self._versions.pop(hotel_id, None)
+        if stale:
+            logger.info(
+                f"Answer cache: dropped {len(stale)} entries for hotel {hotel_id}"
+            )
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._versions.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+answer_cache = AnswerCache(
+    max_entries=settings.answer_cache_max_entries,
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+)
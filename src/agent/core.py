@@ -1,26 +1,97 @@
 """Core agent using LangGraph for conversation orchestration."""
 
+import asyncio
 import json
 import time
 import uuid
-from typing import Any, TypedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Annotated, Any, TypedDict
 
 import anthropic
-from langgraph.graph import END, StateGraph
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END, START, StateGraph
 from loguru import logger
-
-from src.agent.intents import Intent, classify_intent_fallback, parse_llm_intent
-from src.agent.prompts import INTENT_CLASSIFICATION_PROMPT, SYSTEM_PROMPT
-from src.agent.tools import TOOL_DEFINITIONS, AgentTools
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.agent.admission import guest_priority
+from src.agent.answer_cache import CACHEABLE_INTENTS, AnswerCache, answer_cache
+from src.agent.history import build_history
+from src.agent.hotel_context import hotel_contexts, hotel_data_version
+from src.agent.intents import (
+    Intent,
+    classify_intent_fallback,
+    extract_intent_tag,
+    intent_stats,
+    parse_llm_intent,
+    score_intent,
+)
+from src.agent.llm_client import get_llm_client
+from src.agent.pricing import estimate_cost_usd
+from src.agent.prompt_cache import (
+    cached_tools,
+    stable_json,
+    system_blocks,
+    with_breakpoint,
+)
+from src.agent.prompts import (
+    INTENT_CLASSIFICATION_PROMPT,
+    SINGLE_CALL_INSTRUCTIONS,
+    SYSTEM_PROMPT,
+)
+from src.agent.resilience import CircuitOpenError, ResilientLLM
+from src.agent.routing import FAST, LARGE, model_for_tier, select_tier
+from src.agent.timing import timed_node, track_db
+from src.agent.tokens import estimate_tokens
+from src.agent.tools import (
+    META_TOOLS,
+    READ_ONLY_TOOLS,
+    REQUEST_MORE_TOOLS,
+    TOOL_DEFINITIONS,
+    AgentTools,
+    tools_for_intent,
+    widened_tools,
+)
+from src.agent.usage import TokenUsage
 from src.config import settings
 from src.database.models import MessageRole
 from src.services.conversation_service import ConversationService
 from src.services.pms_service import PMSService
 
 
+# Canned replies used when the LLM call for a handler fails
+FALLBACK_RESPONSES: dict[str, str] = {
+    "booking_info": "Disculpa, no pude acceder a la informacion de tu reserva en este momento. Te recomiendo contactar a recepcion al +54 11 4833-1234.",
+    "new_booking": "Disculpa, no pude procesar tu consulta de disponibilidad en este momento. Para reservar, contacta a recepcion al +54 11 4833-1234.",
+    "amenities_query": "Disculpa, no pude obtener la informacion en este momento. Podes consultar en recepcion o llamar al +54 11 4833-1234.",
+    "service_request": "Disculpa, no pude procesar tu pedido automaticamente. Por favor comunicate con recepcion al +54 11 4833-1234.",
+    "faq_general": "Disculpa, no puedo responder tu consulta en este momento. Te recomiendo contactar a recepcion al +54 11 4833-1234.",
+    "upselling": "Disculpa, no pude obtener las ofertas en este momento. Consulta en recepcion por nuestros upgrades y promociones.",
+    "out_of_scope": "Esa consulta excede lo que puedo resolver. Te comunico con nuestro equipo de recepcion para que puedan ayudarte.",
+}
+DEFAULT_FALLBACK_RESPONSE = (
+    "Disculpa, tuve un problema tecnico. Por favor contacta a recepcion."
+)
+
+# Tools that can change what the guest's booking lookup returns
+BOOKING_TOOLS = frozenset({"create_booking"})
+
+
 # --- State definition ---
 
 
+def merge_metadata(current: dict[str, Any], update: dict[str, Any]) -> dict[str, Any]:
+    """Reducer: every node adds its own keys to the turn metadata.
+
+    ``node_ms`` is merged key by key, since every node adds its own timing.
+    """
+    merged = {**(current or {}), **(update or {})}
+    if current and update and "node_ms" in current and "node_ms" in update:
+        merged["node_ms"] = {**current["node_ms"], **update["node_ms"]}
+    return merged
+
+
 class AgentState(TypedDict):
     """State that flows through the LangGraph nodes."""
 
@@ -29,64 +100,195 @@ class AgentState(TypedDict):
     guest_phone: str
     conversation_id: str
     hotel_id: str
+    started_at: float  # time.perf_counter() when the turn started
 
     # Context gathered during processing
     intent: str
     booking: dict | None
+    booking_loaded_at: float | None  # time.time() when the booking was read
     hotel_info: dict | None
+    hotel_version: str  # hotel_data_version() of hotel_info, once per turn
 
-    # Conversation history for the LLM
+    # Conversation history for the LLM, and the window it was built from
     messages: list[dict[str, str]]
+    history_window: dict | None
 
     # Output
     response: str
-    metadata: dict[str, Any]
+    metadata: Annotated[dict[str, Any], merge_metadata]
+
+
+@dataclass
+class TurnContext:
+    """Per-turn dependencies, handed to the graph nodes through the run config.
+
+    The compiled graph is shared by every turn, so anything bound to a DB
+    session lives here instead of on the agent.
+    """
+
+    pms: PMSService
+    conversation_service: ConversationService
+    hotel_id: uuid.UUID
+    # Opens extra short-lived sessions so independent queries can overlap
+    # (a single AsyncSession cannot run concurrent statements)
+    session_factory: async_sessionmaker[AsyncSession] | None = None
+    # Receives the partial reply while it streams (e.g. to edit a chat message)
+    on_text: Callable[[str], Awaitable[None]] | None = None
+    tools: AgentTools = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tools = AgentTools(self.pms, self.conversation_service, self.hotel_id)
+
+
+def _response_text(response: Any) -> str:
+    """Concatenate the text blocks of an LLM response."""
+    return "".join(
+        block.text for block in response.content if hasattr(block, "text")
+    )
+
+
+def _visible_text(text: str, single_call: bool) -> str:
+    """Part of a streamed reply that may be shown to the guest.
+
+    In single-call mode the reply starts with an ``<intent>`` tag, which is
+    held back until it is complete and then stripped.
+    """
+    if not single_call:
+        return text.strip()
+    stripped = text.lstrip()
+    if stripped.startswith("<") and "</intent>" not in stripped:
+        return ""
+    return extract_intent_tag(text)[1]
+
+
+@cache
+def _tool_token_estimate(intent: str) -> tuple[int, int]:
+    """Estimated tokens of the intent's tool subset and of the full tool set."""
+    return (
+        estimate_tokens(tools_for_intent(intent)),
+        estimate_tokens(TOOL_DEFINITIONS),
+    )
+
+
+def _deadline(state: AgentState) -> float:
+    """perf_counter() value by which the turn's LLM work must be done."""
+    return state["started_at"] + settings.llm_turn_budget_seconds
+
+
+def _turn_checkpoint(result: dict, turn: TurnContext) -> dict | None:
+    """The context to checkpoint for the next turn (see ``save_checkpoint``).
+
+    Only a context read on its own sessions qualifies: read on the turn
+    session it already includes the turn's staged messages. The booking is
+    left out if there is none (it may be created or linked later) or if a
+    tool may have changed it; it keeps the time it was read, so it expires.
+    """
+    window = result.get("history_window")
+    if (
+        not settings.agent_checkpoint_enabled
+        or window is None
+        or turn.session_factory is None
+    ):
+        return None
+    checkpoint = {"window": window}
+    tools_run = result.get("metadata", {}).get("tool_ms", {})
+    booking = result.get("booking")
+    if booking and not BOOKING_TOOLS.intersection(tools_run):
+        checkpoint["booking"] = booking
+        checkpoint["booking_at"] = result.get("booking_loaded_at")
+    return checkpoint
+
+
+def _checkpoint_status(queried: dict) -> str:
+    """How much of the turn's context the checkpoint supplied."""
+    if not settings.agent_checkpoint_enabled:
+        return "off"
+    if "history" in queried:
+        return "miss"
+    return "partial" if "booking" in queried else "hit"
+
+
+def _used_writes(metadata: dict) -> bool:
+    """Whether the attempt ran a tool that may have written data."""
+    return any(
+        call["name"] not in READ_ONLY_TOOLS and call["name"] not in META_TOOLS
+        for call in metadata.get("tool_calls", [])
+    )
+
+
+def _tool_ms(tool_calls: list[dict]) -> dict[str, int]:
+    """Total milliseconds per tool name."""
+    totals: dict[str, int] = {}
+    for call in tool_calls:
+        totals[call["name"]] = totals.get(call["name"], 0) + call["ms"]
+    return totals
+
+
+def _turn(config: RunnableConfig) -> TurnContext:
+    """Get the TurnContext of the running turn from the node config."""
+    return config["configurable"]["turn"]
 
 
 # --- Agent class ---
 
 
 class HotelAgent:
-    """LangGraph-powered hotel concierge agent."""
+    """LangGraph-powered hotel concierge agent.
+
+    Build it once per process: the graph is compiled in the constructor and
+    reused for every message. Per-turn services are passed to
+    ``process_message``.
+    """
 
     def __init__(
         self,
-        pms: PMSService,
-        conversation_service: ConversationService,
-        hotel_id: uuid.UUID,
+        client: anthropic.AsyncAnthropic | None = None,
+        answers: AnswerCache | None = None,
     ) -> None:
-        self.pms = pms
-        self.conversation_service = conversation_service
-        self.hotel_id = hotel_id
-        self.tools = AgentTools(pms, conversation_service, hotel_id)
+        self.client = client or get_llm_client()
+        self.llm = ResilientLLM(self.client)
+        self.answers = answers or answer_cache
         self.graph = self._build_graph()
 
     def _build_graph(self) -> Any:
         """Build the LangGraph state machine."""
         graph = StateGraph(AgentState)
 
-        # Add nodes
-        graph.add_node("load_context", self._load_context)
-        graph.add_node("classify_intent", self._classify_intent)
-        graph.add_node("handle_greeting", self._handle_greeting)
-        graph.add_node("handle_booking", self._handle_booking)
-        graph.add_node("handle_new_booking", self._handle_new_booking)
-        graph.add_node("handle_amenities", self._handle_amenities)
-        graph.add_node("handle_service_request", self._handle_service_request)
-        graph.add_node("handle_faq", self._handle_faq)
-        graph.add_node("handle_upselling", self._handle_upselling)
-        graph.add_node("handle_out_of_scope", self._handle_out_of_scope)
-        graph.add_node("generate_response", self._generate_response)
-
-        # Set entry point
-        graph.set_entry_point("load_context")
-
-        # Edges
-        graph.add_edge("load_context", "classify_intent")
+        # Add nodes (each one timed into metadata["node_ms"])
+        nodes = {
+            "load_context": self._load_context,
+            "classify_intent": self._classify_intent,
+            "handle_greeting": self._handle_greeting,
+            "handle_booking": self._handle_booking,
+            "handle_new_booking": self._handle_new_booking,
+            "handle_amenities": self._handle_amenities,
+            "handle_service_request": self._handle_service_request,
+            "handle_faq": self._handle_faq,
+            "handle_upselling": self._handle_upselling,
+            "handle_out_of_scope": self._handle_out_of_scope,
+            "handle_single_call": self._handle_single_call,
+            "generate_response": self._generate_response,
+        }
+        if settings.speculative_classification:
+            nodes["join_context"] = self._join_context
+        for name, node in nodes.items():
+            graph.add_node(name, timed_node(name, node))
+
+        if settings.speculative_classification:
+            # Classification only needs the user message: start it at the same
+            # time as the DB context load and join both before routing
+            graph.add_edge(START, "load_context")
+            graph.add_edge(START, "classify_intent")
+            graph.add_edge(["load_context", "classify_intent"], "join_context")
+            route_from = "join_context"
+        else:
+            graph.set_entry_point("load_context")
+            graph.add_edge("load_context", "classify_intent")
+            route_from = "classify_intent"
 
         # Conditional routing based on intent
         graph.add_conditional_edges(
-            "classify_intent",
+            route_from,
             self._route_by_intent,
             {
                 "greeting": "handle_greeting",
@@ -97,6 +299,7 @@ class HotelAgent:
                 "faq_general": "handle_faq",
                 "upselling": "handle_upselling",
                 "out_of_scope": "handle_out_of_scope",
+                "single_call": "handle_single_call",
             },
         )
 
@@ -109,6 +312,7 @@ class HotelAgent:
         graph.add_edge("handle_faq", "generate_response")
         graph.add_edge("handle_upselling", "generate_response")
         graph.add_edge("handle_out_of_scope", "generate_response")
+        graph.add_edge("handle_single_call", "generate_response")
 
         # End
         graph.add_edge("generate_response", END)
@@ -117,55 +321,193 @@ class HotelAgent:
 
     # --- Node implementations ---
 
-    async def _load_context(self, state: AgentState) -> dict:
-        """Load hotel info and conversation history."""
-        logger.info(f"Loading context for conversation {state['conversation_id']}")
+    async def _load_context(self, state: AgentState, config: RunnableConfig) -> dict:
+        """Load hotel info, conversation history and the guest's booking.
 
-        hotel_info = await self.pms.get_hotel(self.hotel_id)
+        History and booking come from the conversation checkpoint when it is
+        current; whatever it lacks is queried next. With a session factory
+        each round of queries runs concurrently, each on its own session;
+        otherwise they run one after another on the turn session.
+        """
+        logger.info(f"Loading context for conversation {state['conversation_id']}")
+        turn = _turn(config)
+        conversation_id = uuid.UUID(state["conversation_id"])
+        timings: dict[str, int] = {}
+
+        queries = {
+            "hotel": lambda pms, conv: pms.get_hotel(turn.hotel_id),
+            "history": lambda pms, conv: conv.get_history_window(
+                conversation_id, limit=settings.max_conversation_history
+            ),
+            "booking": lambda pms, conv: pms.get_booking_by_phone(
+                state["guest_phone"]
+            ),
+        }
 
-        # Load conversation history
-        history = await self.conversation_service.get_conversation_history(
-            uuid.UUID(state["conversation_id"]),
-            limit=settings.max_conversation_history,
-        )
+        async def run(name: str, query: Any) -> Any:
+            start = time.perf_counter()
+            if turn.session_factory is None:
+                result = await query(turn.pms, turn.conversation_service)
+            else:
+                async with turn.session_factory() as session:
+                    result = await query(
+                        PMSService(session), ConversationService(session)
+                    )
+            timings[name] = int((time.perf_counter() - start) * 1000)
+            return result
 
-        # Try to find a booking for this guest
-        booking = await self.pms.get_booking_by_phone(state["guest_phone"])
+        async def run_all(round_queries: dict[str, Any]) -> dict[str, Any]:
+            if turn.session_factory is None:
+                return {
+                    name: await run(name, query)
+                    for name, query in round_queries.items()
+                }
+            results = await asyncio.gather(
+                *(run(name, query) for name, query in round_queries.items())
+            )
+            return dict(zip(round_queries, results))
+
+        start = time.perf_counter()
+        loaded: dict[str, Any] = {}
+        booking_loaded_at = time.time()
+        if settings.agent_checkpoint_enabled:
+            loaded = await run_all(
+                {
+                    "hotel": queries.pop("hotel"),
+                    "checkpoint": lambda pms, conv: conv.get_checkpoint(
+                        conversation_id, limit=settings.max_conversation_history
+                    ),
+                }
+            )
+            # Only query what the checkpoint doesn't cover
+            checkpoint = loaded.pop("checkpoint") or {}
+            if "window" in checkpoint:
+                loaded["history"] = checkpoint["window"]
+                queries.pop("history")
+            if "booking" in checkpoint:
+                loaded["booking"] = checkpoint["booking"]
+                booking_loaded_at = checkpoint["booking_at"]
+                queries.pop("booking")
+        if queries:
+            loaded.update(await run_all(queries))
+
+        window = loaded["history"]
+        history, history_stats = build_history(window)
 
         return {
-            "hotel_info": hotel_info,
+            "hotel_info": loaded["hotel"],
+            "hotel_version": hotel_data_version(loaded["hotel"]),
             "messages": history,
-            "booking": booking,
+            "history_window": window,
+            "booking": loaded["booking"],
+            "booking_loaded_at": booking_loaded_at,
+            "metadata": {
+                "context_ms": int((time.perf_counter() - start) * 1000),
+                "context_queries_ms": timings,
+                "context_concurrent": turn.session_factory is not None,
+                "context_checkpoint": _checkpoint_status(queries),
+                **history_stats,
+            },
         }
 
     async def _classify_intent(self, state: AgentState) -> dict:
-        """Classify the user's intent using the LLM with keyword fallback."""
+        """Classify the user's intent.
+
+        The local keyword scorer answers when it is confident enough; only
+        ambiguous messages pay for an LLM classification round trip, with the
+        keyword fallback if that call fails.
+        """
         message = state["user_message"]
         logger.info(f"Classifying intent for: '{message[:80]}...'")
+        start = time.perf_counter()
+
+        # History is only loaded yet when classification is not speculative
+        intent, confidence = score_intent(message, state.get("messages"))
+        if confidence >= settings.intent_fast_path_threshold:
+            intent_stats.record_local()
+            logger.info(
+                f"Local fast-path intent: {intent.value} (confidence={confidence:.2f})"
+            )
+            return {
+                "intent": intent.value,
+                "metadata": {
+                    "classifier": "local",
+                    "intent_confidence": round(confidence, 2),
+                    "classification_ms": int((time.perf_counter() - start) * 1000),
+                },
+            }
 
-        try:
-            client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
+        if settings.agent_pipeline == "single_call":
+            # The answering call will classify the message itself
+            return {
+                "intent": "",
+                "metadata": {
+                    "classifier": "single_call",
+                    "intent_confidence": round(confidence, 2),
+                },
+            }
 
+        model = model_for_tier(select_tier("classification"))
+        usage = TokenUsage()
+        try:
             prompt = INTENT_CLASSIFICATION_PROMPT.format(message=message)
-            response = await client.messages.create(
-                model=settings.llm_model,
+            response = await self.llm.create(
+                deadline=_deadline(state),
+                priority=guest_priority(state.get("booking")),
+                model=model,
                 max_tokens=50,
                 messages=[{"role": "user", "content": prompt}],
             )
+            usage.add(response.usage)
 
             raw_intent = response.content[0].text.strip()
             intent = parse_llm_intent(raw_intent)
+            classifier = "llm"
             logger.info(f"LLM classified intent: {intent.value} (raw: {raw_intent})")
 
         except Exception as e:
             logger.warning(f"LLM intent classification failed: {e}, using fallback")
             intent = classify_intent_fallback(message)
+            classifier = (
+                "breaker_fallback" if isinstance(e, CircuitOpenError) else "fallback"
+            )
 
-        return {"intent": intent.value}
+        classification_ms = (time.perf_counter() - start) * 1000
+        intent_stats.record_llm(classification_ms)
+
+        return {
+            "intent": intent.value,
+            "metadata": {
+                "classifier": classifier,
+                "intent_confidence": round(confidence, 2),
+                "classification_ms": int(classification_ms),
+                "classification_model": model,
+                "classification_usage": usage.to_dict(),
+                "classification_cost_usd": estimate_cost_usd(model, usage),
+            },
+        }
+
+    async def _join_context(self, state: AgentState) -> dict:
+        """Join point of the speculative fan-out: record the overlap achieved."""
+        metadata = state.get("metadata") or {}
+        prepare_ms = int((time.perf_counter() - state["started_at"]) * 1000)
+        sequential_ms = metadata.get("context_ms", 0) + metadata.get(
+            "classification_ms", 0
+        )
+        return {
+            "metadata": {
+                "prepare_ms": prepare_ms,
+                "overlap_ms": max(0, sequential_ms - prepare_ms),
+            }
+        }
 
     def _route_by_intent(self, state: AgentState) -> str:
-        """Route to the appropriate handler based on intent."""
-        return state["intent"]
+        """Route to the appropriate handler based on intent.
+
+        An empty intent means classification was deferred to the single-call
+        handler.
+        """
+        return state["intent"] or "single_call"
 
     async def _handle_greeting(self, state: AgentState) -> dict:
         """Handle greeting messages."""
@@ -188,63 +530,230 @@ class HotelAgent:
             )
         return {"response": greeting, "metadata": {"handler": "greeting"}}
 
-    async def _handle_booking(self, state: AgentState) -> dict:
+    async def _handle_booking(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle booking-related queries using the LLM with tools."""
         logger.info("Handling booking_info intent")
-        return await self._llm_with_tools(state, "booking_info")
+        return await self._llm_with_tools(state, "booking_info", _turn(config))
 
-    async def _handle_new_booking(self, state: AgentState) -> dict:
+    async def _handle_new_booking(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle new booking requests (availability, prices, reservations)."""
         logger.info("Handling new_booking intent")
-        return await self._llm_with_tools(state, "new_booking")
+        return await self._llm_with_tools(state, "new_booking", _turn(config))
 
-    async def _handle_amenities(self, state: AgentState) -> dict:
+    async def _handle_amenities(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle amenity queries using the LLM with tools."""
         logger.info("Handling amenities_query intent")
-        return await self._llm_with_tools(state, "amenities_query")
+        return await self._cached_llm_with_tools(
+            state, "amenities_query", _turn(config)
+        )
 
-    async def _handle_service_request(self, state: AgentState) -> dict:
+    async def _handle_service_request(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle service requests using the LLM with tools."""
         logger.info("Handling service_request intent")
-        return await self._llm_with_tools(state, "service_request")
+        return await self._llm_with_tools(state, "service_request", _turn(config))
 
-    async def _handle_faq(self, state: AgentState) -> dict:
+    async def _handle_faq(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle FAQ queries using the LLM with tools."""
         logger.info("Handling faq_general intent")
-        return await self._llm_with_tools(state, "faq_general")
+        return await self._cached_llm_with_tools(
+            state, "faq_general", _turn(config)
+        )
 
-    async def _handle_upselling(self, state: AgentState) -> dict:
+    async def _handle_upselling(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle upselling queries using the LLM with tools."""
         logger.info("Handling upselling intent")
-        return await self._llm_with_tools(state, "upselling")
+        return await self._llm_with_tools(state, "upselling", _turn(config))
 
-    async def _handle_out_of_scope(self, state: AgentState) -> dict:
+    async def _handle_out_of_scope(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
         """Handle out-of-scope queries with escalation."""
         logger.info("Handling out_of_scope intent")
-        return await self._llm_with_tools(state, "out_of_scope")
+        return await self._llm_with_tools(state, "out_of_scope", _turn(config))
+
+    async def _handle_single_call(
+        self, state: AgentState, config: RunnableConfig
+    ) -> dict:
+        """Classify and answer in one LLM call (single_call pipeline)."""
+        logger.info("Handling message with single-call classification")
+        result = await self._llm_with_tools(
+            state, "single_call", _turn(config), single_call=True
+        )
+
+        if result.get("intent"):
+            result["metadata"]["classifier"] = "single_call"
+        else:
+            # The model skipped the tag (or the call failed): keyword fallback
+            intent = classify_intent_fallback(state["user_message"]).value
+            result["intent"] = intent
+            result["metadata"]["classifier"] = "single_call_fallback"
+            if "error" in result["metadata"]:
+                result["response"] = FALLBACK_RESPONSES.get(
+                    intent, DEFAULT_FALLBACK_RESPONSE
+                )
+        return result
 
     async def _generate_response(self, state: AgentState) -> dict:
-        """Final response formatting (passthrough, response already set)."""
+        """Final response formatting (response already set); records turn time."""
+        turn_ms = int((time.perf_counter() - state["started_at"]) * 1000)
         logger.info(
             f"Final response generated for conversation {state['conversation_id']} "
-            f"(intent={state['intent']})"
+            f"(intent={state['intent']}, {turn_ms}ms)"
         )
-        return {}
+        return {"metadata": {"turn_ms": turn_ms}}
 
     # --- LLM interaction ---
 
-    async def _llm_with_tools(self, state: AgentState, intent: str) -> dict:
-        """Call Claude with tools to handle a guest query."""
+    async def _cached_llm_with_tools(
+        self, state: AgentState, intent: str, turn: TurnContext
+    ) -> dict:
+        """``_llm_with_tools`` behind the answer cache.
+
+        Only self-contained questions (the message alone classifies
+        confidently as this intent) are cached. On a miss they are answered
+        from the question alone, without history, so nothing the guest said
+        earlier can reach the stored answer; guests with a booking get their
+        usual answer, which is never stored.
+        """
+        question = state["user_message"]
+        local_intent, confidence = score_intent(question)
+        if (
+            not settings.answer_cache_enabled
+            or intent not in CACHEABLE_INTENTS
+            or local_intent.value != intent
+            or confidence < settings.intent_fast_path_threshold
+        ):
+            return await self._llm_with_tools(state, intent, turn)
+
+        version = state["hotel_version"]
+        cached = self.answers.get(state["hotel_id"], version, intent, question)
+        if cached is not None:
+            logger.info(f"Answer cache hit for {intent}: '{question[:80]}'")
+            return {
+                "response": cached,
+                "metadata": {
+                    "handler": intent,
+                    "answer_cache": "hit",
+                    "latency_ms": 0,
+                },
+            }
+
+        if state.get("booking"):
+            result = await self._llm_with_tools(state, intent, turn)
+            result["metadata"]["answer_cache"] = "miss"
+            return result
+
+        result = await self._llm_with_tools({**state, "messages": []}, intent, turn)
+        metadata = result["metadata"]
+        metadata["answer_cache"] = "miss"
+        if (
+            result["response"]
+            and "error" not in metadata
+            and not _used_writes(metadata)
+        ):
+            self.answers.put(
+                state["hotel_id"], version, intent, question, result["response"]
+            )
+        return result
+
+    async def _llm_with_tools(
+        self,
+        state: AgentState,
+        intent: str,
+        turn: TurnContext,
+        single_call: bool = False,
+    ) -> dict:
+        """Call Claude with tools to handle a guest query.
+
+        The model tier comes from the routing table. If the fast model fails
+        to finish its tool loop (and wrote nothing), the turn is retried on
+        the large model. With ``single_call`` the model also reports the
+        intent through an ``<intent>`` tag, returned as ``intent``.
+        """
+        tier = select_tier(intent, len(state.get("messages", [])))
+        result = await self._llm_attempt(state, intent, turn, single_call, tier)
+        attempts = [result]
+
+        metadata = result["metadata"]
+        if (
+            tier == FAST
+            and metadata.get("incomplete")
+            and not _used_writes(metadata)
+            and not metadata.get("circuit_open")
+            and time.perf_counter() < _deadline(state)
+        ):
+            logger.warning(
+                f"{model_for_tier(FAST)} did not complete the {intent} tool loop, "
+                f"escalating to {model_for_tier(LARGE)}"
+            )
+            result = await self._llm_attempt(state, intent, turn, single_call, LARGE)
+            result["metadata"]["escalated_from"] = FAST
+            attempts.append(result)
+
+        usage = TokenUsage()
+        tool_ms: dict[str, int] = {}
+        for attempt in attempts:
+            usage.merge(TokenUsage(**attempt["metadata"]["usage"]))
+            for name, ms in attempt["metadata"]["tool_ms"].items():
+                tool_ms[name] = tool_ms.get(name, 0) + ms
+        result["metadata"]["usage"] = usage.to_dict()
+        result["metadata"]["tool_ms"] = tool_ms
+        result["metadata"]["cost_usd"] = round(
+            sum(attempt["metadata"]["cost_usd"] for attempt in attempts), 6
+        )
+        result["metadata"]["tier_attempts"] = [
+            {
+                key: attempt["metadata"][key]
+                for key in ("model_tier", "model", "latency_ms", "cost_usd")
+            }
+            for attempt in attempts
+        ]
+        return result
+
+    async def _llm_attempt(
+        self,
+        state: AgentState,
+        intent: str,
+        turn: TurnContext,
+        single_call: bool,
+        tier: str,
+    ) -> dict:
+        """Run the tool loop once on ``tier``'s model.
+
+        ``incomplete`` in the metadata flags a failed call, or a loop that
+        ended without a text answer.
+        """
         start_time = time.time()
+        model = model_for_tier(tier)
+        usage = TokenUsage()
+        llm_rounds = 0
+        reported_intent: Intent | None = None
+        stream_stats: dict[str, int] = {}
+        tool_calls: list[dict] = []
 
         try:
-            client = anthropic.AsyncAnthropic(api_key=settings.anthropic_api_key)
-
-            # Build system prompt with hotel info
+            # Build system prompt with the intent's slice of the hotel info
+            # (precomputed fragments, byte-identical across calls so the
+            # prefix stays cacheable)
             hotel_info = state.get("hotel_info") or {}
+            hotel_block = hotel_contexts.get(
+                hotel_info, state.get("hotel_version") or None
+            ).for_intent(intent)
             system = SYSTEM_PROMPT.format(
                 hotel_name=hotel_info.get("name", "Hotel Palermo Soho"),
-                hotel_info=json.dumps(hotel_info, ensure_ascii=False, indent=2),
+                hotel_info=hotel_block,
             )
 
             # Build messages (history + current message)
@@ -253,136 +762,313 @@ class HotelAgent:
                 if msg["role"] in ("user", "assistant"):
                     messages.append({"role": msg["role"], "content": msg["content"]})
 
-            # Add booking context if available
+            caching = settings.prompt_caching_enabled
+            if caching and messages:
+                # Breakpoint at the end of history: everything before the
+                # current message is identical to the previous turn's prompt
+                messages[-1] = with_breakpoint(messages[-1])
+
+            messages.append({"role": "user", "content": state["user_message"]})
+
+            system_parts = [system]
+            if single_call:
+                system_parts.append(SINGLE_CALL_INSTRUCTIONS)
+            # Booking context goes in the system prompt, ahead of history, so
+            # the history prefix stays the same from one turn to the next
             booking = state.get("booking")
             if booking:
-                booking_context = (
-                    f"[Contexto interno - reserva encontrada para este huesped: "
-                    f"{json.dumps(booking, ensure_ascii=False)}]"
+                system_parts.append(
+                    "Contexto interno - reserva encontrada para este huesped:\n"
+                    + stable_json(booking, indent=None)
                 )
-                messages.append({"role": "user", "content": booking_context})
-                messages.append(
-                    {
-                        "role": "assistant",
-                        "content": "Entendido, tengo los datos de la reserva.",
-                    }
-                )
-
-            messages.append({"role": "user", "content": state["user_message"]})
+            tools = tools_for_intent(intent)
+            tool_tokens, full_tool_tokens = _tool_token_estimate(intent)
+            tools_widened = False
+            request = {
+                "model": model,
+                "max_tokens": 1024,
+                "system": (
+                    system_blocks(*system_parts)
+                    if caching
+                    else "\n\n".join(system_parts)
+                ),
+                "tools": cached_tools(tools) if caching else tools,
+            }
 
             # Call Claude with tools
-            response = await client.messages.create(
-                model=settings.llm_model,
-                max_tokens=1024,
-                system=system,
-                tools=TOOL_DEFINITIONS,
-                messages=messages,
+            response = await self._call_llm(
+                request, messages, state, turn, stream_stats, single_call
             )
+            usage.add(response.usage)
+            llm_rounds += 1
+            if single_call:
+                reported_intent, _ = extract_intent_tag(_response_text(response))
 
             # Process tool calls in a loop
             max_tool_rounds = 3
+            last_tool_message: dict | None = None
+            last_tool_index = 0
+            tool_wall_ms = 0
             for _round in range(max_tool_rounds):
                 if response.stop_reason != "tool_use":
                     break
 
                 # Execute tool calls
-                tool_results = []
-                for block in response.content:
-                    if block.type == "tool_use":
-                        tool_result = await self._execute_tool(
-                            block.name,
-                            block.input,
-                            state,
-                        )
-                        tool_results.append(
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": block.id,
-                                "content": json.dumps(
-                                    tool_result, ensure_ascii=False
-                                ),
-                            }
-                        )
+                tool_blocks = [b for b in response.content if b.type == "tool_use"]
+                wants_more = [
+                    b for b in tool_blocks if b.name == REQUEST_MORE_TOOLS["name"]
+                ]
+                if wants_more and not tools_widened:
+                    # The intent's subset lacks what the turn needs
+                    # (misclassified turn): offer every tool from here on
+                    logger.warning(
+                        f"Widening tools for {intent}: "
+                        f"{wants_more[0].input.get('reason', '')}"
+                    )
+                    tools_widened = True
+                    request["tools"] = (
+                        cached_tools(widened_tools()) if caching else widened_tools()
+                    )
+                round_start = time.perf_counter()
+                tool_results = await self._run_tool_calls(
+                    tool_blocks, state, turn, tool_calls, _round + 1
+                )
+                tool_wall_ms += int((time.perf_counter() - round_start) * 1000)
 
                 # Continue conversation with tool results
                 messages.append({"role": "assistant", "content": response.content})
-                messages.append({"role": "user", "content": tool_results})
-
-                response = await client.messages.create(
-                    model=settings.llm_model,
-                    max_tokens=1024,
-                    system=system,
-                    tools=TOOL_DEFINITIONS,
-                    messages=messages,
+                tool_message = {"role": "user", "content": tool_results}
+                if caching:
+                    # Rolling breakpoint on the latest tool results, so the
+                    # next round reads the earlier rounds from the cache
+                    if last_tool_message is not None:
+                        messages[last_tool_index] = last_tool_message
+                    last_tool_message, last_tool_index = tool_message, len(messages)
+                    tool_message = with_breakpoint(tool_message)
+                messages.append(tool_message)
+
+                response = await self._call_llm(
+                    request, messages, state, turn, stream_stats, single_call
                 )
+                usage.add(response.usage)
+                llm_rounds += 1
+                if single_call and reported_intent is None:
+                    reported_intent, _ = extract_intent_tag(_response_text(response))
 
             # Extract final text response
-            final_text = ""
-            for block in response.content:
-                if hasattr(block, "text"):
-                    final_text += block.text
+            final_text = _response_text(response)
+            if single_call:
+                _, final_text = extract_intent_tag(final_text)
+            # Out of tool rounds, or no answer: the caller may escalate
+            incomplete = response.stop_reason == "tool_use" or not final_text
 
             latency_ms = int((time.time() - start_time) * 1000)
-            logger.info(f"LLM response generated in {latency_ms}ms")
+            logger.info(
+                f"LLM response generated by {model} in {latency_ms}ms "
+                f"({len(tools)}/{len(TOOL_DEFINITIONS)} tools for {intent}, "
+                f"~{full_tool_tokens - tool_tokens} input tokens saved per call)"
+            )
 
-            return {
+            result = {
                 "response": final_text,
                 "metadata": {
                     "handler": intent,
                     "latency_ms": latency_ms,
-                    "model": settings.llm_model,
+                    "model": model,
+                    "model_tier": tier,
+                    "llm_rounds": llm_rounds,
+                    "usage": usage.to_dict(),
+                    "cost_usd": estimate_cost_usd(model, usage),
+                    "incomplete": incomplete,
+                    "tool_calls": tool_calls,
+                    "tool_ms": _tool_ms(tool_calls),
+                    "tool_wall_ms": tool_wall_ms,
+                    "tool_sum_ms": sum(call["ms"] for call in tool_calls),
+                    "tools_offered": len(tools),
+                    "tool_tokens_est": tool_tokens,
+                    "tool_tokens_saved_est": full_tool_tokens - tool_tokens,
+                    "tools_widened": tools_widened,
+                    "hotel_tokens_est": estimate_tokens(hotel_block),
+                    **stream_stats,
                 },
             }
+            if reported_intent is not None:
+                result["intent"] = reported_intent.value
+            return result
 
         except Exception as e:
             latency_ms = int((time.time() - start_time) * 1000)
             logger.error(f"LLM call failed after {latency_ms}ms: {e}")
 
             # Fallback response
-            fallback_responses = {
-                "booking_info": "Disculpa, no pude acceder a la informacion de tu reserva en este momento. Te recomiendo contactar a recepcion al +54 11 4833-1234.",
-                "new_booking": "Disculpa, no pude procesar tu consulta de disponibilidad en este momento. Para reservar, contacta a recepcion al +54 11 4833-1234.",
-                "amenities_query": "Disculpa, no pude obtener la informacion en este momento. Podes consultar en recepcion o llamar al +54 11 4833-1234.",
-                "service_request": "Disculpa, no pude procesar tu pedido automaticamente. Por favor comunicate con recepcion al +54 11 4833-1234.",
-                "faq_general": "Disculpa, no puedo responder tu consulta en este momento. Te recomiendo contactar a recepcion al +54 11 4833-1234.",
-                "upselling": "Disculpa, no pude obtener las ofertas en este momento. Consulta en recepcion por nuestros upgrades y promociones.",
-                "out_of_scope": "Esa consulta excede lo que puedo resolver. Te comunico con nuestro equipo de recepcion para que puedan ayudarte.",
-            }
             return {
-                "response": fallback_responses.get(
-                    intent,
-                    "Disculpa, tuve un problema tecnico. Por favor contacta a recepcion.",
-                ),
+                "response": FALLBACK_RESPONSES.get(intent, DEFAULT_FALLBACK_RESPONSE),
                 "metadata": {
                     "handler": intent,
                     "latency_ms": latency_ms,
+                    "model": model,
+                    "model_tier": tier,
+                    "llm_rounds": llm_rounds,
+                    "usage": usage.to_dict(),
+                    "cost_usd": estimate_cost_usd(model, usage),
+                    "tool_calls": tool_calls,
+                    "tool_ms": _tool_ms(tool_calls),
+                    "incomplete": True,
+                    "circuit_open": isinstance(e, CircuitOpenError),
                     "error": str(e),
                 },
             }
 
+    async def _call_llm(
+        self,
+        request: dict,
+        messages: list[dict],
+        state: AgentState,
+        turn: TurnContext,
+        stream_stats: dict[str, int],
+        single_call: bool,
+    ) -> Any:
+        """Send one tool-loop request, streaming text to the guest if asked.
+
+        With ``turn.on_text`` set, the Messages streaming API is used and the
+        callback receives the round's visible text so far (a failing callback
+        is dropped, never the call). The time to the first visible token
+        (from turn start) is stored in ``stream_stats``.
+        """
+        priority = guest_priority(state.get("booking"))
+        if turn.on_text is None:
+            return await self.llm.create(
+                deadline=_deadline(state),
+                priority=priority,
+                **request,
+                messages=messages,
+            )
+
+        text = ""
+        on_text = turn.on_text
+        async with self.llm.stream(
+            deadline=_deadline(state), priority=priority, **request, messages=messages
+        ) as stream:
+            async for delta in stream.text_stream:
+                text += delta
+                visible = _visible_text(text, single_call)
+                if not visible or on_text is None:
+                    continue
+                if "first_token_ms" not in stream_stats:
+                    stream_stats["first_token_ms"] = int(
+                        (time.perf_counter() - state["started_at"]) * 1000
+                    )
+                try:
+                    await on_text(visible)
+                except Exception as e:
+                    # Showing partial text is best effort: keep the answer
+                    logger.warning(f"on_text failed, not streaming this reply: {e}")
+                    on_text = None
+            return await stream.get_final_message()
+
+    async def _run_tool_calls(
+        self,
+        blocks: list[Any],
+        state: AgentState,
+        turn: TurnContext,
+        tool_calls: list[dict],
+        llm_round: int,
+    ) -> list[dict]:
+        """Execute the tool_use blocks of one model response.
+
+        Consecutive read-only tools run concurrently, each on its own
+        short-lived session and with a timeout. Writes run one at a time on
+        the turn session, in the order the model asked for them. Timings are
+        appended to ``tool_calls``.
+        """
+        results: dict[str, Any] = {}
+
+        async def run(block: Any, isolated: bool) -> None:
+            start = time.perf_counter()
+            if isolated:
+                async with turn.session_factory() as session:
+                    tools = AgentTools(
+                        PMSService(session), ConversationService(session), turn.hotel_id
+                    )
+                    try:
+                        result = await asyncio.wait_for(
+                            self._execute_tool(block.name, block.input, state, tools),
+                            timeout=settings.tool_timeout_seconds,
+                        )
+                    except asyncio.TimeoutError:
+                        logger.error(f"Tool {block.name} timed out")
+                        result = {"error": f"Tool '{block.name}' timed out"}
+            else:
+                result = await self._execute_tool(
+                    block.name, block.input, state, turn.tools
+                )
+            results[block.id] = result
+            tool_calls.append(
+                {
+                    "name": block.name,
+                    "round": llm_round,
+                    "ms": int((time.perf_counter() - start) * 1000),
+                }
+            )
+
+        batch: list[Any] = []
+        for block in blocks:
+            if block.name in META_TOOLS:
+                # No data access: runs without splitting the read-only batch
+                await run(block, isolated=False)
+                continue
+            if block.name in READ_ONLY_TOOLS and turn.session_factory is not None:
+                batch.append(block)
+                continue
+            if batch:
+                await asyncio.gather(*(run(b, isolated=True) for b in batch))
+                batch = []
+            await run(block, isolated=False)
+        if batch:
+            await asyncio.gather(*(run(b, isolated=True) for b in batch))
+
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": json.dumps(results[block.id], ensure_ascii=False),
+            }
+            for block in blocks
+        ]
+
     async def _execute_tool(
-        self, tool_name: str, tool_input: dict, state: AgentState
+        self,
+        tool_name: str,
+        tool_input: dict,
+        state: AgentState,
+        tools: AgentTools,
     ) -> Any:
         """Execute a tool call from the LLM."""
         logger.info(f"Executing tool: {tool_name} with input: {tool_input}")
+        if tool_name == REQUEST_MORE_TOOLS["name"]:
+            # The tool loop has already widened the request's tools
+            return {
+                "success": True,
+                "message": "Ya tenes todas las herramientas del hotel disponibles",
+            }
 
         tool_map = {
-            "get_booking_details": lambda: self.tools.get_booking_details(
+            "get_booking_details": lambda: tools.get_booking_details(
                 tool_input["confirmation_number"]
             ),
-            "get_booking_by_phone": lambda: self.tools.get_booking_by_phone(
+            "get_booking_by_phone": lambda: tools.get_booking_by_phone(
                 tool_input["phone"]
             ),
-            "get_hotel_amenities": lambda: self.tools.get_hotel_amenities(),
-            "get_hotel_policies": lambda: self.tools.get_hotel_policies(),
-            "search_faq": lambda: self.tools.search_faq(tool_input["query"]),
-            "get_room_types": lambda: self.tools.get_room_types(),
-            "check_availability": lambda: self.tools.check_availability(
+            "get_hotel_amenities": lambda: tools.get_hotel_amenities(),
+            "get_hotel_policies": lambda: tools.get_hotel_policies(),
+            "search_faq": lambda: tools.search_faq(tool_input["query"]),
+            "get_room_types": lambda: tools.get_room_types(),
+            "check_availability": lambda: tools.check_availability(
                 tool_input["checkin"],
                 tool_input["checkout"],
                 tool_input["num_guests"],
             ),
-            "create_booking": lambda: self.tools.create_booking(
+            "create_booking": lambda: tools.create_booking(
                 guest_name=tool_input["guest_name"],
                 guest_phone=tool_input["guest_phone"],
                 guest_email=tool_input.get("guest_email"),
@@ -392,20 +1078,20 @@ class HotelAgent:
                 num_guests=tool_input["num_guests"],
                 special_requests=tool_input.get("special_requests"),
             ),
-            "create_service_request": lambda: self.tools.create_service_request(
+            "create_service_request": lambda: tools.create_service_request(
                 tool_input["booking_id"],
                 tool_input["request_type"],
                 tool_input["details"],
             ),
-            "get_upsell_offers": lambda: self.tools.get_upsell_offers(
+            "get_upsell_offers": lambda: tools.get_upsell_offers(
                 tool_input.get("booking_id"),
             ),
-            "respond_to_upsell": lambda: self.tools.respond_to_upsell(
+            "respond_to_upsell": lambda: tools.respond_to_upsell(
                 tool_input["booking_id"],
                 tool_input["offer_id"],
                 tool_input["accepted"],
             ),
-            "escalate_to_human": lambda: self.tools.escalate_to_human(
+            "escalate_to_human": lambda: tools.escalate_to_human(
                 tool_input.get("conversation_id", state["conversation_id"]),
                 tool_input["reason"],
             ),
@@ -431,10 +1117,16 @@ class HotelAgent:
         user_message: str,
         guest_phone: str,
         conversation_id: uuid.UUID,
+        pms: PMSService,
+        conversation_service: ConversationService,
+        hotel_id: uuid.UUID,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+        on_text: Callable[[str], Awaitable[None]] | None = None,
     ) -> dict:
         """Process a guest message and return a response.
 
-        This is the main entry point for the agent.
+        This is the main entry point for the agent. The services are bound to
+        the caller's DB session and only live for this turn.
         """
         logger.info(
             f"Processing message from {guest_phone} in conversation {conversation_id}"
@@ -444,20 +1136,65 @@ class HotelAgent:
             "user_message": user_message,
             "guest_phone": guest_phone,
             "conversation_id": str(conversation_id),
-            "hotel_id": str(self.hotel_id),
+            "hotel_id": str(hotel_id),
+            "started_at": time.perf_counter(),
             "intent": "",
             "booking": None,
+            "booking_loaded_at": None,
             "hotel_info": None,
+            "hotel_version": "",
             "messages": [],
+            "history_window": None,
             "response": "",
             "metadata": {},
         }
 
-        # Run the graph
-        result = await self.graph.ainvoke(initial_state)
+        turn = TurnContext(
+            pms=pms,
+            conversation_service=conversation_service,
+            hotel_id=hotel_id,
+            session_factory=session_factory,
+            on_text=on_text,
+        )
+
+        # Run the graph, adding up the time its queries spend in the database
+        with track_db() as db:
+            result = await self.graph.ainvoke(
+                initial_state, config={"configurable": {"turn": turn}}
+            )
 
+        metadata = result.get("metadata", {})
+        metadata["db_ms"] = int(db.ms)
+        metadata["db_queries"] = db.queries
+
+        # Turn totals: the answering rounds plus the classification call
+        usage = TokenUsage(**metadata.get("usage", {}))
+        usage.merge(TokenUsage(**metadata.get("classification_usage", {})))
+        cost_usd = round(
+            metadata.get("cost_usd", 0.0)
+            + metadata.get("classification_cost_usd", 0.0),
+            6,
+        )
+        metadata["turn_usage"] = usage.to_dict()
+        metadata["turn_cost_usd"] = cost_usd
         return {
             "response": result.get("response", ""),
             "intent": result.get("intent", ""),
-            "metadata": result.get("metadata", {}),
+            "metadata": metadata,
+            "model": metadata.get("model") or metadata.get("classification_model"),
+            "usage": usage.to_dict(),
+            "cost_usd": cost_usd,
+            "checkpoint": _turn_checkpoint(result, turn),
         }
+
+
+_agent: HotelAgent | None = None
+
+
+def get_agent() -> HotelAgent:
+    """Return the process-wide agent, compiling its graph on first use."""
+    global _agent
+    if _agent is None:
+        _agent = HotelAgent(client=get_llm_client())
+        logger.info("Hotel agent graph compiled")
+    return _agent
@@ -0,0 +1,196 @@
+"""Token-budgeted conversation history with a rolling summary.
+
+Recent messages are replayed verbatim up to ``history_token_budget``; older
+ones are folded into a summary stored on the ``Conversation``. The summary is
+updated in a background task after each turn, off the reply path.
+"""
+
+import asyncio
+import uuid
+from typing import Any
+
+import anthropic
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.agent.admission import PRIORITY_BACKGROUND
+from src.agent.llm_client import get_llm_client
+from src.agent.prompts import HISTORY_SUMMARY_PROMPT
+from src.agent.resilience import ResilientLLM
+from src.agent.routing import model_for_tier, select_tier
+from src.agent.tokens import estimate_tokens
+from src.config import settings
+from src.services.conversation_service import ConversationService
+
+SUMMARY_ACK = "Entendido, tengo en cuenta el resumen."
+
+
+def recent_window(messages: list[dict], budget: int) -> int:
+    """Number of trailing messages that fit in ``budget`` tokens.
+
+    The newest message is always kept, even if it alone exceeds the budget.
+    """
+    used = 0
+    count = 0
+    for msg in reversed(messages):
+        used += estimate_tokens(msg["content"])
+        if count and used > budget:
+            break
+        count += 1
+    return count
+
+
+def build_history(
+    window: dict, budget: int | None = None
+) -> tuple[list[dict], dict]:
+    """Build the replayed history from ``ConversationService.get_history_window``.
+
+    Returns the messages (the summary as a leading user/assistant pair, then
+    the unsummarized recent messages within the budget) and stats for the
+    turn metadata.
+    """
+    budget = settings.history_token_budget if budget is None else budget
+    messages = window["messages"]
+    summary = window.get("summary")
+
+    # Absolute index of the first loaded message; skip the summarized ones
+    first_index = window.get("total", len(messages)) - len(messages)
+    skip = max(0, window.get("summarized_count", 0) - first_index)
+    pending = messages[skip:]
+    keep = recent_window(pending, budget)
+    recent = pending[len(pending) - keep :]
+
+    history: list[dict] = []
+    if summary:
+        history.append(
+            {
+                "role": "user",
+                "content": f"[Resumen de la conversacion anterior: {summary}]",
+                "intent": None,
+                "summary": True,
+            }
+        )
+        history.append(
+            {
+                "role": "assistant",
+                "content": SUMMARY_ACK,
+                "intent": None,
+                "summary": True,
+            }
+        )
+    history.extend(recent)
+
+    stats = {
+        "history_messages": len(recent),
+        "history_dropped": len(pending) - keep,
+        "history_summarized": bool(summary),
+        "history_tokens_est": sum(estimate_tokens(m["content"]) for m in history),
+    }
+    return history, stats
+
+
+def _transcript(messages: list[dict]) -> str:
+    labels = {"user": "Huesped", "assistant": "Velora"}
+    return "\n".join(
+        f"{labels.get(msg['role'], msg['role'])}: {msg['content']}" for msg in messages
+    )
+
+
+class HistorySummarizer:
+    """Folds messages that fell out of the history budget into the summary."""
+
+    def __init__(self, client: anthropic.AsyncAnthropic | None = None) -> None:
+        self.client = client
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+    def schedule(
+        self,
+        conversation_id: uuid.UUID,
+        session_factory: async_sessionmaker[AsyncSession],
+    ) -> asyncio.Task | None:
+        """Update the summary in the background (one task per conversation)."""
+        if not settings.history_summary_enabled:
+            return None
+        running = self._tasks.get(conversation_id)
+        if running is not None and not running.done():
+            # The next turn's update picks up whatever this one misses
+            return running
+        task = asyncio.create_task(self._run(conversation_id, session_factory))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(conversation_id, None))
+        return task
+
+    async def wait_idle(self) -> None:
+        """Wait for the scheduled updates to finish (shutdown, benchmarks)."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _run(
+        self,
+        conversation_id: uuid.UUID,
+        session_factory: async_sessionmaker[AsyncSession],
+    ) -> None:
+        try:
+            await self.update(conversation_id, session_factory)
+        except Exception as e:
+            logger.error(f"Summary update failed for {conversation_id}: {e}")
+
+    async def update(
+        self,
+        conversation_id: uuid.UUID,
+        session_factory: async_sessionmaker[AsyncSession],
+    ) -> bool:
+        """Fold the unsummarized messages outside the budget into the summary.
+
+        Returns True if the summary was updated.
+        """
+        async with session_factory() as session:
+            service = ConversationService(session)
+            window = await service.get_history_window(conversation_id, limit=1)
+            summarized = window["summarized_count"]
+            pending = await service.get_messages_after(conversation_id, summarized)
+
+            # Keep what the next turn will replay: within the token budget and
+            # the loaded window
+            keep = min(
+                recent_window(pending, settings.history_token_budget),
+                settings.max_conversation_history,
+            )
+            fold = pending[: len(pending) - keep]
+            if len(fold) < settings.history_summary_min_messages:
+                return False
+
+            summary = await self._summarize(window["summary"], fold)
+            if not summary:
+                return False
+            await service.update_summary(
+                conversation_id, summary, summarized + len(fold)
+            )
+            logger.info(
+                f"Folded {len(fold)} messages into the summary of "
+                f"conversation {conversation_id}"
+            )
+            return True
+
+    async def _summarize(self, summary: str | None, messages: list[dict]) -> str:
+        llm = ResilientLLM(self.client or get_llm_client())
+        response: Any = await llm.create(
+            priority=PRIORITY_BACKGROUND,
+            model=model_for_tier(select_tier("summary")),
+            max_tokens=settings.history_summary_max_tokens,
+            messages=[
+                {
+                    "role": "user",
+                    "content": HISTORY_SUMMARY_PROMPT.format(
+                        summary=summary or "(sin resumen previo)",
+                        messages=_transcript(messages),
+                    ),
+                }
+            ],
+        )
+        return "".join(
+            block.text for block in response.content if hasattr(block, "text")
+        ).strip()
+
+
+history_summarizer = HistorySummarizer()
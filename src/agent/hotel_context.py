@@ -0,0 +1,128 @@
+"""Hotel data helpers shared by the prompt and answer caches.
+
+The hotel block of the system prompt is kept as precomputed, compact
+per-section fragments. Each intent includes only the sections it needs, and
+the fragments are rebuilt only when the hotel record changes.
+"""
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from src.agent.prompt_cache import stable_json
+
+HOTEL_FIELDS = (
+    "name",
+    "description",
+    "address",
+    "contact_phone",
+    "amenities",
+    "policies",
+    "faq",
+)
+SECTIONS = ("profile", "amenities", "policies", "faq")
+
+# Sections of the hotel data each intent's prompt includes. Intents not listed
+# (e.g. the single-call pipeline) get every section.
+INTENT_SECTIONS: dict[str, tuple[str, ...]] = {
+    "booking_info": ("profile", "policies"),
+    "new_booking": ("profile", "policies"),
+    "amenities_query": ("profile", "amenities", "policies"),
+    "service_request": ("profile", "amenities", "policies"),
+    "faq_general": ("profile", "faq", "policies", "amenities"),
+    "upselling": ("profile", "amenities"),
+    "out_of_scope": ("profile",),
+}
+
+
+def hotel_data_version(hotel_info: dict | None) -> str:
+    """Short hash of the guest-facing hotel data.
+
+    Anything derived from these fields is stale once the hash changes.
+    """
+    if not hotel_info:
+        return ""
+    payload = stable_json(
+        {key: hotel_info.get(key) for key in HOTEL_FIELDS}, indent=None
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _render_faq(faq: list[dict]) -> str:
+    return "\n".join(
+        f"- P: {item.get('question', '')}\n  R: {item.get('answer', '')}"
+        for item in faq
+    )
+
+
+@dataclass(frozen=True)
+class HotelPromptFragments:
+    """Compact prompt fragments for one version of a hotel record."""
+
+    version: str
+    sections: dict[str, str]
+
+    @classmethod
+    def build(
+        cls, hotel_info: dict, version: str | None = None
+    ) -> "HotelPromptFragments":
+        profile = {
+            key: hotel_info[key]
+            for key in ("name", "description", "address", "contact_phone")
+            if hotel_info.get(key)
+        }
+        amenities = hotel_info.get("amenities") or {}
+        policies = hotel_info.get("policies") or {}
+        sections = {
+            "profile": f"Hotel: {stable_json(profile, indent=None)}",
+            "amenities": f"Amenities: {stable_json(amenities, indent=None)}",
+            "policies": f"Politicas: {stable_json(policies, indent=None)}",
+            "faq": f"FAQ:\n{_render_faq(hotel_info.get('faq') or [])}",
+        }
+        return cls(
+            version=version if version is not None else hotel_data_version(hotel_info),
+            sections=sections,
+        )
+
+    def render(self, sections: Iterable[str] = SECTIONS) -> str:
+        """Join the requested sections in canonical order."""
+        wanted = set(sections)
+        return "\n".join(self.sections[name] for name in SECTIONS if name in wanted)
+
+    def for_intent(self, intent: str) -> str:
+        """The hotel block for ``intent``'s system prompt."""
+        return self.render(INTENT_SECTIONS.get(intent, SECTIONS))
+
+
+class HotelContextStore:
+    """Per-hotel fragment store, rebuilt when the record's version changes."""
+
+    def __init__(self) -> None:
+        self._fragments: dict[str, HotelPromptFragments] = {}
+        self.builds = 0
+
+    def get(
+        self, hotel_info: dict | None, version: str | None = None
+    ) -> HotelPromptFragments:
+        """Return the fragments for ``hotel_info``, building them if stale.
+
+        Pass the record's ``version`` when it is already known (the agent
+        computes it once per turn) to skip hashing the record again.
+        """
+        if not hotel_info:
+            return HotelPromptFragments.build({}, version="")
+        if version is None:
+            version = hotel_data_version(hotel_info)
+        key = str(hotel_info.get("id", ""))
+        fragments = self._fragments.get(key)
+        if fragments is None or fragments.version != version:
+            fragments = HotelPromptFragments.build(hotel_info, version)
+            self._fragments[key] = fragments
+            self.builds += 1
+        return fragments
+
+    def clear(self) -> None:
+        self._fragments.clear()
+
+
+hotel_contexts = HotelContextStore()
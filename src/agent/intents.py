@@ -1,5 +1,7 @@
 """Intent classification for guest messages."""
 
+import re
+import unicodedata
 from enum import Enum
 
 from loguru import logger
@@ -79,6 +81,151 @@ def classify_intent_fallback(message: str) -> Intent:
     return best_intent
 
 
+# Words that carry no intent signal, ignored when measuring keyword coverage
+STOPWORDS = {
+    "a", "al", "con", "cual", "cuales", "de", "del", "el", "en", "es", "esta",
+    "hay", "la", "las", "lo", "los", "me", "mi", "para", "por", "favor",
+    "que", "se", "su", "tienen", "tenes", "un", "una", "y", "o", "the", "is",
+    "do", "you", "have", "what", "time",
+}
+
+# Keywords common to many requests ("quiero cancelar", "tienen habitacion?"):
+# they still score, but never make the local classifier confident alone
+GENERIC_KEYWORDS = {
+    "habitacion", "room", "noche", "fecha", "necesito", "quiero", "podrian",
+    "pueden",
+}
+# Confidence cap when only generic keywords back the best intent
+GENERIC_ONLY_CONFIDENCE = 0.5
+
+_KEYWORD_PATTERNS: dict[Intent, list[tuple[re.Pattern, int, bool]]] = {
+    intent: [
+        # Whole-word match, tolerating a plural suffix ("toalla" -> "toallas")
+        (
+            re.compile(rf"\b{re.escape(keyword)}(?:s|es)?\b"),
+            len(keyword.split()),
+            keyword not in GENERIC_KEYWORDS,
+        )
+        for keyword in keywords
+    ]
+    for intent, keywords in INTENT_KEYWORDS.items()
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip accents ("qué día" -> "que dia")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def content_tokens(text: str) -> list[str]:
+    """Words of an already normalized text, without stopwords."""
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def _previous_intent(history: list[dict] | None) -> Intent | None:
+    """Intent of the last assistant reply in the history, if any."""
+    for msg in reversed(history or []):
+        if msg.get("role") == "assistant" and msg.get("intent"):
+            try:
+                return Intent(msg["intent"])
+            except ValueError:
+                return None
+    return None
+
+
+def score_intent(
+    message: str, history: list[dict] | None = None
+) -> tuple[Intent, float]:
+    """Local keyword scoring classifier with a confidence in [0, 1].
+
+    Confidence combines how dominant the best intent is over the others with
+    how much of the message the matched keywords explain, so a bare "wifi?"
+    scores 1.0 while a long message with one stray keyword scores low.
+    Generic keywords alone ("quiero cancelar") are never confident. The
+    previous assistant intent from ``history`` breaks ties and carries over
+    to short follow-ups without keywords ("y a que hora cierra?").
+    """
+    text = normalize_text(message).strip()
+    tokens = content_tokens(text)
+
+    scores: dict[Intent, int] = {}
+    distinctive: set[Intent] = set()
+    matched_tokens: set[str] = set()
+    for intent, patterns in _KEYWORD_PATTERNS.items():
+        for pattern, weight, is_distinctive in patterns:
+            for match in pattern.finditer(text):
+                scores[intent] = scores.get(intent, 0) + weight
+                matched_tokens.update(_TOKEN_RE.findall(match.group(0)))
+                if is_distinctive:
+                    distinctive.add(intent)
+
+    previous = _previous_intent(history)
+
+    # A greeting alongside a real question is just politeness
+    if len(scores) > 1:
+        scores.pop(Intent.GREETING, None)
+
+    if not scores:
+        if (
+            previous is not None
+            and previous not in (Intent.GREETING, Intent.OUT_OF_SCOPE)
+            and 0 < len(tokens) <= 4
+        ):
+            return previous, 0.6
+        return Intent.OUT_OF_SCOPE, 0.0
+
+    if previous in scores:
+        scores[previous] += 1
+
+    best = max(scores, key=scores.get)  # type: ignore[arg-type]
+    share = scores[best] / sum(scores.values())
+    coverage = (
+        len([t for t in tokens if t in matched_tokens]) / len(tokens) if tokens else 1.0
+    )
+    confidence = share * min(1.0, 0.4 + coverage)
+    if best not in distinctive:
+        confidence = min(confidence, GENERIC_ONLY_CONFIDENCE)
+
+    logger.debug(f"Local classification: '{text}' -> {best.value} ({confidence:.2f})")
+    return best, confidence
+
+
+class IntentClassifierStats:
+    """Process-wide counters for the local fast path vs the LLM classifier."""
+
+    def __init__(self) -> None:
+        self.local_hits = 0
+        self.llm_calls = 0
+        self.llm_latency_ms_total = 0.0
+
+    def record_local(self) -> None:
+        self.local_hits += 1
+
+    def record_llm(self, latency_ms: float) -> None:
+        self.llm_calls += 1
+        self.llm_latency_ms_total += latency_ms
+
+    def snapshot(self) -> dict:
+        total = self.local_hits + self.llm_calls
+        avg_llm_ms = (
+            self.llm_latency_ms_total / self.llm_calls if self.llm_calls else 0.0
+        )
+        return {
+            "local_hits": self.local_hits,
+            "llm_calls": self.llm_calls,
+            "hit_rate": round(self.local_hits / total, 3) if total else 0.0,
+            "avg_llm_latency_ms": int(avg_llm_ms),
+            # Each local hit skipped one LLM round trip of average latency
+            "latency_saved_ms": int(self.local_hits * avg_llm_ms),
+        }
+
+
+intent_stats = IntentClassifierStats()
+
+
 def parse_llm_intent(raw: str) -> Intent:
     """Parse the LLM's intent classification response into an Intent enum."""
     cleaned = raw.strip().lower().replace(" ", "_")
@@ -93,3 +240,24 @@ def parse_llm_intent(raw: str) -> Intent:
 
         logger.warning(f"Could not parse LLM intent: '{raw}', using fallback")
         return Intent.OUT_OF_SCOPE
+
+
+_INTENT_TAG_RE = re.compile(r"<intent>\s*([a-zA-Z_ ]+?)\s*</intent>\s*")
+
+
+def extract_intent_tag(text: str) -> tuple[Intent | None, str]:
+    """Split a single-call reply into (reported intent, text for the guest).
+
+    The model prefixes its answer with ``<intent>name</intent>``; the tag is
+    removed from the text whether or not the name is a valid intent.
+    """
+    match = _INTENT_TAG_RE.search(text)
+    if match is None:
+        return None, text
+
+    cleaned = (text[: match.start()] + text[match.end() :]).strip()
+    try:
+        return Intent(match.group(1).strip().lower().replace(" ", "_")), cleaned
+    except ValueError:
+        logger.warning(f"Unknown intent in single-call tag: '{match.group(1)}'")
+        return None, cleaned
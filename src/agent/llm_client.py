@@ -0,0 +1,61 @@
+"""Process-wide Anthropic client with a pooled, keep-alive HTTP transport.
+
+A single client is created at startup and shared by every agent turn, so
+requests reuse warm TLS connections instead of opening a new pool per call.
+"""
+
+import anthropic
+import httpx
+from loguru import logger
+
+from src.config import settings
+
+_client: anthropic.AsyncAnthropic | None = None
+
+
+def create_llm_client() -> anthropic.AsyncAnthropic:
+    """Build an Anthropic client configured from settings."""
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.llm_timeout_seconds,
+            connect=settings.llm_connect_timeout_seconds,
+        ),
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        base_url=settings.anthropic_base_url or None,
+        max_retries=settings.llm_max_retries,
+        http_client=http_client,
+    )
+
+
+def init_llm_client() -> anthropic.AsyncAnthropic:
+    """Create the shared client (called from the app startup hook)."""
+    global _client
+    if _client is None:
+        _client = create_llm_client()
+        logger.info(
+            f"LLM client pool initialized "
+            f"(max_connections={settings.llm_max_connections}, "
+            f"keepalive={settings.llm_max_keepalive_connections})"
+        )
+    return _client
+
+
+def get_llm_client() -> anthropic.AsyncAnthropic:
+    """Return the shared client, creating it lazily if startup didn't."""
+    return _client or init_llm_client()
+
+
+async def close_llm_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+        logger.info("LLM client pool closed")
@@ -0,0 +1,26 @@
+"""Per-model token prices, for cost estimates in turn metadata."""
+
+from src.agent.usage import TokenUsage
+
+# USD per million tokens: input, output, cache read, cache write (5 min TTL)
+MODEL_PRICES: dict[str, tuple[float, float, float, float]] = {
+    "claude-sonnet-4-20250514": (3.00, 15.00, 0.30, 3.75),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 0.08, 1.00),
+    "claude-haiku-4-5": (1.00, 5.00, 0.10, 1.25),
+    "claude-opus-4-20250514": (15.00, 75.00, 1.50, 18.75),
+}
+DEFAULT_PRICE = MODEL_PRICES["claude-sonnet-4-20250514"]
+
+
+def estimate_cost_usd(model: str, usage: TokenUsage) -> float:
+    """Estimated cost of ``usage`` on ``model`` (unknown models priced as Sonnet)."""
+    input_price, output_price, read_price, write_price = MODEL_PRICES.get(
+        model, DEFAULT_PRICE
+    )
+    cost = (
+        usage.input_tokens * input_price
+        + usage.output_tokens * output_price
+        + usage.cache_read_tokens * read_price
+        + usage.cache_write_tokens * write_price
+    ) / 1_000_000
+    return round(cost, 6)
@@ -0,0 +1,44 @@
+"""Prompt caching helpers (Anthropic cache_control breakpoints).
+
+The prompt prefix is laid out so it stays byte-identical between calls:
+tools -> system prompt (hotel block, then the guest's booking) ->
+conversation history. A breakpoint at the end of each section lets later
+calls, including the extra rounds of a tool loop, read that prefix from the
+cache.
+"""
+
+import json
+from typing import Any
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def stable_json(data: Any, indent: int | None = 2) -> str:
+    """Serialize deterministically so the cached prefix is byte-identical."""
+    return json.dumps(data, ensure_ascii=False, indent=indent, sort_keys=True)
+
+
+def cached_tools(tools: list[dict]) -> list[dict]:
+    """Return the tool list with a cache breakpoint on the last tool."""
+    if not tools:
+        return tools
+    return [*tools[:-1], {**tools[-1], "cache_control": EPHEMERAL}]
+
+
+def system_blocks(*texts: str) -> list[dict]:
+    """Build system content blocks, with a breakpoint after the last one."""
+    blocks: list[dict] = [{"type": "text", "text": text} for text in texts if text]
+    if blocks:
+        blocks[-1]["cache_control"] = EPHEMERAL
+    return blocks
+
+
+def with_breakpoint(message: dict) -> dict:
+    """Return a copy of ``message`` with a cache breakpoint on its last block."""
+    content = message["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [dict(block) for block in content]
+    blocks[-1]["cache_control"] = EPHEMERAL
+    return {"role": message["role"], "content": blocks}
@@ -44,21 +44,59 @@ Recorda: tu objetivo es resolver consultas rapidamente para que recepcion pueda
 enfocarse en casos complejos. Automatiza lo simple, escala lo complejo."""
 
 
-INTENT_CLASSIFICATION_PROMPT = """Clasifica el intent del siguiente mensaje de un huesped de hotel.
-
-Los intents posibles son:
-- booking_info: preguntas sobre su reserva existente (check-in/out, confirmacion, habitacion, fechas)
+INTENT_DEFINITIONS = """- booking_info: preguntas sobre su reserva existente (check-in/out, confirmacion, habitacion, fechas)
 - new_booking: quiere hacer una nueva reserva, consultar disponibilidad, precios o tipos de habitacion
 - amenities_query: preguntas sobre servicios del hotel (WiFi, desayuno, piscina, gym, parking, spa)
 - service_request: pedidos de servicio (toallas extra, late checkout, wake-up call, room service)
 - faq_general: preguntas generales (como llegar, mascotas, estacionamiento, lavanderia)
 - upselling: preguntas sobre upgrades, ofertas, promociones, mejoras de habitacion o servicios premium
 - greeting: saludos (hola, buenos dias, buenas tardes)
-- out_of_scope: cualquier cosa que no encaje en los anteriores
+- out_of_scope: cualquier cosa que no encaje en los anteriores"""
+
+
+INTENT_CLASSIFICATION_PROMPT = (
+    """Clasifica el intent del siguiente mensaje de un huesped de hotel.
+
+Los intents posibles son:
+"""
+    + INTENT_DEFINITIONS
+    + """
 
 Mensaje del huesped: "{message}"
 
 Responde UNICAMENTE con el nombre del intent, sin explicacion adicional."""
+)
+
+
+# Appended to the system prompt in single-call mode, where the same request
+# classifies the message and answers it.
+SINGLE_CALL_INSTRUCTIONS = (
+    """CLASIFICACION DEL MENSAJE:
+Clasifica el ultimo mensaje del huesped en uno de estos intents:
+"""
+    + INTENT_DEFINITIONS
+    + """
+
+Empeza SIEMPRE tu respuesta con la etiqueta <intent>NOMBRE_DEL_INTENT</intent> \
+y despues escribi el mensaje para el huesped. La etiqueta es interna y no se \
+muestra al huesped. Si necesitas usar herramientas, inclui la etiqueta en el \
+texto que acompana la primera llamada."""
+)
+
+
+# Folds older turns into the rolling conversation summary (background task).
+HISTORY_SUMMARY_PROMPT = """Actualiza el resumen de una conversacion entre un huesped y Velora, \
+la asistente virtual del hotel.
+
+Resumen actual:
+{summary}
+
+Mensajes nuevos:
+{messages}
+
+Escribi un resumen breve (maximo 5 lineas) con lo que el huesped pregunto o pidio, \
+datos relevantes (numero de confirmacion, fechas, habitacion, pedidos registrados) \
+y lo que quedo pendiente. Responde UNICAMENTE con el resumen."""
 
 
 FEW_SHOT_EXAMPLES = [
@@ -0,0 +1,152 @@
+"""Record and replay of the agent's Anthropic calls.
+
+``LLMRecorder`` wraps a real client and captures every ``messages.create``
+and ``messages.stream`` request with its response. ``ReplayClient`` serves
+those responses back by request fingerprint, so the full agent graph runs
+deterministically and offline (tests, the perf suite).
+
+Fingerprints hash the request with UUIDs and ISO dates masked: the seeded
+bookings move with today's date and conversations get fresh ids, which
+would otherwise break every recording the next day.
+"""
+
+import hashlib
+import json
+import re
+from collections import defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import anthropic
+
+_UUID = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?")
+
+
+class MissingRecording(KeyError):
+    """A replayed request has no recording (the prompt or flow changed)."""
+
+
+def to_json(value: Any) -> Any:
+    """JSON-compatible copy of a request or response (SDK models included)."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def request_fingerprint(request: dict) -> str:
+    """Stable hash of a ``messages`` request, ignoring ids and dates."""
+    text = json.dumps(to_json(request), sort_keys=True, ensure_ascii=False)
+    text = _ISO_DATE.sub("<date>", _UUID.sub("<uuid>", text))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class LLMRecorder:
+    """Anthropic client wrapper that records each request and response."""
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.recordings: list[dict] = []
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    @property
+    def requests(self) -> list[dict]:
+        return [recording["request"] for recording in self.recordings]
+
+    def _record(self, request: dict, response: Any) -> None:
+        self.recordings.append(
+            {
+                "fingerprint": request_fingerprint(request),
+                "request": to_json(request),
+                "response": to_json(response),
+            }
+        )
+
+    async def _create(self, **request: Any) -> Any:
+        response = await self.client.messages.create(**request)
+        self._record(request, response)
+        return response
+
+    @asynccontextmanager
+    async def _stream(self, **request: Any) -> AsyncIterator[Any]:
+        async with self.client.messages.stream(**request) as stream:
+            yield stream
+            # The caller consumed the stream: the snapshot is the full message
+            self._record(request, stream.current_message_snapshot)
+
+    def save(self, path: str | Path) -> None:
+        """Write the recordings as a JSON fixture."""
+        Path(path).write_text(
+            json.dumps(self.recordings, indent=1, ensure_ascii=False) + "\n",
+            encoding="utf-8",
+        )
+
+
+class _ReplayStream:
+    """Just enough of ``AsyncMessageStream`` for the agent's streaming path."""
+
+    def __init__(self, message: anthropic.types.Message) -> None:
+        self.current_message_snapshot = message
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        for block in self.current_message_snapshot.content:
+            if block.type == "text":
+                yield block.text
+
+    async def get_final_message(self) -> anthropic.types.Message:
+        return self.current_message_snapshot
+
+
+class ReplayClient:
+    """Serves recorded responses by request fingerprint.
+
+    Identical requests get their recordings in order; once those run out the
+    last one is repeated. Every served request is kept in ``requests`` so
+    callers can count rounds and measure prompt sizes; fingerprints with no
+    recording go to ``missing`` (the agent answers those with a fallback).
+    """
+
+    def __init__(self, recordings: list[dict]) -> None:
+        self._responses: dict[str, deque[dict]] = defaultdict(deque)
+        for recording in recordings:
+            self._responses[recording["fingerprint"]].append(recording["response"])
+        self.requests: list[dict] = []
+        self.missing: list[str] = []
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "ReplayClient":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def _serve(self, request: dict) -> anthropic.types.Message:
+        fingerprint = request_fingerprint(request)
+        responses = self._responses.get(fingerprint)
+        if not responses:
+            self.missing.append(fingerprint)
+            raise MissingRecording(
+                f"No recording for request {fingerprint} "
+                f"(model {request.get('model')}); re-record the fixture"
+            )
+        response = responses.popleft() if len(responses) > 1 else responses[0]
+        self.requests.append(to_json(request))
+        return anthropic.types.Message.model_validate(response)
+
+    async def _create(self, **request: Any) -> anthropic.types.Message:
+        return self._serve(request)
+
+    @asynccontextmanager
+    async def _stream(self, **request: Any) -> AsyncIterator[_ReplayStream]:
+        yield _ReplayStream(self._serve(request))
+
+    async def close(self) -> None:
+        pass
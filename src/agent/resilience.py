@@ -0,0 +1,416 @@
+"""Resilience layer for LLM calls: deadlines, retries, hedging and a breaker.
+
+Every Anthropic call made by the agent goes through ``ResilientLLM``:
+
+- each call waits for admission (concurrency and tokens-per-minute limits,
+  see ``admission``), then gets a timeout derived from the turn's remaining
+  latency budget;
+- transient errors (429 rate limited, 529 overloaded, other 5xx and
+  connection errors) are retried with jittered exponential backoff, as long
+  as the deadline allows; a stream is retried only until it opens;
+- optionally, a slow request is hedged with a second identical one (admitted
+  on its own, only when capacity is free) and the first to answer wins;
+- a process-wide circuit breaker opens after consecutive upstream failures,
+  so degraded periods are answered from local fallbacks without waiting.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anthropic
+from loguru import logger
+
+from src.agent.admission import (
+    PRIORITY_DEFAULT,
+    AdmissionController,
+    AdmissionTimeout,
+    llm_admission,
+)
+from src.agent.tokens import estimate_tokens
+from src.config import settings
+
+RETRYABLE_STATUS = frozenset({429, 529})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the breaker is open."""
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The turn's latency budget ran out before (or during) an LLM call."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.reset()
+
+    def reset(self) -> None:
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.recovery_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream (half-open lets one probe through)."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("LLM circuit breaker closed")
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """The probe ended without an upstream verdict; allow another one."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or (
+            self._opened_at is None and self._failures >= self.failure_threshold
+        ):
+            logger.warning(
+                f"LLM circuit breaker open after {self._failures} failures"
+            )
+            self._opened_at = time.monotonic()
+            self.opened_count += 1
+        self._probing = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened_count": self.opened_count,
+            "rejected_calls": self.rejected,
+        }
+
+
+def _status_code(error: BaseException) -> int | None:
+    return getattr(error, "status_code", None)
+
+
+def _is_call_timeout(error: BaseException) -> bool:
+    """A call's own timeout fired (not admission, not an exhausted budget)."""
+    return isinstance(error, asyncio.TimeoutError) and not isinstance(
+        error, (DeadlineExceeded, AdmissionTimeout)
+    )
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Transient provider errors worth another attempt."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    status = _status_code(error)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Errors that say the provider is degraded (not that our request is bad)."""
+    if isinstance(error, (DeadlineExceeded, AdmissionTimeout)):
+        return False  # our own limits, not the provider's
+    return isinstance(error, asyncio.TimeoutError) or _is_retryable(error)
+
+
+def _retry_after(error: BaseException) -> float | None:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientLLM:
+    """Wraps an Anthropic client's ``messages`` API with the policies above."""
+
+    def __init__(
+        self,
+        client: Any,
+        breaker: CircuitBreaker | None = None,
+        admission: AdmissionController | None = None,
+    ) -> None:
+        self.client = client
+        self.breaker = breaker or llm_breaker
+        self.admission = admission or llm_admission
+
+    def remaining(self, deadline: float | None) -> float:
+        """Timeout for the next call: the per-call cap within the turn deadline."""
+        return self._call_timeout(deadline)[0]
+
+    def _call_timeout(self, deadline: float | None) -> tuple[float, bool]:
+        """``remaining`` and whether the turn budget (not the cap) sets it."""
+        if deadline is None:
+            return settings.llm_timeout_seconds, False
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise DeadlineExceeded("Turn latency budget exhausted")
+        if remaining < settings.llm_timeout_seconds:
+            return remaining, True
+        return settings.llm_timeout_seconds, False
+
+    def _timed_out(self, error: BaseException, budget_bound: bool) -> None:
+        """Account for a call timeout; a budget-bound one is a ``DeadlineExceeded``.
+
+        A slow turn running out of budget says nothing about the provider, so
+        it must not count as an upstream failure for the breaker.
+        """
+        if not _is_call_timeout(error):
+            return
+        if budget_bound:
+            deadline_error = DeadlineExceeded(
+                "Turn latency budget ran out during the LLM call"
+            )
+            self._record(deadline_error)
+            raise deadline_error from error
+        llm_stats.timeouts += 1
+
+    def _check_breaker(self) -> bool:
+        """Raise while the breaker is open; True if this call is the probe."""
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+        return probe
+
+    def _input_tokens(self, request: dict) -> int:
+        if self.admission.input_bucket.unlimited:
+            return 0
+        return sum(
+            estimate_tokens(request.get(key)) for key in ("system", "messages", "tools")
+        )
+
+    def _admit(
+        self, priority: int, request: dict, deadline: float | None
+    ) -> Any:
+        """Admission context for one request (waits at most until the deadline)."""
+        return self.admission.admit(
+            priority,
+            self._input_tokens(request),
+            request.get("max_tokens", 0),
+            timeout=self.remaining(deadline),
+        )
+
+    async def create(
+        self,
+        deadline: float | None = None,
+        priority: int = PRIORITY_DEFAULT,
+        **request: Any,
+    ) -> Any:
+        """``messages.create`` with admission, breaker, retries and hedging."""
+        probe = self._check_breaker()
+        try:
+            attempt = 0
+            while True:
+                budget_bound = False
+                try:
+                    async with self._admit(priority, request, deadline) as ticket:
+                        timeout, budget_bound = self._call_timeout(deadline)
+                        response = await self._hedged(
+                            lambda: self.client.messages.create(**request),
+                            timeout,
+                            request,
+                        )
+                        ticket.settle(getattr(response, "usage", None))
+                except Exception as e:
+                    self._timed_out(e, budget_bound)
+                    delay = self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        self._record(e)
+                        raise
+                    attempt += 1
+                    llm_stats.retries += 1
+                    logger.warning(
+                        f"LLM call failed ({e}), retry {attempt} in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return response
+        except BaseException:
+            if probe:
+                # Cancelled or out of budget: never leave the breaker half-open
+                self.breaker.release_probe()
+            raise
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        deadline: float | None = None,
+        priority: int = PRIORITY_DEFAULT,
+        **request: Any,
+    ) -> AsyncIterator[Any]:
+        """``messages.stream`` with admission, the breaker, retries and a timeout.
+
+        The whole stream must finish within the timeout. Opening the stream
+        is retried like ``create``; once it is open nothing is retried or
+        hedged, since text may already be on the guest's screen.
+        """
+        probe = self._check_breaker()
+        try:
+            attempt = 0
+            while True:
+                budget_bound = False
+                opened = False
+                try:
+                    async with self._admit(priority, request, deadline) as ticket:
+                        timeout, budget_bound = self._call_timeout(deadline)
+                        async with asyncio.timeout(timeout):
+                            async with self.client.messages.stream(**request) as stream:
+                                opened = True
+                                yield stream
+                        snapshot = getattr(stream, "current_message_snapshot", None)
+                        ticket.settle(getattr(snapshot, "usage", None))
+                except Exception as e:
+                    self._timed_out(e, budget_bound)
+                    delay = None if opened else self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        self._record(e)
+                        raise
+                    attempt += 1
+                    llm_stats.retries += 1
+                    logger.warning(
+                        f"LLM stream failed to open ({e}), "
+                        f"retry {attempt} in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                break
+        except BaseException:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+
+    def _record(self, error: BaseException) -> None:
+        """Feed a final error to the breaker.
+
+        Errors that are not upstream failures (e.g. a 400) still prove the
+        provider is answering.
+        """
+        if isinstance(error, (DeadlineExceeded, AdmissionTimeout)):
+            self.breaker.release_probe()
+        elif is_upstream_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _retry_delay(
+        self, error: BaseException, attempt: int, deadline: float | None
+    ) -> float | None:
+        """Backoff before the next attempt, or None to give up."""
+        if not _is_retryable(error):
+            return None
+        if attempt >= settings.llm_retry_attempts:
+            return None
+        delay = _retry_after(error)
+        if delay is None:
+            base = settings.llm_retry_base_seconds * (2**attempt)
+            delay = random.uniform(0, base)  # full jitter
+        if deadline is not None and time.perf_counter() + delay >= deadline:
+            return None
+        return delay
+
+    async def _hedged(
+        self, call: Callable[[], Awaitable[Any]], timeout: float, request: dict
+    ) -> Any:
+        """Run ``call``; if it is slow, race a second copy against it.
+
+        The copy is a request of its own: it is sent only if admission has a
+        slot and tokens free right now, otherwise the first call is awaited.
+        """
+        hedge_after = settings.llm_hedge_after_seconds
+        if hedge_after <= 0 or hedge_after >= timeout:
+            return await asyncio.wait_for(call(), timeout)
+
+        async with asyncio.timeout(timeout):
+            tasks = [asyncio.ensure_future(call())]
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if done:
+                    return tasks[0].result()
+
+                hedge_admission = self.admission.admit_now(
+                    self._input_tokens(request), request.get("max_tokens", 0)
+                )
+                async with hedge_admission as ticket:
+                    if ticket is None:
+                        llm_stats.hedges_skipped += 1
+                        return await tasks[0]
+
+                    llm_stats.hedges += 1
+                    tasks.append(asyncio.ensure_future(call()))
+                    pending = set(tasks)
+                    error: BaseException | None = None
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for task in done:
+                            if task.exception() is None:
+                                if task is tasks[1]:
+                                    usage = getattr(task.result(), "usage", None)
+                                    ticket.settle(usage)
+                                return task.result()
+                            error = task.exception()
+                    raise error  # both copies failed
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+
+class LLMCallStats:
+    """Process-wide counters for the resilience layer."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.timeouts = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "breaker": llm_breaker.snapshot(),
+            "admission": llm_admission.snapshot(),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedges_skipped": self.hedges_skipped,
+            "timeouts": self.timeouts,
+        }
+
+
+llm_breaker = CircuitBreaker(
+    failure_threshold=settings.llm_breaker_failure_threshold,
+    recovery_seconds=settings.llm_breaker_recovery_seconds,
+)
+llm_stats = LLMCallStats()
@@ -0,0 +1,25 @@
+"""Model routing: pick the model tier for an intent or call type."""
+
+from src.config import settings
+
+FAST = "fast"
+LARGE = "large"
+
+
+def model_for_tier(tier: str) -> str:
+    """Model name configured for ``tier``."""
+    return settings.llm_fast_model if tier == FAST else settings.llm_model
+
+
+def select_tier(route: str, history_len: int = 0) -> str:
+    """Tier for ``route`` (an intent, or 'classification' / 'summary').
+
+    Long conversations go to the large model: following a long thread is
+    where the fast model loses track first.
+    """
+    if not settings.model_routing_enabled:
+        return LARGE
+    tier = settings.model_routes.get(route, LARGE)
+    if tier == FAST and history_len > settings.model_route_large_history:
+        return LARGE
+    return tier
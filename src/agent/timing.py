@@ -0,0 +1,80 @@
+"""Per-turn latency breakdown: graph node timings and database time.
+
+``timed_node`` wraps a graph node and adds its wall time to ``node_ms`` in
+the turn metadata. Database time comes from SQLAlchemy cursor events and is
+added to the ``DBTimings`` of the running turn, held in a context variable
+so concurrent turns (and their concurrent queries) don't mix.
+"""
+
+import contextvars
+import functools
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class DBTimings:
+    """Query time summed over a turn (concurrent queries add up)."""
+
+    ms: float = 0.0
+    queries: int = 0
+
+
+_current_db: contextvars.ContextVar[DBTimings | None] = contextvars.ContextVar(
+    "turn_db_timings", default=None
+)
+
+
+@contextmanager
+def track_db() -> Iterator[DBTimings]:
+    """Collect the time of every query run inside the block (and its tasks)."""
+    timings = DBTimings()
+    token = _current_db.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_db.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_db.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current_db.get()
+    starts = conn.info.get("query_start")
+    if timings is not None and starts:
+        timings.ms += (time.perf_counter() - starts.pop()) * 1000
+        timings.queries += 1
+
+
+def timed_node(
+    name: str, node: Callable[..., Awaitable[dict]]
+) -> Callable[..., Awaitable[dict]]:
+    """Wrap a graph node so its update carries ``node_ms[name]``.
+
+    The wrapper keeps the node's signature, which LangGraph inspects to
+    decide whether to pass the run config.
+    """
+
+    @functools.wraps(node)
+    async def wrapper(*args, **kwargs) -> dict:
+        start = time.perf_counter()
+        update = dict(await node(*args, **kwargs) or {})
+        metadata = dict(update.get("metadata") or {})
+        metadata["node_ms"] = {
+            **metadata.get("node_ms", {}),
+            name: int((time.perf_counter() - start) * 1000),
+        }
+        update["metadata"] = metadata
+        return update
+
+    return wrapper
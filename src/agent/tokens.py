@@ -0,0 +1,25 @@
+"""Fast local token estimates for prompt budgeting.
+
+The estimate is a character heuristic (no tokenizer round-trip), good enough
+to compare prompt variants and to budget history. Spanish text and JSON come
+out at roughly 3.5 characters per token for Claude models.
+"""
+
+import json
+from typing import Any
+
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimate the token count of a string or JSON-serializable value."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        text = value
+    else:
+        # SDK content blocks and other objects count by their repr
+        text = json.dumps(value, ensure_ascii=False, default=str)
+    if not text:
+        return 0
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
@@ -297,6 +297,23 @@ class AgentTools:
             return {"success": False, "error": str(e)}
 
 
+# Tools that only read data: safe to run concurrently on separate sessions.
+# Everything else writes (bookings, service requests, upsell responses,
+# escalations) and runs in order on the turn session.
+READ_ONLY_TOOLS = frozenset(
+    {
+        "get_booking_details",
+        "get_booking_by_phone",
+        "get_hotel_amenities",
+        "get_hotel_policies",
+        "search_faq",
+        "get_room_types",
+        "check_availability",
+        "get_upsell_offers",
+    }
+)
+
+
 # Tool definitions for Claude tool_use format
 TOOL_DEFINITIONS = [
     {
@@ -549,3 +566,79 @@ TOOL_DEFINITIONS = [
         },
     },
 ]
+
+
+# Offered with every intent subset, so the model can ask for the full tool
+# set when the turn needs a tool the subset lacks (e.g. a misclassified
+# intent). The model can only call tools listed in the request.
+REQUEST_MORE_TOOLS = {
+    "name": "request_more_tools",
+    "description": (
+        "Habilita todas las herramientas del hotel. Usalo solo si ninguna de "
+        "las herramientas disponibles sirve para responder al huesped (por "
+        "ejemplo consultar disponibilidad, reservar o hacer un pedido)."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "reason": {
+                "type": "string",
+                "description": "Que necesitas hacer y no podes con las actuales",
+            },
+        },
+        "required": ["reason"],
+    },
+}
+
+# Tools that only steer the tool loop: they neither read nor write data
+META_TOOLS = frozenset({REQUEST_MORE_TOOLS["name"]})
+
+# Tools each intent's handler may need. escalate_to_human and
+# request_more_tools are always added, and intents not listed here (e.g. the
+# single-call pipeline) get every tool.
+INTENT_TOOLS: dict[str, tuple[str, ...]] = {
+    "booking_info": (
+        "get_booking_details",
+        "get_booking_by_phone",
+        "get_hotel_policies",
+    ),
+    "new_booking": ("get_room_types", "check_availability", "create_booking"),
+    "amenities_query": ("get_hotel_amenities", "get_hotel_policies", "search_faq"),
+    "service_request": (
+        "get_booking_details",
+        "get_booking_by_phone",
+        "create_service_request",
+    ),
+    "faq_general": ("search_faq", "get_hotel_policies", "get_hotel_amenities"),
+    "upselling": (
+        "get_booking_details",
+        "get_booking_by_phone",
+        "get_upsell_offers",
+        "respond_to_upsell",
+    ),
+    "out_of_scope": (),
+}
+ALWAYS_AVAILABLE_TOOLS = ("escalate_to_human",)
+
+
+def tools_for_intent(intent: str) -> list[dict]:
+    """Return the tool definitions sent to the model for ``intent``.
+
+    Definitions keep the order of ``TOOL_DEFINITIONS`` so each intent's tool
+    prefix is stable across calls (and cacheable).
+    """
+    names = INTENT_TOOLS.get(intent)
+    if names is None:
+        return TOOL_DEFINITIONS
+    allowed = {*names, *ALWAYS_AVAILABLE_TOOLS}
+    subset = [tool for tool in TOOL_DEFINITIONS if tool["name"] in allowed]
+    return [*subset, REQUEST_MORE_TOOLS]
+
+
+def widened_tools() -> list[dict]:
+    """Every tool, once the model called ``request_more_tools``.
+
+    ``request_more_tools`` stays listed, since earlier rounds of the turn
+    called it.
+    """
+    return [*TOOL_DEFINITIONS, REQUEST_MORE_TOOLS]
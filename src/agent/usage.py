@@ -0,0 +1,42 @@
+"""Token usage accounting for LLM calls."""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+
+def _as_int(value: Any) -> int:
+    """Coerce a usage field to int (missing or non-numeric values count as 0)."""
+    return value if isinstance(value, int) else 0
+
+
+@dataclass
+class TokenUsage:
+    """Token counts summed across the LLM rounds of a turn."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+
+    def add(self, usage: Any) -> None:
+        """Accumulate an Anthropic ``response.usage`` object."""
+        if usage is None:
+            return
+        self.input_tokens += _as_int(getattr(usage, "input_tokens", 0))
+        self.output_tokens += _as_int(getattr(usage, "output_tokens", 0))
+        self.cache_read_tokens += _as_int(
+            getattr(usage, "cache_read_input_tokens", 0)
+        )
+        self.cache_write_tokens += _as_int(
+            getattr(usage, "cache_creation_input_tokens", 0)
+        )
+
+    def merge(self, other: "TokenUsage") -> None:
+        """Accumulate another ``TokenUsage``."""
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_tokens += other.cache_read_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
@@ -50,6 +50,8 @@ class MetricsResponse(BaseModel):
     upsell_by_offer: list[UpsellOfferMetric] = []
     total_conversations_all_time: int = 0
     auto_resolved_all_time_pct: float = 0.0
+    latency_breakdown: dict = {}
+    runtime: dict = {}
 
 
 class ConversationListItem(BaseModel):
@@ -84,6 +86,15 @@ class ConversationDetail(BaseModel):
     messages: list[MessageDetail]
 
 
+class UsageMetrics(BaseModel):
+    days: int
+    totals: dict
+    by_intent: list[dict] = []
+    by_day: list[dict] = []
+    by_conversation: list[dict] = []
+
+
 class HealthResponse(BaseModel):
     status: str
     version: str
+    llm_breaker: dict = {}
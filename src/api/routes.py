@@ -6,25 +6,44 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
+from src.agent.answer_cache import answer_cache
+from src.agent.intents import intent_stats
+from src.agent.resilience import CircuitBreaker, llm_breaker, llm_stats
 from src.api.models import (
     ConversationDetail,
     ConversationListItem,
     HealthResponse,
     MetricsResponse,
+    UsageMetrics,
 )
 from src.database.database import get_session
 from src.services.analytics_service import AnalyticsService
+from src.services.conversation_cache import conversation_cache
 
 router = APIRouter()
 templates = Jinja2Templates(directory="dashboard/templates")
 
 
+def _runtime_metrics() -> dict:
+    """In-process agent counters (reset when the process restarts)."""
+    return {
+        "intent_classifier": intent_stats.snapshot(),
+        "answer_cache": answer_cache.snapshot(),
+        "conversation_cache": conversation_cache.snapshot(),
+        "llm": llm_stats.snapshot(),
+    }
+
+
 # --- Health ---
 
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    return HealthResponse(status="ok", version="0.1.0")
+    # Degraded, not down: while the LLM breaker is open guests still get
+    # keyword-routed template answers
+    breaker = llm_breaker.snapshot()
+    status = "ok" if breaker["state"] == CircuitBreaker.CLOSED else "degraded"
+    return HealthResponse(status=status, version="0.1.0", llm_breaker=breaker)
 
 
 # --- API endpoints (JSON) ---
@@ -35,7 +54,18 @@ async def get_metrics(session: AsyncSession = Depends(get_session)):
     logger.debug("API: fetching metrics")
     analytics = AnalyticsService(session)
     metrics = await analytics.get_dashboard_metrics()
-    return MetricsResponse(**metrics)
+    return MetricsResponse(**metrics, runtime=_runtime_metrics())
+
+
+@router.get("/api/usage", response_model=UsageMetrics)
+async def get_usage(
+    days: int = 30,
+    limit: int = 20,
+    session: AsyncSession = Depends(get_session),
+):
+    logger.debug(f"API: fetching LLM usage (days={days})")
+    analytics = AnalyticsService(session)
+    return UsageMetrics(**await analytics.get_usage_metrics(days=days, limit=limit))
 
 
 @router.get("/api/conversations", response_model=list[ConversationListItem])
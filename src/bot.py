@@ -1,8 +1,12 @@
 """Telegram bot entry point."""
 
+import asyncio
+import time
 import uuid
+from datetime import timedelta
 
-from telegram import Update
+from telegram import Message, Update
+from telegram.error import RetryAfter, TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -12,15 +16,100 @@ from telegram.ext import (
 )
 from loguru import logger
 
-from src.agent.core import HotelAgent
+from src.agent.core import get_agent
+from src.agent.history import history_summarizer
 from src.config import settings
 from src.database.database import async_session
 from src.database.models import MessageRole, Platform
 from src.database.seed import HOTEL_ID
+from src.inbox import ConversationMailbox, MessageDebouncer
+from src.services.conversation_cache import conversation_cache
 from src.services.conversation_service import ConversationService
 from src.services.pms_service import PMSService
 
 
+class TelegramReplyStreamer:
+    """Shows a streamed reply progressively by editing one Telegram message.
+
+    The first partial text is sent as a new reply; later updates edit it at
+    most once per ``telegram_edit_interval_seconds``, since Telegram
+    rate-limits edits. ``finish`` always leaves the full final text visible.
+    """
+
+    def __init__(self, source: Message) -> None:
+        self._source = source
+        self._sent: Message | None = None
+        self._shown = ""
+        self._last_edit = 0.0
+        self._failed = False
+
+    async def update(self, text: str) -> None:
+        """Show ``text`` (the reply so far) if the edit budget allows it."""
+        if self._failed:
+            return
+        if self._sent is None:
+            try:
+                self._sent = await self._source.reply_text(text)
+            except TelegramError as e:
+                # Stop streaming: ``finish`` sends the full reply instead
+                logger.warning(f"Could not send streamed message: {e}")
+                self._failed = True
+                return
+            self._shown = text
+            self._last_edit = time.monotonic()
+            return
+        elapsed = time.monotonic() - self._last_edit
+        if elapsed >= settings.telegram_edit_interval_seconds:
+            await self._edit(text)
+
+    async def finish(self, text: str) -> None:
+        """Make sure the final reply is shown in full.
+
+        The final edit waits out the edit interval (and any ``RetryAfter``
+        from Telegram); if it still fails, the full text is sent as a new
+        reply rather than leaving a truncated one.
+        """
+        if self._sent is None:
+            await self._source.reply_text(text)
+            return
+        if text == self._shown:
+            return
+        wait = settings.telegram_edit_interval_seconds - (
+            time.monotonic() - self._last_edit
+        )
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            try:
+                await self._sent.edit_text(text)
+            except RetryAfter as e:
+                await asyncio.sleep(_seconds(e.retry_after))
+                await self._sent.edit_text(text)
+            self._shown = text
+            return
+        except TelegramError as e:
+            logger.warning(f"Could not finish streamed message, replying: {e}")
+        await self._source.reply_text(text)
+
+    async def _edit(self, text: str) -> None:
+        if text == self._shown:
+            return
+        try:
+            await self._sent.edit_text(text)
+            self._shown = text
+        except TelegramError as e:
+            # Rate limited or message unchanged: the next edit catches up
+            logger.warning(f"Could not edit streamed message: {e}")
+        self._last_edit = time.monotonic()
+
+
+def _seconds(value: int | float | timedelta) -> float:
+    """``RetryAfter.retry_after`` in seconds (a timedelta in newer releases)."""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /start command."""
     logger.info(f"/start from user {update.effective_user.id}")
@@ -59,9 +148,13 @@ async def reset_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     logger.info(f"/reset from user {update.effective_user.id}")
     guest_phone = str(update.effective_user.id)
 
-    async with async_session() as session:
-        conv_service = ConversationService(session)
-        await conv_service.reset_conversation(guest_phone, HOTEL_ID)
+    async def reset() -> None:
+        async with async_session() as session:
+            conv_service = ConversationService(session)
+            await conv_service.reset_conversation(guest_phone, HOTEL_ID)
+
+    # Queued behind any turn still running for this guest
+    await conversation_mailbox.submit(_mailbox_key(guest_phone), reset)
 
     await update.message.reply_text(
         "Listo, reinicie la conversacion. Empecemos de nuevo!\n"
@@ -70,7 +163,11 @@ async def reset_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle incoming text messages."""
+    """Handle incoming text messages.
+
+    Messages are queued per guest; a burst of quick messages is answered
+    as a single agent turn once the guest pauses.
+    """
     user_message = update.message.text
     guest_phone = str(update.effective_user.id)
 
@@ -79,50 +176,83 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         if len(user_message) > 80
         else f"Message from {guest_phone}: '{user_message}'"
     )
+    message_debouncer.add(guest_phone, update.message)
+
+
+async def process_turn(guest_phone: str, messages: list[Message]) -> None:
+    """Persist a guest's messages and answer them with one agent turn.
+
+    The turn's writes (conversation, booking link, user and assistant
+    messages) are staged in the session and committed once, after the reply
+    has been sent, so the guest never waits on the database. Until then the
+    agent's history, read on separate sessions, holds only earlier turns.
+    Write tools commit the session themselves, taking the staged rows along.
+    """
+    source = messages[-1]
+    user_message = "\n".join(message.text for message in messages)
+
+    streamer = TelegramReplyStreamer(source) if settings.telegram_streaming else None
+
+    # Reads run on a short-lived session, so no pooled connection is held
+    # while the agent waits on the LLM. What they staged (a new conversation,
+    # or a timed-out one being closed) moves to the turn's session below
+    lookup_start = time.perf_counter()
+    async with async_session() as lookup:
+        with lookup.no_autoflush:
+            conversation = await ConversationService(lookup).get_or_create_conversation(
+                guest_phone=guest_phone,
+                hotel_id=HOTEL_ID,
+                platform=Platform.TELEGRAM,
+                commit=False,
+            )
+            booking = None
+            if conversation.booking_id is None:
+                booking = await PMSService(lookup).get_booking_by_phone(guest_phone)
+        staged = [*lookup.new, *lookup.dirty]
+    lookup_ms = int((time.perf_counter() - lookup_start) * 1000)
 
     async with async_session() as session:
         pms = PMSService(session)
         conv_service = ConversationService(session)
+        session.add_all([conversation, *staged])
 
-        # Get or create conversation
-        conversation = await conv_service.get_or_create_conversation(
-            guest_phone=guest_phone,
-            hotel_id=HOTEL_ID,
-            platform=Platform.TELEGRAM,
-        )
-
-        # Try to link booking by phone if not already linked
-        if conversation.booking_id is None:
-            booking = await pms.get_booking_by_phone(guest_phone)
-            if booking:
-                await conv_service.link_booking(
-                    conversation.id, uuid.UUID(booking["id"])
-                )
-
-        # Save user message
-        await conv_service.add_message(
-            conversation_id=conversation.id,
-            role=MessageRole.USER,
-            content=user_message,
-        )
+        # Link booking by phone if not already linked
+        if booking:
+            await conv_service.link_booking(
+                conversation.id, uuid.UUID(booking["id"]), commit=False
+            )
 
-        # Process with agent
-        agent = HotelAgent(
-            pms=pms,
-            conversation_service=conv_service,
-            hotel_id=HOTEL_ID,
-        )
+        # Stage each user message as sent
+        turn_messages = [
+            await conv_service.add_message(
+                conversation_id=conversation.id,
+                role=MessageRole.USER,
+                content=message.text,
+                commit=False,
+            )
+            for message in messages
+        ]
 
+        # Process with the shared agent (graph compiled once per process)
         try:
-            result = await agent.process_message(
+            result = await get_agent().process_message(
                 user_message=user_message,
                 guest_phone=guest_phone,
                 conversation_id=conversation.id,
+                pms=pms,
+                conversation_service=conv_service,
+                hotel_id=HOTEL_ID,
+                session_factory=async_session,
+                on_text=streamer.update if streamer else None,
             )
 
             response_text = result["response"]
             intent = result.get("intent", "")
             metadata = result.get("metadata", {})
+            model = result.get("model")
+            usage = result.get("usage")
+            cost_usd = result.get("cost_usd", 0.0)
+            checkpoint = result.get("checkpoint")
 
         except Exception as e:
             logger.error(f"Agent error: {e}")
@@ -133,19 +263,69 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             )
             intent = "error"
             metadata = {"error": str(e)}
+            model, usage, cost_usd = None, None, 0.0
+            checkpoint = None
+
+        metadata["lookup_ms"] = lookup_ms
+        if len(messages) > 1:
+            metadata["coalesced_messages"] = len(messages)
 
-        # Save assistant response
-        await conv_service.add_message(
-            conversation_id=conversation.id,
-            role=MessageRole.ASSISTANT,
-            content=response_text,
-            intent=intent,
-            metadata=metadata,
+        turn_messages.append(
+            await conv_service.add_message(
+                conversation_id=conversation.id,
+                role=MessageRole.ASSISTANT,
+                content=response_text,
+                intent=intent,
+                metadata=metadata,
+                model=model,
+                usage=usage,
+                cost_usd=cost_usd,
+                commit=False,
+            )
         )
+        # Next turn's context, written in the same transaction as the messages
+        if checkpoint is not None:
+            await conv_service.save_checkpoint(
+                conversation.id, checkpoint, turn_messages, commit=False
+            )
 
-    # Send response to user
-    await update.message.reply_text(response_text)
-    logger.info(f"Response sent to {guest_phone} (intent={intent})")
+        try:
+            # Send response to user (completes the streamed message, if any)
+            if streamer:
+                await streamer.finish(response_text)
+            else:
+                await source.reply_text(response_text)
+            logger.info(f"Response sent to {guest_phone} (intent={intent})")
+        finally:
+            # One commit for the whole turn, even if the reply failed. The
+            # mailbox starts the guest's next turn only after this returns
+            await session.commit()
+        # Resume it from memory next turn (dropped if a tool escalated it)
+        conversation_cache.put(conversation)
+
+    # Fold turns that fell out of the history budget into the summary
+    history_summarizer.schedule(conversation.id, async_session)
+
+
+def _mailbox_key(guest_phone: str) -> str:
+    return f"{HOTEL_ID}:{guest_phone}"
+
+
+async def _enqueue_turn(guest_phone: str, messages: list[Message]) -> None:
+    """Run the turn in the guest's mailbox, after their earlier turns."""
+    await conversation_mailbox.submit(
+        _mailbox_key(guest_phone), lambda: process_turn(guest_phone, messages)
+    )
+
+
+conversation_mailbox = ConversationMailbox(
+    idle_seconds=settings.conversation_mailbox_idle_seconds
+)
+message_debouncer: MessageDebouncer[Message] = MessageDebouncer(
+    _enqueue_turn,
+    window=settings.telegram_debounce_seconds,
+    max_wait=settings.telegram_debounce_max_wait_seconds,
+)
 
 
 def create_bot_application() -> Application:
@@ -155,7 +335,14 @@ def create_bot_application() -> Application:
             "TELEGRAM_BOT_TOKEN not set. Get one from @BotFather on Telegram."
         )
 
-    application = Application.builder().token(settings.telegram_bot_token).build()
+    # Updates are handled concurrently: per-guest ordering is enforced by
+    # the conversation mailbox, so one slow turn doesn't stall other guests
+    application = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .concurrent_updates(True)
+        .build()
+    )
 
     # Register handlers
     application.add_handler(CommandHandler("start", start_command))
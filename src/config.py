@@ -5,9 +5,100 @@ from pydantic import Field
 class Settings(BaseSettings):
     # Telegram
     telegram_bot_token: str = Field(default="", description="Telegram Bot API token")
+    telegram_streaming: bool = Field(
+        default=True,
+        description="Stream LLM replies to Telegram by editing the sent message",
+    )
+    telegram_edit_interval_seconds: float = Field(
+        default=1.0,
+        description="Min seconds between edits of a streamed Telegram message",
+    )
+    telegram_debounce_seconds: float = Field(
+        default=0.6,
+        description=(
+            "Quiet period that closes a burst of guest messages (0 = off); "
+            "every reply starts at least this many seconds late"
+        ),
+    )
+    telegram_debounce_max_wait_seconds: float = Field(
+        default=4.0,
+        description="Max seconds a burst is held before it is answered",
+    )
+    conversation_mailbox_idle_seconds: float = Field(
+        default=300.0,
+        description="Seconds an idle per-guest turn queue is kept before eviction",
+    )
 
     # Anthropic
     anthropic_api_key: str = Field(default="", description="Anthropic API key")
+    anthropic_base_url: str = Field(
+        default="",
+        description="Override the Anthropic API base URL (empty = SDK default)",
+    )
+    llm_timeout_seconds: float = Field(
+        default=30.0,
+        description="Total timeout for a single Anthropic API request",
+    )
+    llm_connect_timeout_seconds: float = Field(
+        default=5.0,
+        description="Timeout for opening a connection to the Anthropic API",
+    )
+    llm_max_connections: int = Field(
+        default=20,
+        description="Max concurrent HTTP connections in the shared LLM client pool",
+    )
+    llm_max_keepalive_connections: int = Field(
+        default=10,
+        description="Max idle keep-alive connections kept in the LLM client pool",
+    )
+    llm_keepalive_expiry_seconds: float = Field(
+        default=60.0,
+        description="Seconds an idle keep-alive connection stays open",
+    )
+    llm_max_retries: int = Field(
+        default=0,
+        description=(
+            "Retries performed by the Anthropic SDK itself (the agent's "
+            "resilience layer already retries 429/529, 5xx and connection "
+            "errors within the turn budget, streams included)"
+        ),
+    )
+    llm_turn_budget_seconds: float = Field(
+        default=25.0,
+        description="Latency budget of one agent turn; LLM call timeouts fit inside it",
+    )
+    llm_retry_attempts: int = Field(
+        default=2,
+        description="Max retries of a transient failure (429/529, 5xx, network error)",
+    )
+    llm_retry_base_seconds: float = Field(
+        default=0.5,
+        description="Base of the jittered exponential backoff between retries",
+    )
+    llm_hedge_after_seconds: float = Field(
+        default=0.0,
+        description="Send a duplicate request if no answer after N seconds (0 = off)",
+    )
+    llm_max_concurrency: int = Field(
+        default=8,
+        description="Max LLM requests in flight across the process (others queue)",
+    )
+    llm_input_tokens_per_minute: int = Field(
+        default=0,
+        description="Input tokens/minute admitted to the LLM (0 = off)",
+    )
+    llm_output_tokens_per_minute: int = Field(
+        default=0,
+        description="Output tokens/minute admitted, reserved at max_tokens (0 = off)",
+    )
+    llm_breaker_failure_threshold: int = Field(
+        default=5,
+        description="Consecutive upstream failures that open the circuit breaker",
+    )
+    llm_breaker_recovery_seconds: float = Field(
+        default=30.0,
+        description="Seconds the breaker stays open before probing upstream again",
+    )
 
     # Database
     database_url: str = Field(
@@ -27,16 +118,119 @@ class Settings(BaseSettings):
     # Agent
     llm_model: str = Field(
         default="claude-sonnet-4-20250514",
-        description="Claude model to use",
+        description="Claude model to use (the 'large' routing tier)",
+    )
+    llm_fast_model: str = Field(
+        default="claude-haiku-4-5",
+        description="Smaller, faster model (the 'fast' routing tier)",
+    )
+    model_routing_enabled: bool = Field(
+        default=True,
+        description="Route simple intents to the fast model (off = llm_model only)",
+    )
+    model_routes: dict[str, str] = Field(
+        default={
+            "classification": "fast",
+            "summary": "fast",
+            "booking_info": "fast",
+            "amenities_query": "fast",
+            "faq_general": "fast",
+            "service_request": "fast",
+            "out_of_scope": "fast",
+            "new_booking": "large",
+            "upselling": "large",
+            "single_call": "large",
+        },
+        description="Model tier ('fast' or 'large') per intent or call type",
+    )
+    model_route_large_history: int = Field(
+        default=8,
+        description="Replayed history messages above which a turn uses 'large'",
+    )
+    agent_pipeline: str = Field(
+        default="two_step",
+        description=(
+            "'two_step' (classify, then answer) or 'single_call' "
+            "(one request classifies and answers)"
+        ),
+    )
+    speculative_classification: bool = Field(
+        default=True,
+        description=(
+            "Classify intent in parallel with the DB context load (the local "
+            "classifier then runs without conversation history)"
+        ),
+    )
+    intent_fast_path_threshold: float = Field(
+        default=0.75,
+        description=(
+            "Min local classifier confidence to skip the LLM intent call "
+            "(set above 1 to always use the LLM)"
+        ),
+    )
+    prompt_caching_enabled: bool = Field(
+        default=True,
+        description="Mark tools/system/history with prompt cache breakpoints",
+    )
+    tool_timeout_seconds: float = Field(
+        default=5.0,
+        description="Timeout for each read-only tool run concurrently",
+    )
+    answer_cache_enabled: bool = Field(
+        default=True,
+        description="Reuse answers to repeated amenities/FAQ questions",
+    )
+    answer_cache_max_entries: int = Field(
+        default=512,
+        description="Max cached answers (least recently used are evicted)",
+    )
+    answer_cache_ttl_seconds: float = Field(
+        default=3600.0,
+        description="Seconds a cached answer stays valid",
     )
     max_conversation_history: int = Field(
         default=10,
         description="Max messages to keep in conversation context",
     )
+    agent_checkpoint_enabled: bool = Field(
+        default=True,
+        description=(
+            "Load the previous turn's history window and booking from the "
+            "conversation checkpoint instead of re-querying them"
+        ),
+    )
+    agent_checkpoint_booking_ttl_seconds: float = Field(
+        default=300.0,
+        description="Seconds a checkpointed booking is reused before re-reading it",
+    )
+    history_token_budget: int = Field(
+        default=1500,
+        description="Estimated tokens of recent messages replayed verbatim",
+    )
+    history_summary_enabled: bool = Field(
+        default=True,
+        description="Fold turns outside the history budget into a rolling summary",
+    )
+    history_summary_min_messages: int = Field(
+        default=2,
+        description="Messages that must fall out of the budget before re-summarizing",
+    )
+    history_summary_max_tokens: int = Field(
+        default=300,
+        description="Max output tokens of a summary update",
+    )
     conversation_timeout_hours: int = Field(
         default=2,
         description="Hours before auto-closing inactive conversation",
     )
+    conversation_cache_enabled: bool = Field(
+        default=True,
+        description="Resume active conversations from memory, skipping the lookup",
+    )
+    conversation_cache_max_entries: int = Field(
+        default=10000,
+        description="Max cached active conversations (least recently used are evicted)",
+    )
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
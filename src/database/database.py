@@ -1,5 +1,7 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.schema import CreateColumn
 from loguru import logger
 
 from src.config import settings
@@ -23,12 +25,33 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+def _add_missing_columns(conn) -> None:
+    """Add columns introduced after a table was first created.
+
+    ``create_all`` never alters existing tables; new columns are nullable or
+    have a server default, so a plain ``ADD COLUMN`` is enough.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
 async def init_db() -> None:
     """Create all tables if they don't exist."""
     from src.database.models import Base  # noqa: F811
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
     logger.info("Database tables created successfully")
 
 
@@ -162,6 +162,19 @@ class Conversation(Base):
     resolution_type: Mapped[ResolutionType | None] = mapped_column(
         Enum(ResolutionType), nullable=True
     )
+    # Rolling summary of the oldest `summarized_count` messages
+    summary: Mapped[str | None] = mapped_column(Text, nullable=True)
+    summarized_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Agent context after the last turn (history window, booking); valid
+    # while checkpoint_at matches last_message_at
+    checkpoint: Mapped[dict | None] = mapped_column(
+        JSON, nullable=True, deferred=True
+    )
+    checkpoint_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
     hotel: Mapped["Hotel"] = relationship(back_populates="conversations")
     booking: Mapped["Booking | None"] = relationship(back_populates="conversations")
@@ -188,6 +201,23 @@ class Message(Base):
     metadata_json: Mapped[dict | None] = mapped_column(
         "metadata", JSON, nullable=True, default=dict
     )
+    # LLM usage behind an assistant message, summed over the turn's calls
+    model: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    input_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    output_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    cache_read_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    cache_write_tokens: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    cost_usd: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0.0, server_default="0"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
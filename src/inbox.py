@@ -0,0 +1,173 @@
+"""Inbound message handling shared by the chat platforms.
+
+Guests often split one request over several quick messages ("hola" /
+"tengo una reserva" / "PLR-2024-001"). ``MessageDebouncer`` coalesces the
+messages a guest sends within a short window into a single agent turn, and
+``ConversationMailbox`` runs each guest's turns strictly one after another
+(different guests still run in parallel).
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class _Batch(Generic[T]):
+    first_at: float
+    last_at: float
+    items: list[T] = field(default_factory=list)
+    flush_now: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MessageDebouncer(Generic[T]):
+    """Coalesces the items added under one key within a short window.
+
+    A batch is flushed ``window`` seconds after its latest item, and at the
+    latest ``max_wait`` seconds after its first one, by calling
+    ``flush(key, items)`` in a background task.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[str, list[T]], Awaitable[None]],
+        window: float,
+        max_wait: float,
+    ) -> None:
+        self._flush = flush
+        self.window = window
+        self.max_wait = max_wait
+        self._batches: dict[str, _Batch[T]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.batches_flushed = 0
+        self.items_received = 0
+
+    def add(self, key: str, item: T) -> None:
+        """Add ``item`` to ``key``'s pending batch, starting one if needed."""
+        now = time.monotonic()
+        self.items_received += 1
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = _Batch(first_at=now, last_at=now)
+            self._batches[key] = batch
+            task = asyncio.create_task(self._wait_and_flush(key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.items.append(item)
+        batch.last_at = now
+
+    async def _wait_and_flush(self, key: str, batch: _Batch[T]) -> None:
+        while not batch.flush_now.is_set():
+            deadline = min(
+                batch.last_at + self.window, batch.first_at + self.max_wait
+            )
+            delay = deadline - time.monotonic()
+            if delay <= 0:
+                break
+            try:
+                await asyncio.wait_for(batch.flush_now.wait(), delay)
+            except asyncio.TimeoutError:
+                pass  # re-check: a newer item may have pushed the deadline
+
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        self.batches_flushed += 1
+        if len(batch.items) > 1:
+            logger.info(
+                f"Coalesced {len(batch.items)} messages from {key} into one turn"
+            )
+        try:
+            await self._flush(key, batch.items)
+        except Exception as e:
+            logger.error(f"Failed to process messages from {key}: {e}")
+
+    async def flush_all(self) -> None:
+        """Flush every pending batch now and wait for them (used on shutdown)."""
+        for batch in self._batches.values():
+            batch.flush_now.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "pending_batches": len(self._batches),
+            "messages": self.items_received,
+            "turns": self.batches_flushed,
+        }
+
+
+class ConversationMailbox:
+    """Per-key job queues: jobs for one key run in order, keys run in parallel.
+
+    Each key gets a queue and a worker task on first use; the worker exits
+    (and the mailbox is evicted) after ``idle_seconds`` without jobs.
+    """
+
+    def __init__(self, idle_seconds: float) -> None:
+        self.idle_seconds = idle_seconds
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._workers: set[asyncio.Task] = set()
+        self.jobs_run = 0
+        self.evicted = 0
+        self.max_depth = 0
+
+    def submit(
+        self, key: str, job: Callable[[], Awaitable[R]]
+    ) -> "asyncio.Future[R]":
+        """Queue ``job`` behind the key's earlier jobs; the future gets its result."""
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[key] = queue
+            worker = asyncio.create_task(self._work(key, queue))
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+        queue.put_nowait((job, future))
+        self.max_depth = max(self.max_depth, queue.qsize())
+        return future
+
+    async def _work(self, key: str, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                job, future = await asyncio.wait_for(queue.get(), self.idle_seconds)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    # No await between the check and the removal: a new
+                    # submit either sees this queue non-empty or a fresh one
+                    del self._queues[key]
+                    self.evicted += 1
+                    return
+                continue
+            try:
+                result: Any = await job()
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            self.jobs_run += 1
+
+    async def close(self) -> None:
+        """Stop the idle workers (queued jobs are dropped; used on shutdown)."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queues.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "active": len(self._queues),
+            "queued": sum(queue.qsize() for queue in self._queues.values()),
+            "max_depth": self.max_depth,
+            "jobs_run": self.jobs_run,
+            "evicted": self.evicted,
+        }
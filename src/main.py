@@ -8,6 +8,7 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 
+from src.agent.llm_client import close_llm_client, init_llm_client
 from src.api.routes import router
 from src.config import settings
 from src.database.database import async_session, close_db, init_db
@@ -55,11 +56,13 @@ async def startup():
     async with async_session() as session:
         await seed_database(session)
     logger.info("Database initialized and seeded")
+    init_llm_client()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     logger.info("Shutting down AI Velora Hotel Agent...")
+    await close_llm_client()
     await close_db()
 
 
@@ -68,7 +71,11 @@ async def shutdown():
 
 async def run_bot():
     """Run the Telegram bot in polling mode."""
-    from src.bot import create_bot_application
+    from src.bot import (
+        conversation_mailbox,
+        create_bot_application,
+        message_debouncer,
+    )
 
     if not settings.telegram_bot_token:
         logger.warning(
@@ -90,6 +97,9 @@ async def run_bot():
     except asyncio.CancelledError:
         logger.info("Stopping Telegram bot...")
         await application.updater.stop()
+        # Answer the bursts still waiting for their debounce window
+        await message_debouncer.flush_all()
+        await conversation_mailbox.close()
         await application.stop()
         await application.shutdown()
 
@@ -20,6 +20,56 @@ from src.database.models import (
 
 DEFAULT_COST_PER_ESCALATION = 15.0
 
+# Turn metadata keys summarized by the latency breakdown (stage -> key)
+LATENCY_STAGES = {
+    "turn": "turn_ms",
+    "lookup": "lookup_ms",
+    "context": "context_ms",
+    "classification": "classification_ms",
+    "llm": "latency_ms",
+    "first_token": "first_token_ms",
+    "tools": "tool_wall_ms",
+    "db": "db_ms",
+    "llm_rounds": "llm_rounds",
+}
+
+
+def _usage_columns() -> list:
+    """Aggregates over assistant messages for the usage breakdowns."""
+    return [
+        func.count(Message.id).label("turns"),
+        func.coalesce(func.sum(Message.input_tokens), 0).label("input_tokens"),
+        func.coalesce(func.sum(Message.output_tokens), 0).label("output_tokens"),
+        func.coalesce(func.sum(Message.cache_read_tokens), 0).label(
+            "cache_read_tokens"
+        ),
+        func.coalesce(func.sum(Message.cache_write_tokens), 0).label(
+            "cache_write_tokens"
+        ),
+        func.coalesce(func.sum(Message.cost_usd), 0.0).label("cost_usd"),
+    ]
+
+
+def _usage_row(row) -> dict:
+    turns = row.turns or 0
+    cost = float(row.cost_usd or 0.0)
+    return {
+        "turns": turns,
+        "input_tokens": row.input_tokens,
+        "output_tokens": row.output_tokens,
+        "cache_read_tokens": row.cache_read_tokens,
+        "cache_write_tokens": row.cache_write_tokens,
+        "cost_usd": round(cost, 6),
+        "cost_per_turn_usd": round(cost / turns, 6) if turns else 0.0,
+    }
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
 
 class AnalyticsService:
     """Computes metrics for the dashboard."""
@@ -47,6 +97,7 @@ class AnalyticsService:
         upsell_by_offer = await self._upsell_by_offer()
         total_all_time = await self._total_conversations_all_time()
         auto_all_time_pct = await self._auto_resolved_all_time_pct()
+        latency = await self._latency_breakdown()
 
         auto_pct = (auto_resolved / total * 100) if total > 0 else 0.0
 
@@ -64,6 +115,65 @@ class AnalyticsService:
             "upsell_by_offer": upsell_by_offer,
             "total_conversations_all_time": total_all_time,
             "auto_resolved_all_time_pct": auto_all_time_pct,
+            "latency_breakdown": latency,
+        }
+
+    async def get_usage_metrics(self, days: int = 30, limit: int = 20) -> dict:
+        """LLM tokens and estimated cost, per intent, per day and per conversation.
+
+        Only the last ``days`` days are counted; ``limit`` caps the list of
+        most expensive conversations.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        recorded = (Message.role == MessageRole.ASSISTANT, Message.created_at >= since)
+
+        totals = (
+            await self.session.execute(select(*_usage_columns()).where(*recorded))
+        ).one()
+
+        by_intent = await self.session.execute(
+            select(Message.intent, *_usage_columns())
+            .where(*recorded)
+            .group_by(Message.intent)
+            .order_by(func.sum(Message.cost_usd).desc())
+        )
+
+        day = func.date(Message.created_at)
+        by_day = await self.session.execute(
+            select(day.label("day"), *_usage_columns())
+            .where(*recorded)
+            .group_by(day)
+            .order_by(day)
+        )
+
+        by_conversation = await self.session.execute(
+            select(
+                Message.conversation_id,
+                Conversation.guest_phone,
+                *_usage_columns(),
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(*recorded)
+            .group_by(Message.conversation_id, Conversation.guest_phone)
+            .order_by(func.sum(Message.cost_usd).desc())
+            .limit(limit)
+        )
+
+        return {
+            "days": days,
+            "totals": _usage_row(totals),
+            "by_intent": [
+                {"intent": row.intent, **_usage_row(row)} for row in by_intent
+            ],
+            "by_day": [{"day": str(row.day), **_usage_row(row)} for row in by_day],
+            "by_conversation": [
+                {
+                    "conversation_id": str(row.conversation_id),
+                    "guest_phone": row.guest_phone,
+                    **_usage_row(row),
+                }
+                for row in by_conversation
+            ],
         }
 
     async def get_conversations_list(
@@ -540,3 +650,40 @@ class AnalyticsService:
         )
         auto = resolved.scalar_one()
         return round(auto / total * 100, 1)
+
+    # ------------------------------------------------------------------
+    # New: Latency breakdown
+    # ------------------------------------------------------------------
+
+    async def _latency_breakdown(self, limit: int = 500) -> dict:
+        """p50/p95 per turn stage over the latest assistant messages.
+
+        Stages are the timing keys of the turn metadata, plus one per graph
+        node (``node.<name>``) and per tool (``tool.<name>``).
+        """
+        result = await self.session.execute(
+            select(Message.metadata_json)
+            .where(Message.role == MessageRole.ASSISTANT)
+            .order_by(Message.created_at.desc())
+            .limit(limit)
+        )
+
+        samples: dict[str, list[float]] = {}
+        for meta in result.scalars().all():
+            if not isinstance(meta, dict):
+                continue
+            for stage, key in LATENCY_STAGES.items():
+                if isinstance(meta.get(key), (int, float)):
+                    samples.setdefault(stage, []).append(meta[key])
+            for prefix, key in (("node", "node_ms"), ("tool", "tool_ms")):
+                for name, ms in (meta.get(key) or {}).items():
+                    samples.setdefault(f"{prefix}.{name}", []).append(ms)
+
+        return {
+            stage: {
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "count": len(values),
+            }
+            for stage, values in sorted(samples.items())
+        }
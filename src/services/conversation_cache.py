@@ -0,0 +1,103 @@
+"""In-process cache of active conversations, keyed by guest and hotel.
+
+``get_or_create_conversation`` runs on every message, and almost always
+resumes the same conversation. The cache keeps what a turn needs to resume
+it (id, booking and last activity) so the lookup query is skipped.
+
+Entries are only written once the conversation is committed and active;
+``/reset``, escalation, resolution and timeouts drop them. The bot runs as
+a single process, so every status change goes through here.
+"""
+
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.config import settings
+from src.database.models import Conversation, ConversationStatus
+
+
+@dataclass(frozen=True)
+class CachedConversation:
+    id: uuid.UUID
+    booking_id: uuid.UUID | None
+    last_message_at: datetime
+
+
+class ConversationCache:
+    """LRU of active conversations by ``(guest_phone, hotel_id)``."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, uuid.UUID], CachedConversation] = (
+            OrderedDict()
+        )
+        self._keys: dict[uuid.UUID, tuple[str, uuid.UUID]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, guest_phone: str, hotel_id: uuid.UUID) -> CachedConversation | None:
+        """Return the guest's active conversation, or None on a miss."""
+        if not settings.conversation_cache_enabled:
+            return None
+        key = (guest_phone, hotel_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, conversation: Conversation) -> None:
+        """Remember a committed conversation (dropped if no longer active)."""
+        key = (conversation.guest_phone, conversation.hotel_id)
+        if conversation.status != ConversationStatus.ACTIVE:
+            self.invalidate(*key)
+            return
+        if not settings.conversation_cache_enabled:
+            return
+        previous = self._entries.get(key)
+        if previous is not None and previous.id != conversation.id:
+            self._keys.pop(previous.id, None)
+        self._entries[key] = CachedConversation(
+            id=conversation.id,
+            booking_id=conversation.booking_id,
+            last_message_at=conversation.last_message_at,
+        )
+        self._entries.move_to_end(key)
+        self._keys[conversation.id] = key
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._keys.pop(evicted.id, None)
+
+    def invalidate(self, guest_phone: str, hotel_id: uuid.UUID) -> None:
+        """Forget the guest's conversation (``/reset``, timeout)."""
+        entry = self._entries.pop((guest_phone, hotel_id), None)
+        if entry is not None:
+            self._keys.pop(entry.id, None)
+
+    def invalidate_id(self, conversation_id: uuid.UUID) -> None:
+        """Forget a conversation by id (escalated or resolved)."""
+        key = self._keys.pop(conversation_id, None)
+        if key is not None:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+conversation_cache = ConversationCache(
+    max_entries=settings.conversation_cache_max_entries
+)
@@ -1,11 +1,13 @@
 """Service for managing conversations and messages."""
 
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import make_transient_to_detached, selectinload
+from sqlalchemy.orm.util import identity_key
 from loguru import logger
 
 from src.database.models import (
@@ -17,6 +19,26 @@ from src.database.models import (
     ResolutionType,
 )
 from src.config import settings
+from src.services.conversation_cache import CachedConversation, conversation_cache
+
+
+def _timed_out(last_message_at: datetime | None) -> bool:
+    """Whether a conversation has been inactive past the timeout."""
+    if last_message_at is None:
+        return False
+    timeout = timedelta(hours=settings.conversation_timeout_hours)
+    return datetime.now(timezone.utc) - last_message_at.replace(
+        tzinfo=timezone.utc
+    ) > timeout
+
+
+def _message_dict(msg: Message) -> dict:
+    return {
+        "role": msg.role.value,
+        "content": msg.content,
+        "intent": msg.intent,
+        "created_at": msg.created_at.isoformat() if msg.created_at else None,
+    }
 
 
 class ConversationService:
@@ -31,8 +53,23 @@ class ConversationService:
         hotel_id: uuid.UUID,
         platform: Platform = Platform.TELEGRAM,
         booking_id: uuid.UUID | None = None,
+        commit: bool = True,
     ) -> Conversation:
-        """Get an active conversation for the guest, or create a new one."""
+        """Get an active conversation for the guest, or create a new one.
+
+        A conversation in ``conversation_cache`` is resumed without a query.
+        With ``commit=False`` a new conversation is only added to the session
+        (its id is assigned up front), to be written with the rest of the
+        turn; the caller caches it once committed.
+        """
+        cached = conversation_cache.get(guest_phone, hotel_id)
+        if cached is not None:
+            if not _timed_out(cached.last_message_at):
+                logger.debug(f"Resuming conversation {cached.id} (cached)")
+                return self._attach(cached, guest_phone, hotel_id)
+            # Closed below, from the database copy
+            conversation_cache.invalidate(guest_phone, hotel_id)
+
         # Look for an existing active conversation
         result = await self.session.execute(
             select(Conversation)
@@ -41,41 +78,40 @@ class ConversationService:
                 Conversation.hotel_id == hotel_id,
                 Conversation.status == ConversationStatus.ACTIVE,
             )
-            .options(selectinload(Conversation.messages))
         )
         conversation = result.scalar_one_or_none()
 
         if conversation is not None:
-            # Check if conversation has timed out
-            timeout = timedelta(hours=settings.conversation_timeout_hours)
-            if (
-                conversation.last_message_at
-                and datetime.now(timezone.utc) - conversation.last_message_at.replace(
-                    tzinfo=timezone.utc
-                )
-                > timeout
-            ):
+            if _timed_out(conversation.last_message_at):
                 logger.info(
                     f"Conversation {conversation.id} timed out, closing and creating new one"
                 )
                 conversation.status = ConversationStatus.RESOLVED
                 conversation.resolution_type = ResolutionType.AUTOMATED
-                await self.session.commit()
+                if commit:
+                    await self.session.commit()
             else:
                 logger.debug(f"Resuming conversation {conversation.id}")
+                conversation_cache.put(conversation)
                 return conversation
 
-        # Create new conversation
+        # Create new conversation. Id and timestamps are set here rather than
+        # by the database, so the object is usable without a refresh
+        now = datetime.now(timezone.utc)
         conversation = Conversation(
+            id=uuid.uuid4(),
             hotel_id=hotel_id,
             guest_phone=guest_phone,
             booking_id=booking_id,
             platform=platform,
             status=ConversationStatus.ACTIVE,
+            started_at=now,
+            last_message_at=now,
         )
         self.session.add(conversation)
-        await self.session.commit()
-        await self.session.refresh(conversation)
+        if commit:
+            await self.session.commit()
+            conversation_cache.put(conversation)
 
         logger.info(f"New conversation created: {conversation.id} for {guest_phone}")
         return conversation
@@ -87,26 +123,42 @@ class ConversationService:
         content: str,
         intent: str | None = None,
         metadata: dict | None = None,
+        model: str | None = None,
+        usage: dict[str, int] | None = None,
+        cost_usd: float = 0.0,
+        commit: bool = True,
     ) -> Message:
-        """Add a message to a conversation."""
+        """Add a message to a conversation.
+
+        ``usage`` holds the turn's token counts (``input_tokens``,
+        ``output_tokens``, ``cache_read_tokens``, ``cache_write_tokens``).
+        With ``commit=False`` the message is only added to the session and
+        written by the caller's next commit (one transaction per turn).
+        """
+        usage = usage or {}
+        now = datetime.now(timezone.utc)
         message = Message(
+            id=uuid.uuid4(),
             conversation_id=conversation_id,
             role=role,
             content=content,
             intent=intent,
             metadata_json=metadata or {},
+            model=model,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cache_read_tokens=usage.get("cache_read_tokens", 0),
+            cache_write_tokens=usage.get("cache_write_tokens", 0),
+            cost_usd=cost_usd,
+            # Microsecond timestamps keep a turn's messages in order even
+            # when they are written in the same transaction
+            created_at=now,
         )
         self.session.add(message)
+        await self._touch(conversation_id, now)
 
-        # Update conversation last_message_at
-        await self.session.execute(
-            update(Conversation)
-            .where(Conversation.id == conversation_id)
-            .values(last_message_at=datetime.now(timezone.utc))
-        )
-
-        await self.session.commit()
-        await self.session.refresh(message)
+        if commit:
+            await self.session.commit()
 
         logger.debug(
             f"Message added to conversation {conversation_id}: "
@@ -114,6 +166,54 @@ class ConversationService:
         )
         return message
 
+    def _attach(
+        self, cached: CachedConversation, guest_phone: str, hotel_id: uuid.UUID
+    ) -> Conversation:
+        """Put a cached conversation in the session without loading it.
+
+        Only the cached columns are set; changes to them (last activity,
+        booking link, checkpoint) are written as a plain UPDATE.
+        """
+        key = identity_key(Conversation, cached.id)
+        existing = self.session.identity_map.get(key)
+        if existing is not None:
+            return existing
+        conversation = Conversation(
+            id=cached.id,
+            hotel_id=hotel_id,
+            guest_phone=guest_phone,
+            booking_id=cached.booking_id,
+            status=ConversationStatus.ACTIVE,
+            last_message_at=cached.last_message_at,
+        )
+        make_transient_to_detached(conversation)
+        self.session.add(conversation)
+        return conversation
+
+    async def _session_conversation(
+        self, conversation_id: uuid.UUID
+    ) -> Conversation | None:
+        """The session's copy of a conversation, loading it only if needed.
+
+        A conversation staged by ``get_or_create_conversation(commit=False)``
+        is pending, which ``session.get`` would miss and query for (holding
+        a connection until the turn commits).
+        """
+        for obj in self.session.new:
+            if isinstance(obj, Conversation) and obj.id == conversation_id:
+                return obj
+        with self.session.no_autoflush:
+            return await self.session.get(Conversation, conversation_id)
+
+    async def _touch(self, conversation_id: uuid.UUID, when: datetime) -> None:
+        """Set ``last_message_at`` on the session's copy of the conversation.
+
+        Several messages in one turn then cost a single UPDATE at flush time.
+        """
+        conversation = await self._session_conversation(conversation_id)
+        if conversation is not None:
+            conversation.last_message_at = when
+
     async def get_conversation_history(
         self,
         conversation_id: uuid.UUID,
@@ -130,15 +230,151 @@ class ConversationService:
         )
         messages = list(reversed(result.scalars().all()))
 
-        return [
-            {
-                "role": msg.role.value,
-                "content": msg.content,
-                "intent": msg.intent,
-                "created_at": msg.created_at.isoformat() if msg.created_at else None,
+        return [_message_dict(msg) for msg in messages]
+
+    async def get_history_window(
+        self,
+        conversation_id: uuid.UUID,
+        limit: int | None = None,
+    ) -> dict:
+        """Get the recent messages plus the conversation's rolling summary.
+
+        ``total`` is the conversation's message count, so callers can tell
+        which of the recent messages the summary already covers.
+        """
+        result = await self.session.execute(
+            select(Conversation.summary, Conversation.summarized_count).where(
+                Conversation.id == conversation_id
+            )
+        )
+        row = result.one_or_none()
+        total = await self.session.scalar(
+            select(func.count())
+            .select_from(Message)
+            .where(Message.conversation_id == conversation_id)
+        )
+        return {
+            "summary": row.summary if row else None,
+            "summarized_count": row.summarized_count if row else 0,
+            "total": total or 0,
+            "messages": await self.get_conversation_history(conversation_id, limit),
+        }
+
+    async def get_checkpoint(
+        self, conversation_id: uuid.UUID, limit: int | None = None
+    ) -> dict | None:
+        """Get the agent checkpoint, if it still matches the messages table.
+
+        One query replaces the history window's three (and, when the
+        checkpoint has it, the booking lookup). Returns ``{"window": ...}``
+        shaped like ``get_history_window``, plus ``"booking"`` and
+        ``"booking_at"`` if the booking is still the conversation's linked one
+        and younger than ``agent_checkpoint_booking_ttl_seconds``. Returns
+        None when any message or update was written after the checkpoint.
+        """
+        limit = limit or settings.max_conversation_history
+        result = await self.session.execute(
+            select(
+                Conversation.checkpoint,
+                Conversation.summary,
+                Conversation.summarized_count,
+                Conversation.booking_id,
+            ).where(
+                Conversation.id == conversation_id,
+                Conversation.checkpoint_at == Conversation.last_message_at,
+            )
+        )
+        row = result.one_or_none()
+        if row is None or not row.checkpoint:
+            return None
+        messages = row.checkpoint["messages"]
+        total = row.checkpoint["total"]
+        if len(messages) < min(limit, total):
+            # Saved with a smaller history limit
+            return None
+        checkpoint = {
+            "window": {
+                "summary": row.summary,
+                "summarized_count": row.summarized_count,
+                "total": total,
+                "messages": messages[-limit:],
             }
-            for msg in messages
-        ]
+        }
+        booking = row.checkpoint.get("booking")
+        booking_at = row.checkpoint.get("booking_at") or 0.0
+        if (
+            booking
+            and row.booking_id is not None
+            and booking.get("id") == str(row.booking_id)
+            and time.time() - booking_at < settings.agent_checkpoint_booking_ttl_seconds
+        ):
+            checkpoint["booking"] = booking
+            checkpoint["booking_at"] = booking_at
+        return checkpoint
+
+    async def save_checkpoint(
+        self,
+        conversation_id: uuid.UUID,
+        checkpoint: dict,
+        messages: list[Message],
+        commit: bool = True,
+    ) -> None:
+        """Store the agent checkpoint as of the turn's new ``messages``.
+
+        ``checkpoint`` is what the turn loaded (``window`` without the new
+        messages and, if still current, ``booking`` with the ``booking_at``
+        time it was read). It is stamped with the
+        conversation's ``last_message_at``, so it stays valid until anything
+        else touches the conversation.
+        """
+        conversation = await self._session_conversation(conversation_id)
+        if conversation is None:
+            return
+        window = checkpoint["window"]
+        recent = [*window["messages"], *(_message_dict(msg) for msg in messages)]
+        state = {
+            "messages": recent[-settings.max_conversation_history :],
+            "total": window["total"] + len(messages),
+        }
+        if "booking" in checkpoint:
+            state["booking"] = checkpoint["booking"]
+            state["booking_at"] = checkpoint["booking_at"]
+        conversation.checkpoint = state
+        conversation.checkpoint_at = conversation.last_message_at
+        if commit:
+            await self.session.commit()
+
+    async def get_messages_after(
+        self, conversation_id: uuid.UUID, offset: int
+    ) -> list[dict]:
+        """Get every message after the first ``offset`` ones, oldest first."""
+        result = await self.session.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at)
+            .offset(offset)
+        )
+        return [_message_dict(msg) for msg in result.scalars().all()]
+
+    async def update_summary(
+        self, conversation_id: uuid.UUID, summary: str, summarized_count: int
+    ) -> None:
+        """Store the rolling summary of the first ``summarized_count`` messages."""
+        await self.session.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                summary=summary,
+                summarized_count=summarized_count,
+                # Not guest activity: keep the timeout clock where it was
+                last_message_at=Conversation.last_message_at,
+            )
+        )
+        await self.session.commit()
+        logger.debug(
+            f"Summary updated for conversation {conversation_id} "
+            f"({summarized_count} messages)"
+        )
 
     async def escalate_conversation(
         self, conversation_id: uuid.UUID, reason: str
@@ -153,6 +389,7 @@ class ConversationService:
             )
         )
         await self.session.commit()
+        conversation_cache.invalidate_id(conversation_id)
         logger.info(f"Conversation {conversation_id} escalated: {reason}")
 
     async def resolve_conversation(self, conversation_id: uuid.UUID) -> None:
@@ -166,6 +403,7 @@ class ConversationService:
             )
         )
         await self.session.commit()
+        conversation_cache.invalidate_id(conversation_id)
         logger.info(f"Conversation {conversation_id} resolved automatically")
 
     async def get_conversation_by_id(
@@ -180,15 +418,21 @@ class ConversationService:
         return result.scalar_one_or_none()
 
     async def link_booking(
-        self, conversation_id: uuid.UUID, booking_id: uuid.UUID
+        self,
+        conversation_id: uuid.UUID,
+        booking_id: uuid.UUID,
+        commit: bool = True,
     ) -> None:
         """Associate a booking with a conversation."""
-        await self.session.execute(
-            update(Conversation)
-            .where(Conversation.id == conversation_id)
-            .values(booking_id=booking_id)
-        )
-        await self.session.commit()
+        conversation = await self._session_conversation(conversation_id)
+        if conversation is None:
+            logger.warning(
+                f"Cannot link booking: conversation {conversation_id} not found"
+            )
+            return
+        conversation.booking_id = booking_id
+        if commit:
+            await self.session.commit()
         logger.info(
             f"Linked booking {booking_id} to conversation {conversation_id}"
         )
@@ -208,4 +452,5 @@ class ConversationService:
             )
         )
         await self.session.commit()
+        conversation_cache.invalidate(guest_phone, hotel_id)
         logger.info(f"Reset conversations for {guest_phone}")
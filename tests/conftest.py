@@ -1,11 +1,35 @@
 """Shared test fixtures."""
 
+import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from src.agent.answer_cache import answer_cache
+from src.agent.resilience import llm_breaker, llm_stats
 from src.database.database import Base
 from src.database.seed import get_bookings_data, get_hotel_data, get_room_types_data, get_upsell_offers_data
 from src.database.models import Booking, Hotel, RoomType, UpsellOffer
+from src.services.conversation_cache import conversation_cache
+
+
+async def _seed_test_data(session: AsyncSession) -> None:
+    hotel = Hotel(**get_hotel_data())
+    session.add(hotel)
+    for room_type_data in get_room_types_data():
+        session.add(RoomType(**room_type_data))
+    for booking_data in get_bookings_data():
+        session.add(Booking(**booking_data))
+    for offer_data in get_upsell_offers_data():
+        session.add(UpsellOffer(**offer_data))
+    await session.commit()
+
+
+@pytest.fixture(autouse=True)
+def _clear_answer_cache():
+    """Process-wide caches must not leak answers between tests."""
+    answer_cache.clear()
+    yield
+    answer_cache.clear()
 
 
 @pytest_asyncio.fixture
@@ -20,16 +44,46 @@ async def db_session():
 
     async with session_factory() as session:
         # Seed test data
-        hotel = Hotel(**get_hotel_data())
-        session.add(hotel)
-        for room_type_data in get_room_types_data():
-            session.add(RoomType(**room_type_data))
-        for booking_data in get_bookings_data():
-            session.add(Booking(**booking_data))
-        for offer_data in get_upsell_offers_data():
-            session.add(UpsellOffer(**offer_data))
-        await session.commit()
+        await _seed_test_data(session)
 
         yield session
 
     await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Session factory on a seeded SQLite file, for code that opens its own sessions.
+
+    An in-memory database is private to one connection, so tests that run
+    queries on several sessions at once need a real file.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", echo=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        await _seed_test_data(session)
+
+    yield factory
+
+    await engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def _clear_conversation_cache():
+    """Cached conversation ids belong to the previous test's database."""
+    conversation_cache.clear()
+    yield
+    conversation_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_llm_breaker():
+    """The LLM circuit breaker is process-wide; start each test closed."""
+    llm_breaker.reset()
+    llm_stats.reset()
+    yield
+    llm_breaker.reset()
@@ -0,0 +1,121 @@
+"""Tests for the LLM admission controller (concurrency, priorities, token buckets)."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import anthropic
+import pytest
+
+from benchmarks.stub_llm_server import StubLLMServer
+from src.agent.admission import (
+    PRIORITY_DEFAULT,
+    PRIORITY_IN_HOUSE,
+    AdmissionController,
+    AdmissionTimeout,
+    guest_priority,
+)
+from src.agent.resilience import CircuitBreaker, ResilientLLM
+
+
+def test_guest_priority():
+    assert guest_priority({"status": "checked_in"}) == PRIORITY_IN_HOUSE
+    assert guest_priority(None) == PRIORITY_DEFAULT
+    booked = guest_priority({"status": "confirmed"})
+    assert PRIORITY_IN_HOUSE < booked < PRIORITY_DEFAULT
+
+
+@pytest.mark.asyncio
+async def test_in_house_guests_are_admitted_first():
+    controller = AdmissionController(max_concurrency=1)
+    order: list[str] = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: int) -> None:
+        async with controller.admit(priority):
+            order.append(name)
+            await release.wait()
+
+    holder = asyncio.create_task(request("holder", PRIORITY_DEFAULT))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(request("walk-in", PRIORITY_DEFAULT)),
+        asyncio.create_task(request("in-house", PRIORITY_IN_HOUSE)),
+    ]
+    await asyncio.sleep(0)
+    assert controller.snapshot()["queue_depth"] == 2
+
+    release.set()
+    await asyncio.gather(holder, *waiters)
+    assert order == ["holder", "in-house", "walk-in"]
+
+
+@pytest.mark.asyncio
+async def test_admit_now_never_queues():
+    controller = AdmissionController(max_concurrency=1)
+
+    async with controller.admit_now() as ticket:
+        assert ticket is not None
+        assert controller.snapshot()["in_flight"] == 1
+        async with controller.admit_now() as second:
+            assert second is None  # no free slot
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_output_bucket_waits_and_refunds_unused_tokens():
+    controller = AdmissionController(max_concurrency=10, output_tokens_per_minute=1000)
+
+    async with controller.admit(output_tokens=1000) as ticket:
+        ticket.settle(SimpleNamespace(output_tokens=0))  # all 1000 refunded
+    start = time.perf_counter()
+    async with controller.admit(output_tokens=1000):
+        pass
+    assert time.perf_counter() - start < 0.1
+
+    # Bucket now empty (nothing refunded): 5 tokens at ~16.7/s take ~0.3s
+    start = time.perf_counter()
+    async with controller.admit(output_tokens=5):
+        pass
+    assert time.perf_counter() - start >= 0.25
+
+
+@pytest.mark.asyncio
+async def test_admission_timeout_leaves_queue_clean():
+    controller = AdmissionController(max_concurrency=1)
+    async with controller.admit():
+        with pytest.raises(AdmissionTimeout):
+            async with controller.admit(timeout=0.05):
+                pass
+        assert controller.snapshot()["queue_depth"] == 0
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_against_stub_server():
+    """A burst of calls never has more than the limit in flight upstream."""
+    async with StubLLMServer(latency=0.05) as server:
+        client = anthropic.AsyncAnthropic(
+            api_key="test", base_url=server.base_url, max_retries=0
+        )
+        controller = AdmissionController(max_concurrency=2)
+        llm = ResilientLLM(client, CircuitBreaker(5, 60), controller)
+
+        responses = await asyncio.gather(
+            *(
+                llm.create(
+                    model="claude-test",
+                    max_tokens=100,
+                    messages=[{"role": "user", "content": f"hola {i}"}],
+                )
+                for i in range(6)
+            )
+        )
+        await client.close()
+
+    assert all(r.content[0].text for r in responses)
+    assert len(server.requests) == 6
+    assert server.max_in_flight == 2
+    snapshot = controller.snapshot()
+    assert snapshot["admitted"] == 6
+    assert snapshot["max_wait_ms"] >= 80
@@ -1,12 +1,25 @@
 """Tests for the hotel agent (integration-level, using mocked LLM)."""
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
+import anthropic
 import pytest
 import pytest_asyncio
 
-from src.agent.core import HotelAgent
-from src.database.models import Platform
+from benchmarks.stub_llm_server import (
+    StubLLMServer,
+    text_reply,
+    tool_rounds,
+    tool_use_reply,
+)
+from src.agent.answer_cache import AnswerCache
+from src.agent.core import FALLBACK_RESPONSES, HotelAgent
+from src.agent.resilience import llm_breaker
+from src.config import settings
+from src.database.models import MessageRole, Platform
 from src.database.seed import HOTEL_ID
 from src.services.conversation_service import ConversationService
 from src.services.pms_service import PMSService
@@ -53,13 +66,15 @@ async def test_greeting_response(services, conversation):
         return_value=_mock_anthropic_response("greeting")
     )
 
-    with patch("src.agent.core.anthropic.AsyncAnthropic", return_value=mock_client):
-        agent = HotelAgent(pms, conv_service, HOTEL_ID)
-        result = await agent.process_message(
-            user_message="Hola, buenas tardes!",
-            guest_phone="+5491112345678",
-            conversation_id=conversation.id,
-        )
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Hola, buenas tardes!",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
 
     assert result["response"] != ""
     assert result["intent"] == "greeting"
@@ -74,21 +89,25 @@ async def test_booking_info_intent_detected(services, conversation):
     mock_client = AsyncMock()
     mock_client.messages.create = AsyncMock(
         side_effect=[
-            _mock_anthropic_response("booking_info"),
             _mock_anthropic_response("Tu check-in es a las 15:00hs, Juan!"),
         ]
     )
 
-    with patch("src.agent.core.anthropic.AsyncAnthropic", return_value=mock_client):
-        agent = HotelAgent(pms, conv_service, HOTEL_ID)
-        result = await agent.process_message(
-            user_message="A que hora es el check-in?",
-            guest_phone="+5491112345678",
-            conversation_id=conversation.id,
-        )
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="A que hora es el check-in?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
 
     assert result["intent"] == "booking_info"
     assert result["response"] != ""
+    # Clear keyword match: classified locally, only the answer hits the LLM
+    assert result["metadata"]["classifier"] == "local"
+    assert mock_client.messages.create.call_count == 1
 
 
 @pytest.mark.asyncio
@@ -106,16 +125,21 @@ async def test_out_of_scope_escalation(services, conversation):
         ]
     )
 
-    with patch("src.agent.core.anthropic.AsyncAnthropic", return_value=mock_client):
-        agent = HotelAgent(pms, conv_service, HOTEL_ID)
-        result = await agent.process_message(
-            user_message="Quiero reservar una mesa en un restaurante",
-            guest_phone="+5491112345678",
-            conversation_id=conversation.id,
-        )
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Quiero reservar una mesa en un restaurante",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
 
     assert result["intent"] == "out_of_scope"
     assert result["response"] != ""
+    # Ambiguous keywords: the LLM classifier decides
+    assert result["metadata"]["classifier"] == "llm"
+    assert mock_client.messages.create.call_count == 2
 
 
 @pytest.mark.asyncio
@@ -126,20 +150,777 @@ async def test_amenities_query_intent(services, conversation):
     mock_client = AsyncMock()
     mock_client.messages.create = AsyncMock(
         side_effect=[
-            _mock_anthropic_response("amenities_query"),
             _mock_anthropic_response(
                 "Si! Tenemos WiFi gratuito. La clave es palermo2024."
             ),
         ]
     )
 
-    with patch("src.agent.core.anthropic.AsyncAnthropic", return_value=mock_client):
-        agent = HotelAgent(pms, conv_service, HOTEL_ID)
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert result["intent"] == "amenities_query"
+    assert result["response"] != ""
+
+
+@pytest.mark.asyncio
+async def test_fast_path_threshold_forces_llm_classification(
+    services, conversation, monkeypatch
+):
+    """Verify the LLM classifier runs when the fast path is disabled."""
+    pms, conv_service = services
+    monkeypatch.setattr(settings, "intent_fast_path_threshold", 1.1)
+
+    classification = _mock_anthropic_response("amenities_query")
+    classification.usage = SimpleNamespace(input_tokens=80, output_tokens=3)
+    answer = _mock_anthropic_response("Si! Tenemos WiFi gratuito.")
+    answer.usage = SimpleNamespace(input_tokens=900, output_tokens=20)
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(side_effect=[classification, answer])
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert result["intent"] == "amenities_query"
+    assert result["metadata"]["classifier"] == "llm"
+    assert mock_client.messages.create.call_count == 2
+    # Turn totals include the classification call, not only the answer
+    assert result["usage"]["input_tokens"] == 980
+    assert result["usage"]["output_tokens"] == 23
+    metadata = result["metadata"]
+    assert result["cost_usd"] == pytest.approx(
+        metadata["cost_usd"] + metadata["classification_cost_usd"]
+    )
+    assert result["cost_usd"] > metadata["cost_usd"]
+
+
+@pytest.mark.asyncio
+async def test_single_call_pipeline_classifies_and_answers(
+    services, conversation, monkeypatch
+):
+    """Verify single-call mode uses one LLM call for intent and answer."""
+    pms, conv_service = services
+    monkeypatch.setattr(settings, "agent_pipeline", "single_call")
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response(
+            "<intent>out_of_scope</intent>No puedo reservar restaurantes externos."
+        )
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Quiero reservar una mesa en un restaurante",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert mock_client.messages.create.call_count == 1
+    assert result["intent"] == "out_of_scope"
+    assert result["response"] == "No puedo reservar restaurantes externos."
+    assert result["metadata"]["classifier"] == "single_call"
+
+
+@pytest.mark.asyncio
+async def test_single_call_pipeline_falls_back_without_tag(
+    services, conversation, monkeypatch
+):
+    """Verify a missing intent tag falls back to keyword classification."""
+    pms, conv_service = services
+    monkeypatch.setattr(settings, "agent_pipeline", "single_call")
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("Te ayudo con la reserva!")
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Quiero reservar una mesa en un restaurante",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert result["intent"] == "new_booking"
+    assert result["metadata"]["classifier"] == "single_call_fallback"
+
+
+@pytest.mark.asyncio
+async def test_compiled_graph_is_reused_across_turns(services, conversation):
+    """Verify that one agent serves several turns without recompiling."""
+    pms, conv_service = services
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("greeting")
+    )
+
+    agent = HotelAgent(client=mock_client)
+    graph = agent.graph
+
+    for message in ("Hola!", "Buenos dias"):
+        result = await agent.process_message(
+            user_message=message,
+            guest_phone="+5491112345678",
+            conversation_id=conversation.id,
+            pms=pms,
+            conversation_service=conv_service,
+            hotel_id=HOTEL_ID,
+        )
+        assert result["intent"] == "greeting"
+
+    assert agent.graph is graph
+
+
+@pytest.mark.asyncio
+async def test_prompt_cache_breakpoints_and_usage(services, conversation):
+    """Verify the cached prompt layout and that cache usage is recorded."""
+    pms, conv_service = services
+
+    answer = _mock_anthropic_response("Si! Tenemos WiFi gratuito.")
+    answer.usage = SimpleNamespace(
+        input_tokens=120,
+        output_tokens=30,
+        cache_read_input_tokens=2400,
+        cache_creation_input_tokens=0,
+    )
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(return_value=answer)
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    request = mock_client.messages.create.call_args.kwargs
+    assert request["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert request["system"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert request["messages"][-1]["content"] == "Tienen WiFi?"
+
+    usage = result["metadata"]["usage"]
+    assert usage["cache_read_tokens"] == 2400
+    assert usage["input_tokens"] == 120
+
+
+def _without_breakpoints(value):
+    if isinstance(value, dict):
+        return {
+            key: _without_breakpoints(item)
+            for key, item in value.items()
+            if key != "cache_control"
+        }
+    if isinstance(value, list):
+        return [_without_breakpoints(item) for item in value]
+    return value
+
+
+def _cached_prefix(request: dict, length: int) -> str:
+    """Serialized tools, system and first ``length`` messages of a request."""
+    messages = [
+        {"role": message["role"], "content": _text_blocks(message["content"])}
+        for message in request["messages"][:length]
+    ]
+    prefix = {"tools": request["tools"], "system": request["system"]}
+    prefix["messages"] = messages
+    return json.dumps(_without_breakpoints(prefix), sort_keys=True)
+
+
+def _text_blocks(content) -> list[dict]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return content
+
+
+@pytest.mark.asyncio
+async def test_prompt_prefix_is_stable_across_turns(services, conversation):
+    """Verify a guest with a booking keeps the cached prefix between turns."""
+    pms, conv_service = services
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("Si, WiFi gratuito en todo el hotel.")
+    )
+    agent = HotelAgent(client=mock_client)
+
+    for text in ("Tienen WiFi?", "Tienen pileta?"):
         result = await agent.process_message(
-            user_message="Tienen WiFi?",
+            user_message=text,
             guest_phone="+5491112345678",
             conversation_id=conversation.id,
+            pms=pms,
+            conversation_service=conv_service,
+            hotel_id=HOTEL_ID,
+        )
+        await conv_service.add_message(conversation.id, MessageRole.USER, text)
+        await conv_service.add_message(
+            conversation.id, MessageRole.ASSISTANT, result["response"]
         )
 
-    assert result["intent"] == "amenities_query"
-    assert result["response"] != ""
+    first, second = (call.kwargs for call in mock_client.messages.create.call_args_list)
+    assert "PLR-2024-001" in str(first["system"])
+    assert len(second["messages"]) == 3
+    assert _cached_prefix(second, 1) == _cached_prefix(first, 1)
+
+
+@pytest.mark.asyncio
+async def test_context_queries_run_on_separate_sessions(session_factory):
+    """Verify concurrent context loading returns hotel, history and booking."""
+    async with session_factory() as session:
+        pms = PMSService(session)
+        conv_service = ConversationService(session)
+        conv = await conv_service.get_or_create_conversation(
+            guest_phone="+5491112345678",
+            hotel_id=HOTEL_ID,
+            platform=Platform.TELEGRAM,
+        )
+
+        mock_client = AsyncMock()
+        mock_client.messages.create = AsyncMock(
+            return_value=_mock_anthropic_response("Tu check-in es a las 15:00hs!")
+        )
+
+        agent = HotelAgent(client=mock_client)
+        result = await agent.process_message(
+            user_message="A que hora es el check-in?",
+            guest_phone="+5491112345678",
+            conversation_id=conv.id,
+            pms=pms,
+            conversation_service=conv_service,
+            hotel_id=HOTEL_ID,
+            session_factory=session_factory,
+        )
+
+    metadata = result["metadata"]
+    assert metadata["context_concurrent"] is True
+    assert set(metadata["context_queries_ms"]) == {
+        "hotel",
+        "checkpoint",
+        "history",
+        "booking",
+    }
+    assert metadata["context_checkpoint"] == "miss"
+
+    # The booking loaded on its own session reached the prompt
+    request = mock_client.messages.create.call_args.kwargs
+    assert "PLR-2024-001" in str(request["system"])
+
+
+@pytest.mark.asyncio
+async def test_speculative_classification_overlaps_context_load(
+    services, conversation, monkeypatch
+):
+    """Verify the LLM classification runs while the context is loading."""
+    pms, conv_service = services
+    monkeypatch.setattr(settings, "speculative_classification", True)
+
+    original_history = conv_service.get_conversation_history
+
+    async def slow_history(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return await original_history(*args, **kwargs)
+
+    monkeypatch.setattr(conv_service, "get_conversation_history", slow_history)
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.1)
+        if kwargs["max_tokens"] == 50:
+            return _mock_anthropic_response("out_of_scope")
+        return _mock_anthropic_response("Te comunico con recepcion.")
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(side_effect=slow_create)
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Quiero reservar una mesa en un restaurante",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    metadata = result["metadata"]
+    assert result["intent"] == "out_of_scope"
+    # Both phases take ~100ms; run back to back they would take ~200ms
+    assert metadata["overlap_ms"] >= 50
+    assert metadata["prepare_ms"] < 180
+
+
+@pytest.mark.asyncio
+async def test_sequential_pipeline_without_speculation(
+    services, conversation, monkeypatch
+):
+    """Verify the strictly sequential graph is still available."""
+    pms, conv_service = services
+    monkeypatch.setattr(settings, "speculative_classification", False)
+
+    agent = HotelAgent(client=AsyncMock())
+    result = await agent.process_message(
+        user_message="Hola!",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert result["intent"] == "greeting"
+    assert "overlap_ms" not in result["metadata"]
+
+
+def _mock_tool_use_response(*calls: tuple[str, dict]):
+    """Create a mock Anthropic response that requests the given tools."""
+    blocks = []
+    for i, (name, tool_input) in enumerate(calls):
+        block = MagicMock()
+        block.type = "tool_use"
+        block.id = f"toolu_{i}"
+        block.name = name
+        block.input = tool_input
+        del block.text
+        blocks.append(block)
+
+    mock_response = MagicMock()
+    mock_response.content = blocks
+    mock_response.stop_reason = "tool_use"
+    return mock_response
+
+
+@pytest.mark.asyncio
+async def test_read_only_tools_run_concurrently(session_factory, monkeypatch):
+    """Verify several read-only tool calls overlap and are timed."""
+    async with session_factory() as session:
+        pms = PMSService(session)
+        conv_service = ConversationService(session)
+        conv = await conv_service.get_or_create_conversation(
+            guest_phone="+5491112345678",
+            hotel_id=HOTEL_ID,
+            platform=Platform.TELEGRAM,
+        )
+
+        original = PMSService.get_hotel
+
+        async def slow_get_hotel(self, hotel_id):
+            await asyncio.sleep(0.1)
+            return await original(self, hotel_id)
+
+        mock_client = AsyncMock()
+        mock_client.messages.create = AsyncMock(
+            side_effect=[
+                _mock_tool_use_response(
+                    ("get_hotel_amenities", {}),
+                    ("get_hotel_policies", {}),
+                    ("search_faq", {"query": "mascotas"}),
+                ),
+                _mock_anthropic_response("Tenemos piscina y aceptamos mascotas."),
+            ]
+        )
+
+        agent = HotelAgent(client=mock_client)
+        monkeypatch.setattr(PMSService, "get_hotel", slow_get_hotel)
+        result = await agent.process_message(
+            user_message="Tienen piscina?",
+            guest_phone="+5491112345678",
+            conversation_id=conv.id,
+            pms=pms,
+            conversation_service=conv_service,
+            hotel_id=HOTEL_ID,
+            session_factory=session_factory,
+        )
+
+    metadata = result["metadata"]
+    assert [c["name"] for c in metadata["tool_calls"]].count("search_faq") == 1
+    assert len(metadata["tool_calls"]) == 3
+    assert set(metadata["tool_ms"]) == {
+        "get_hotel_amenities",
+        "get_hotel_policies",
+        "search_faq",
+    }
+    # Three ~100ms lookups overlapped instead of taking ~300ms back to back
+    assert metadata["tool_sum_ms"] >= 300
+    assert metadata["tool_wall_ms"] < 250
+
+    tool_message = mock_client.messages.create.call_args.kwargs["messages"][-1]
+    assert [r["tool_use_id"] for r in tool_message["content"]] == [
+        "toolu_0",
+        "toolu_1",
+        "toolu_2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_intent_tool_subset(services, conversation):
+    """Verify a handler only offers its intent's tools plus escalation."""
+    pms, conv_service = services
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("Si! Tenemos WiFi gratuito.")
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    request = mock_client.messages.create.call_args.kwargs
+    names = [tool["name"] for tool in request["tools"]]
+    assert "escalate_to_human" in names
+    assert "create_booking" not in names
+    metadata = result["metadata"]
+    assert metadata["tools_offered"] == len(names)
+    assert metadata["tool_tokens_saved_est"] > 0
+    assert metadata["tools_widened"] is False
+
+
+@pytest.mark.asyncio
+async def test_request_more_tools_widens_the_subset(services, conversation):
+    """Verify the model can ask for tools its intent's subset lacks."""
+    pms, conv_service = services
+    availability = {"checkin": "2026-12-10", "checkout": "2026-12-11", "num_guests": 2}
+
+    def respond(request: dict) -> dict:
+        if "tools" not in request:
+            return text_reply("booking_info")
+        offered = {tool["name"] for tool in request["tools"]}
+        if tool_rounds(request) == 0:
+            return tool_use_reply("request_more_tools", {"reason": "disponibilidad"})
+        if tool_rounds(request) == 1:
+            # The API only lets the model call tools listed in the request
+            assert "check_availability" in offered
+            return tool_use_reply("check_availability", availability)
+        return text_reply("Si, tenemos habitaciones Standard para esa noche.")
+
+    async with StubLLMServer(responder=respond) as server:
+        client = anthropic.AsyncAnthropic(
+            api_key="test", base_url=server.base_url, max_retries=0
+        )
+        agent = HotelAgent(client=client)
+        result = await agent.process_message(
+            user_message="tienen habitacion para esta noche?",
+            guest_phone="+5491112345678",
+            conversation_id=conversation.id,
+            pms=pms,
+            conversation_service=conv_service,
+            hotel_id=HOTEL_ID,
+        )
+        await client.close()
+
+    first, *_ = [r for r in server.requests if "tools" in r]
+    assert "check_availability" not in {tool["name"] for tool in first["tools"]}
+    metadata = result["metadata"]
+    assert metadata["tools_widened"] is True
+    assert [call["name"] for call in metadata["tool_calls"]] == [
+        "request_more_tools",
+        "check_availability",
+    ]
+    assert result["response"] == "Si, tenemos habitaciones Standard para esa noche."
+
+
+@pytest.mark.asyncio
+async def test_fast_tier_escalates_when_tool_loop_incomplete(services, conversation):
+    """Verify a fast-model turn without an answer is retried on the large model."""
+    pms, conv_service = services
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        side_effect=[
+            _mock_anthropic_response(""),
+            _mock_anthropic_response("Si! Tenemos WiFi gratuito."),
+        ]
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    first, second = mock_client.messages.create.call_args_list
+    assert first.kwargs["model"] == settings.llm_fast_model
+    assert second.kwargs["model"] == settings.llm_model
+    assert result["response"] == "Si! Tenemos WiFi gratuito."
+    metadata = result["metadata"]
+    assert metadata["escalated_from"] == "fast"
+    assert [a["model_tier"] for a in metadata["tier_attempts"]] == ["fast", "large"]
+
+
+@pytest.mark.asyncio
+async def test_request_more_tools_does_not_block_escalation(services, conversation):
+    """Verify the no-op request_more_tools doesn't count as a write."""
+    pms, conv_service = services
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        side_effect=[
+            _mock_tool_use_response(("request_more_tools", {"reason": "otro"})),
+            _mock_anthropic_response(""),
+            _mock_anthropic_response("Si! Tenemos WiFi gratuito."),
+        ]
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    assert result["response"] == "Si! Tenemos WiFi gratuito."
+    assert result["metadata"]["escalated_from"] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_uses_local_fallbacks(services, conversation):
+    """Verify an open circuit breaker answers without calling the LLM."""
+    pms, conv_service = services
+    for _ in range(settings.llm_breaker_failure_threshold):
+        llm_breaker.record_failure()
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("no deberia llamarse")
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Cual es el sentido de la vida?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    mock_client.messages.create.assert_not_called()
+    assert result["intent"] == "out_of_scope"
+    assert result["metadata"]["classifier"] == "breaker_fallback"
+    assert result["metadata"]["circuit_open"] is True
+    assert result["response"] == FALLBACK_RESPONSES["out_of_scope"]
+
+
+class _FakeStream:
+    """Stand-in for ``client.messages.stream(...)`` yielding text deltas."""
+
+    def __init__(self, deltas: list[str]):
+        self._deltas = deltas
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        async def gen():
+            for delta in self._deltas:
+                yield delta
+
+        return gen()
+
+    async def get_final_message(self):
+        return _mock_anthropic_response("".join(self._deltas))
+
+
+@pytest.mark.asyncio
+async def test_streaming_reports_partial_text(services, conversation):
+    """Verify streamed replies reach on_text and time the first token."""
+    pms, conv_service = services
+
+    mock_client = MagicMock()
+    mock_client.messages.stream = MagicMock(
+        return_value=_FakeStream(["Si! ", "Tenemos WiFi ", "gratuito."])
+    )
+    seen: list[str] = []
+
+    async def on_text(text: str) -> None:
+        seen.append(text)
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+        on_text=on_text,
+    )
+
+    assert seen == ["Si!", "Si! Tenemos WiFi", "Si! Tenemos WiFi gratuito."]
+    assert result["response"] == "Si! Tenemos WiFi gratuito."
+    metadata = result["metadata"]
+    assert 0 <= metadata["first_token_ms"] <= metadata["turn_ms"]
+
+
+@pytest.mark.asyncio
+async def test_failing_on_text_keeps_the_answer(services, conversation):
+    """Verify a failing on_text stops streaming without failing the LLM call."""
+    pms, conv_service = services
+
+    mock_client = MagicMock()
+    mock_client.messages.stream = MagicMock(
+        return_value=_FakeStream(["Si! ", "Tenemos WiFi ", "gratuito."])
+    )
+    on_text = AsyncMock(side_effect=RuntimeError("chat unavailable"))
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="Tienen WiFi?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+        on_text=on_text,
+    )
+
+    on_text.assert_awaited_once()
+    mock_client.messages.stream.assert_called_once()
+    assert result["response"] == "Si! Tenemos WiFi gratuito."
+    assert "error" not in result["metadata"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_faq_question_skips_the_llm(services):
+    """Verify a repeated self-contained question is answered from the cache."""
+    pms, conv_service = services
+    conv = await conv_service.get_or_create_conversation(
+        guest_phone="+5491100000000",  # no booking: answer is guest-independent
+        hotel_id=HOTEL_ID,
+        platform=Platform.TELEGRAM,
+    )
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("La clave del WiFi es palermo2024.")
+    )
+    agent = HotelAgent(client=mock_client, answers=AnswerCache(10, 60))
+
+    results = []
+    for question in ("Cual es la clave del wifi?", "clave del WiFi"):
+        results.append(
+            await agent.process_message(
+                user_message=question,
+                guest_phone="+5491100000000",
+                conversation_id=conv.id,
+                pms=pms,
+                conversation_service=conv_service,
+                hotel_id=HOTEL_ID,
+            )
+        )
+
+    assert mock_client.messages.create.call_count == 1
+    assert results[0]["metadata"]["answer_cache"] == "miss"
+    assert results[1]["metadata"]["answer_cache"] == "hit"
+    assert results[1]["response"] == "La clave del WiFi es palermo2024."
+    assert results[1]["intent"] == "amenities_query"
+
+
+@pytest.mark.asyncio
+async def test_cached_answer_is_generated_without_history(services):
+    """Verify personal data from earlier messages can't reach a cached answer."""
+    pms, conv_service = services
+    conv = await conv_service.get_or_create_conversation(
+        guest_phone="+5491100000000",
+        hotel_id=HOTEL_ID,
+        platform=Platform.TELEGRAM,
+    )
+    await conv_service.add_message(
+        conv.id, MessageRole.USER, "Soy Maria Gomez, estoy en la habitacion 304"
+    )
+    await conv_service.add_message(conv.id, MessageRole.ASSISTANT, "Hola Maria!")
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("La clave del WiFi es palermo2024.")
+    )
+    agent = HotelAgent(client=mock_client, answers=AnswerCache(10, 60))
+    result = await agent.process_message(
+        user_message="Cual es la clave del wifi?",
+        guest_phone="+5491100000000",
+        conversation_id=conv.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    request = mock_client.messages.create.call_args.kwargs
+    assert "Maria" not in json.dumps(request["messages"], ensure_ascii=False)
+    assert len(request["messages"]) == 1
+    assert result["metadata"]["answer_cache"] == "miss"
+
+
+@pytest.mark.asyncio
+async def test_turn_records_latency_breakdown(services, conversation, monkeypatch):
+    """Verify every node on the turn's path is timed, plus the DB time."""
+    monkeypatch.setattr(settings, "speculative_classification", True)
+    pms, conv_service = services
+
+    mock_client = AsyncMock()
+    mock_client.messages.create = AsyncMock(
+        return_value=_mock_anthropic_response("Tu check-in es a las 15:00hs!")
+    )
+
+    agent = HotelAgent(client=mock_client)
+    result = await agent.process_message(
+        user_message="A que hora es el check-in?",
+        guest_phone="+5491112345678",
+        conversation_id=conversation.id,
+        pms=pms,
+        conversation_service=conv_service,
+        hotel_id=HOTEL_ID,
+    )
+
+    metadata = result["metadata"]
+    # Parallel nodes (context load and classification) both kept their timing
+    assert set(metadata["node_ms"]) == {
+        "load_context",
+        "classify_intent",
+        "join_context",
+        "handle_booking",
+        "generate_response",
+    }
+    assert metadata["db_queries"] > 0
+    assert metadata["db_ms"] >= 0
+    assert metadata["llm_rounds"] == 1
+    assert metadata["tool_ms"] == {}
@@ -0,0 +1,79 @@
+"""Tests for the dashboard analytics."""
+
+import pytest
+
+from src.database.models import MessageRole, Platform
+from src.database.seed import HOTEL_ID
+from src.services.analytics_service import AnalyticsService
+from src.services.conversation_service import ConversationService
+
+
+@pytest.mark.asyncio
+async def test_latency_breakdown_percentiles(db_session):
+    """Verify p50/p95 are computed per stage, node and tool."""
+    conv_service = ConversationService(db_session)
+    conv = await conv_service.get_or_create_conversation(
+        guest_phone="+5491112345678", hotel_id=HOTEL_ID, platform=Platform.TELEGRAM
+    )
+    for i in range(1, 21):
+        await conv_service.add_message(
+            conv.id,
+            MessageRole.ASSISTANT,
+            f"respuesta {i}",
+            metadata={
+                "turn_ms": i * 100,
+                "db_ms": i,
+                "node_ms": {"load_context": i},
+                "tool_ms": {"search_faq": 50} if i % 2 else {},
+            },
+        )
+    # Messages without timings (e.g. older rows) are skipped
+    await conv_service.add_message(conv.id, MessageRole.ASSISTANT, "sin metadata")
+
+    breakdown = await AnalyticsService(db_session)._latency_breakdown()
+
+    assert breakdown["turn"] == {"p50": 1000, "p95": 1900, "count": 20}
+    assert breakdown["db"]["p95"] == 19
+    assert breakdown["node.load_context"]["count"] == 20
+    assert breakdown["tool.search_faq"] == {"p50": 50, "p95": 50, "count": 10}
+    assert "classification" not in breakdown
+
+
+@pytest.mark.asyncio
+async def test_usage_metrics_by_intent_day_and_conversation(db_session):
+    """Verify token and cost totals roll up from the assistant messages."""
+    conv_service = ConversationService(db_session)
+    conv = await conv_service.get_or_create_conversation(
+        guest_phone="+5491112345678", hotel_id=HOTEL_ID, platform=Platform.TELEGRAM
+    )
+    await conv_service.add_message(conv.id, MessageRole.USER, "Tienen WiFi?")
+    for intent, cost in (("faq_general", 0.001), ("new_booking", 0.02)) * 2:
+        await conv_service.add_message(
+            conv.id,
+            MessageRole.ASSISTANT,
+            "respuesta",
+            intent=intent,
+            model="claude-sonnet-4-20250514",
+            usage={
+                "input_tokens": 1000,
+                "output_tokens": 100,
+                "cache_read_tokens": 500,
+            },
+            cost_usd=cost,
+        )
+
+    usage = await AnalyticsService(db_session).get_usage_metrics()
+
+    assert usage["totals"]["turns"] == 4
+    assert usage["totals"]["input_tokens"] == 4000
+    assert usage["totals"]["cache_read_tokens"] == 2000
+    assert usage["totals"]["cost_usd"] == pytest.approx(0.042)
+    # Most expensive intent first
+    assert [row["intent"] for row in usage["by_intent"]] == [
+        "new_booking",
+        "faq_general",
+    ]
+    assert usage["by_intent"][0]["cost_per_turn_usd"] == pytest.approx(0.02)
+    assert len(usage["by_day"]) == 1
+    assert usage["by_day"][0]["turns"] == 4
+    assert usage["by_conversation"][0]["conversation_id"] == str(conv.id)
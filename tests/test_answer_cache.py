@@ -0,0 +1,67 @@
+"""Tests for the FAQ/amenities answer cache."""
+
+from unittest.mock import patch
+
+from src.agent.answer_cache import AnswerCache, normalize_question
+from src.agent.hotel_context import hotel_data_version
+
+
+def test_normalize_question_ignores_wording():
+    assert normalize_question("¿Cuál es la clave del WiFi?") == "clave wifi"
+    assert normalize_question("clave wifi") == "clave wifi"
+    assert normalize_question("a que hora es el desayuno") != normalize_question(
+        "hay desayuno?"
+    )
+
+
+def test_hit_after_put():
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+    assert cache.get("h1", "v1", "amenities_query", "clave del wifi?") is None
+
+    cache.put("h1", "v1", "amenities_query", "clave del wifi?", "palermo2024")
+
+    assert cache.get("h1", "v1", "amenities_query", "Cual es la clave del wifi") == (
+        "palermo2024"
+    )
+    assert cache.snapshot()["hits"] == 1
+    assert cache.snapshot()["misses"] == 1
+
+
+def test_intent_is_part_of_the_key():
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+    cache.put("h1", "v1", "amenities_query", "wifi", "palermo2024")
+    assert cache.get("h1", "v1", "faq_general", "wifi") is None
+
+
+def test_lru_eviction():
+    cache = AnswerCache(max_entries=2, ttl_seconds=60)
+    cache.put("h1", "v1", "amenities_query", "wifi", "a")
+    cache.put("h1", "v1", "amenities_query", "piscina", "b")
+    cache.get("h1", "v1", "amenities_query", "wifi")
+    cache.put("h1", "v1", "amenities_query", "gimnasio", "c")
+
+    assert cache.get("h1", "v1", "amenities_query", "piscina") is None
+    assert cache.get("h1", "v1", "amenities_query", "wifi") == "a"
+
+
+def test_ttl_expiry():
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+    with patch("src.agent.answer_cache.time.monotonic", return_value=1000.0):
+        cache.put("h1", "v1", "amenities_query", "wifi", "a")
+    with patch("src.agent.answer_cache.time.monotonic", return_value=1061.0):
+        assert cache.get("h1", "v1", "amenities_query", "wifi") is None
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_hotel_data_change_invalidates():
+    hotel = {"amenities": {"wifi": {"password": "palermo2024"}}, "policies": {}, "faq": []}
+    old_version = hotel_data_version(hotel)
+    cache = AnswerCache(max_entries=10, ttl_seconds=60)
+    cache.put("h1", old_version, "amenities_query", "wifi", "palermo2024")
+
+    hotel["amenities"]["wifi"]["password"] = "soho2025"
+    new_version = hotel_data_version(hotel)
+
+    assert new_version != old_version
+    assert cache.get("h1", new_version, "amenities_query", "wifi") is None
+    assert cache.snapshot()["entries"] == 0
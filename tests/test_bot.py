@@ -0,0 +1,403 @@
+"""Tests for the Telegram bot helpers."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import anthropic
+import pytest
+from sqlalchemy import event, func, select
+from telegram.error import NetworkError, RetryAfter
+
+from benchmarks.stub_llm_server import StubLLMServer, text_reply, tool_use_reply
+from src import bot
+from src.agent.core import HotelAgent
+from src.bot import TelegramReplyStreamer, process_turn
+from src.config import settings
+from src.database.models import Message, MessageRole
+from src.database.seed import HOTEL_ID
+from src.services.conversation_service import ConversationService
+from src.services.pms_service import PMSService
+
+
+@pytest.fixture
+def bot_db(session_factory, monkeypatch):
+    """Run process_turn on the test database, without streaming or summaries."""
+    monkeypatch.setattr(settings, "telegram_streaming", False)
+    monkeypatch.setattr(settings, "history_summary_enabled", False)
+    monkeypatch.setattr(bot, "async_session", session_factory)
+
+
+def _source_message():
+    sent = MagicMock()
+    sent.edit_text = AsyncMock()
+    source = MagicMock()
+    source.reply_text = AsyncMock(return_value=sent)
+    return source, sent
+
+
+@pytest.mark.asyncio
+async def test_streamer_throttles_edits(monkeypatch):
+    """Verify partial updates are throttled and the final text is shown."""
+    monkeypatch.setattr(settings, "telegram_edit_interval_seconds", 0.05)
+    source, sent = _source_message()
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.update("Hola")
+    await streamer.update("Hola! Te")
+    await streamer.update("Hola! Te ayudo")
+    await streamer.finish("Hola! Te ayudo con eso.")
+
+    source.reply_text.assert_awaited_once_with("Hola")
+    # Intermediate updates fell inside the edit interval; only the final edit
+    sent.edit_text.assert_awaited_once_with("Hola! Te ayudo con eso.")
+
+
+@pytest.mark.asyncio
+async def test_streamer_edits_after_interval(monkeypatch):
+    """Verify updates are edited in once the interval has elapsed."""
+    monkeypatch.setattr(settings, "telegram_edit_interval_seconds", 0)
+    source, sent = _source_message()
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.update("Hola")
+    await streamer.update("Hola! Te ayudo")
+    await streamer.finish("Hola! Te ayudo")
+
+    sent.edit_text.assert_awaited_once_with("Hola! Te ayudo")
+
+
+@pytest.mark.asyncio
+async def test_streamer_final_edit_honours_retry_after(monkeypatch):
+    """Verify a rate-limited final edit is retried after RetryAfter."""
+    monkeypatch.setattr(settings, "telegram_edit_interval_seconds", 0)
+    source, sent = _source_message()
+    sent.edit_text.side_effect = [RetryAfter(0), None]
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.update("Hola")
+    await streamer.finish("Hola! Te ayudo con eso.")
+
+    assert sent.edit_text.await_count == 2
+    source.reply_text.assert_awaited_once_with("Hola")
+
+
+@pytest.mark.asyncio
+async def test_streamer_failing_final_edit_replies_in_full(monkeypatch):
+    """Verify the full reply is sent if the final edit keeps failing."""
+    monkeypatch.setattr(settings, "telegram_edit_interval_seconds", 0)
+    source, sent = _source_message()
+    sent.edit_text.side_effect = RetryAfter(0)
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.update("Hola")
+    await streamer.finish("Hola! Te ayudo con eso.")
+
+    assert [call.args[0] for call in source.reply_text.await_args_list] == [
+        "Hola",
+        "Hola! Te ayudo con eso.",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_streamer_without_partial_text_replies_once():
+    """Verify non-streamed replies (e.g. greetings) are sent normally."""
+    source, sent = _source_message()
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.finish("Hola! Bienvenido/a")
+
+    source.reply_text.assert_awaited_once_with("Hola! Bienvenido/a")
+    sent.edit_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_streamer_falls_back_when_first_reply_fails():
+    """Verify a failed first reply stops streaming and finish replies plainly."""
+    source, sent = _source_message()
+    source.reply_text.side_effect = [NetworkError("timed out"), sent]
+    streamer = TelegramReplyStreamer(source)
+
+    await streamer.update("Hola")
+    await streamer.update("Hola! Te ayudo")
+    await streamer.finish("Hola! Te ayudo con eso.")
+
+    assert [call.args[0] for call in source.reply_text.await_args_list] == [
+        "Hola",
+        "Hola! Te ayudo con eso.",
+    ]
+    sent.edit_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_process_turn_answers_a_burst_once(session_factory, monkeypatch):
+    """Verify coalesced messages are stored one by one and answered once."""
+    agent = MagicMock()
+    agent.process_message = AsyncMock(
+        return_value={
+            "response": "Hola Juan!",
+            "intent": "booking_info",
+            "model": "claude-haiku-4-5",
+            "usage": {"input_tokens": 1200, "output_tokens": 40},
+            "cost_usd": 0.00112,
+        }
+    )
+    monkeypatch.setattr(bot, "get_agent", lambda: agent)
+
+    messages = []
+    for text in ("hola", "tengo una reserva", "PLR-2024-001"):
+        message = MagicMock()
+        message.text = text
+        message.reply_text = AsyncMock()
+        messages.append(message)
+
+    await process_turn("+5491112345678", messages)
+
+    agent.process_message.assert_awaited_once()
+    kwargs = agent.process_message.call_args.kwargs
+    assert kwargs["user_message"] == "hola\ntengo una reserva\nPLR-2024-001"
+    messages[-1].reply_text.assert_awaited_once_with("Hola Juan!")
+    messages[0].reply_text.assert_not_awaited()
+
+    async with session_factory() as session:
+        rows = (await session.execute(select(Message))).scalars().all()
+    user_rows = [r.content for r in rows if r.role == MessageRole.USER]
+    assert sorted(user_rows) == sorted(m.text for m in messages)
+    assistant = [r for r in rows if r.role == MessageRole.ASSISTANT]
+    assert assistant[0].metadata_json["coalesced_messages"] == 3
+    assert assistant[0].model == "claude-haiku-4-5"
+    assert assistant[0].input_tokens == 1200
+    assert assistant[0].cache_read_tokens == 0
+    assert assistant[0].cost_usd == pytest.approx(0.00112)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_process_turn_commits_once(session_factory, monkeypatch):
+    """Verify a turn is written in one commit, after the agent has run."""
+    engine = session_factory.kw["bind"].sync_engine
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+    seen_during_turn = []
+
+    async def process_message(**kwargs):
+        # No pooled connection is held by the turn while the agent runs
+        assert session_factory.kw["bind"].pool.checkedout() == 0
+        # The agent reads history on its own sessions: the current turn's
+        # messages must not be there yet (they'd be sent twice to the LLM)
+        async with session_factory() as other:
+            seen_during_turn.append(
+                await other.scalar(select(func.count()).select_from(Message))
+            )
+        return {"response": "Hola!", "intent": "greeting"}
+
+    agent = MagicMock()
+    agent.process_message = process_message
+    monkeypatch.setattr(bot, "get_agent", lambda: agent)
+
+    for text in ("hola", "necesito toallas"):
+        message = MagicMock()
+        message.text = text
+        message.reply_text = AsyncMock()
+        commits.clear()
+        await process_turn("+5491112345678", [message])
+        assert len(commits) == 1
+
+    # First turn saw an empty history, second only the first turn's messages
+    assert seen_during_turn == [0, 2]
+    async with session_factory() as session:
+        rows = (
+            (await session.execute(select(Message).order_by(Message.created_at)))
+            .scalars()
+            .all()
+        )
+    assert [(r.role, r.content) for r in rows] == [
+        (MessageRole.USER, "hola"),
+        (MessageRole.ASSISTANT, "Hola!"),
+        (MessageRole.USER, "necesito toallas"),
+        (MessageRole.ASSISTANT, "Hola!"),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_process_turn_streams_from_stub_llm(session_factory, monkeypatch):
+    """Verify a full streamed turn (tool round included) over the stub API."""
+    monkeypatch.setattr(settings, "telegram_streaming", True)
+    monkeypatch.setattr(settings, "telegram_edit_interval_seconds", 0)
+    replies = [
+        tool_use_reply("get_booking_details", {"confirmation_number": "PLR-2024-001"}),
+        text_reply("Hola Juan! Tu check-in es el 15 de marzo desde las 15:00."),
+    ]
+
+    def respond(request: dict) -> dict:
+        if "tools" not in request:
+            return text_reply("booking_info")
+        return replies.pop(0)
+
+    async with StubLLMServer(responder=respond) as server:
+        client = anthropic.AsyncAnthropic(
+            api_key="test", base_url=server.base_url, max_retries=0
+        )
+        agent = HotelAgent(client=client)
+        monkeypatch.setattr(bot, "get_agent", lambda: agent)
+        source, sent = _source_message()
+        source.text = "Cuando es mi check-in? PLR-2024-001"
+
+        await process_turn("+5491112345678", [source])
+        await client.close()
+
+    handler_requests = [r for r in server.requests if "tools" in r]
+    assert len(handler_requests) == 2
+    assert all(request.get("stream") for request in handler_requests)
+    shown = [call.args[0] for call in source.reply_text.await_args_list] + [
+        call.args[0] for call in sent.edit_text.await_args_list
+    ]
+    assert shown[-1] == "Hola Juan! Tu check-in es el 15 de marzo desde las 15:00."
+    async with session_factory() as session:
+        reply = await session.scalar(
+            select(Message).where(Message.role == MessageRole.ASSISTANT)
+        )
+    assert reply.metadata_json["tool_ms"].keys() == {"get_booking_details"}
+    assert reply.input_tokens > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_next_turn_loads_context_from_checkpoint(session_factory, monkeypatch):
+    """Verify the checkpoint replaces the history queries until it goes stale."""
+    agent = HotelAgent(client=AsyncMock())
+    monkeypatch.setattr(bot, "get_agent", lambda: agent)
+    phone = "+5491112345678"
+
+    async def turn(text: str) -> dict:
+        source, _ = _source_message()
+        source.text = text
+        await process_turn(phone, [source])
+        async with session_factory() as session:
+            reply = await session.scalar(
+                select(Message)
+                .where(Message.role == MessageRole.ASSISTANT)
+                .order_by(Message.created_at.desc())
+                .limit(1)
+            )
+        return reply.metadata_json
+
+    first = await turn("Hola!")
+    second = await turn("Buenas!")
+    assert first["context_checkpoint"] == "miss"
+    assert second["context_checkpoint"] == "hit"
+    assert set(second["context_queries_ms"]) == {"hotel", "checkpoint"}
+    assert second["db_queries"] < first["db_queries"]
+
+    # The checkpointed window matches the messages table
+    async with session_factory() as session:
+        service = ConversationService(session)
+        conversation = await service.get_or_create_conversation(phone, HOTEL_ID)
+        checkpoint = await service.get_checkpoint(conversation.id)
+        window = await service.get_history_window(conversation.id)
+        assert checkpoint["window"]["total"] == window["total"] == 4
+        assert [m["content"] for m in checkpoint["window"]["messages"]] == [
+            m["content"] for m in window["messages"]
+        ]
+        assert checkpoint["booking"]["confirmation_number"] == "PLR-2024-001"
+
+        # Any other write to the conversation makes it stale
+        await service.add_message(conversation.id, MessageRole.ASSISTANT, "Staff")
+        assert await service.get_checkpoint(conversation.id) is None
+
+    third = await turn("Hola de nuevo!")
+    assert third["context_checkpoint"] == "miss"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_checkpoint_picks_up_booking_linked_later(session_factory, monkeypatch):
+    """Verify a booking created after the first turn is loaded, then expires."""
+    agent = HotelAgent(client=AsyncMock())
+    monkeypatch.setattr(bot, "get_agent", lambda: agent)
+    phone = "+5491177778888"
+
+    async def turn(text: str) -> Message:
+        source, _ = _source_message()
+        source.text = text
+        await process_turn(phone, [source])
+        async with session_factory() as session:
+            return await session.scalar(
+                select(Message)
+                .where(Message.role == MessageRole.ASSISTANT)
+                .order_by(Message.created_at.desc())
+                .limit(1)
+            )
+
+    first = await turn("Hola!")
+    assert first.content.startswith("Hola! Bienvenido/a")
+
+    async with session_factory() as session:
+        created = await PMSService(session).create_booking(
+            hotel_id=HOTEL_ID,
+            guest_name="Ana Perez",
+            guest_phone=phone,
+            guest_email=None,
+            checkin_date="2026-12-20",
+            checkout_date="2026-12-22",
+            room_type="Standard",
+            num_guests=2,
+        )
+    assert created["success"]
+
+    # The checkpoint had no booking: the one linked this turn is queried
+    second = await turn("Hola!")
+    assert second.content.startswith("Hola Ana Perez!")
+    assert second.metadata_json["context_checkpoint"] == "partial"
+
+    third = await turn("Hola!")
+    assert third.content.startswith("Hola Ana Perez!")
+    assert third.metadata_json["context_checkpoint"] == "hit"
+
+    # Past its TTL the checkpointed booking is read again
+    monkeypatch.setattr(settings, "agent_checkpoint_booking_ttl_seconds", 0)
+    fourth = await turn("Hola!")
+    assert fourth.content.startswith("Hola Ana Perez!")
+    assert fourth.metadata_json["context_checkpoint"] == "partial"
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("bot_db")
+async def test_process_turn_resumes_cached_conversation(session_factory, monkeypatch):
+    """Verify later turns skip the conversation lookup until it is escalated."""
+    statements: list[str] = []
+    event.listen(
+        session_factory.kw["bind"].sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    conversation_ids = []
+
+    async def process_message(**kwargs):
+        conversation_ids.append(kwargs["conversation_id"])
+        if kwargs["user_message"] == "quiero hablar con alguien":
+            await kwargs["conversation_service"].escalate_conversation(
+                kwargs["conversation_id"], "Pide un humano"
+            )
+        return {"response": "Listo!", "intent": "faq_general"}
+
+    agent = MagicMock()
+    agent.process_message = process_message
+    monkeypatch.setattr(bot, "get_agent", lambda: agent)
+
+    lookups = []
+    for text in ("hola", "quiero hablar con alguien", "sigo aca"):
+        message = MagicMock()
+        message.text = text
+        message.reply_text = AsyncMock()
+        statements.clear()
+        await process_turn("+5491112345678", [message])
+        lookups.append(
+            sum("FROM conversations" in s and "SELECT" in s for s in statements)
+        )
+
+    # Second turn resumed from memory; escalation forced a fresh lookup
+    assert lookups[1] == 0
+    assert lookups[2] == 1
+    assert conversation_ids[0] == conversation_ids[1] != conversation_ids[2]
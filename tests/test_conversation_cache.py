@@ -0,0 +1,127 @@
+"""Tests for the in-process cache of active conversations."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, select
+
+from src.database.models import Conversation, ConversationStatus, MessageRole
+from src.database.seed import HOTEL_ID
+from src.services.conversation_cache import ConversationCache, conversation_cache
+from src.services.conversation_service import ConversationService
+
+PHONE = "+5491112345678"
+
+
+def _conversation(phone: str, status=ConversationStatus.ACTIVE) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        guest_phone=phone,
+        hotel_id=HOTEL_ID,
+        booking_id=None,
+        status=status,
+        last_message_at=datetime.now(timezone.utc),
+    )
+
+
+def test_least_recently_used_is_evicted():
+    cache = ConversationCache(max_entries=2)
+    first, second, third = (_conversation(f"+54911000{i}") for i in range(3))
+    cache.put(first)
+    cache.put(second)
+    assert cache.get(first.guest_phone, HOTEL_ID).id == first.id
+
+    cache.put(third)
+
+    assert cache.get(second.guest_phone, HOTEL_ID) is None
+    assert cache.get(first.guest_phone, HOTEL_ID) is not None
+    assert cache.snapshot()["entries"] == 2
+
+
+def test_invalidate_by_id_and_inactive_put():
+    cache = ConversationCache(max_entries=10)
+    conversation = _conversation(PHONE)
+    cache.put(conversation)
+
+    cache.invalidate_id(conversation.id)
+    assert cache.get(PHONE, HOTEL_ID) is None
+
+    cache.put(conversation)
+    escalated = {**vars(conversation), "status": ConversationStatus.ESCALATED}
+    cache.put(SimpleNamespace(**escalated))
+    assert cache.get(PHONE, HOTEL_ID) is None
+
+
+def _count_queries(session_factory) -> list[str]:
+    statements: list[str] = []
+    event.listen(
+        session_factory.kw["bind"].sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_cached_conversation_resumes_without_query(session_factory):
+    """Verify a cache hit skips the lookup and still writes the conversation."""
+    async with session_factory() as session:
+        service = ConversationService(session)
+        created = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+
+    statements = _count_queries(session_factory)
+    async with session_factory() as session:
+        service = ConversationService(session)
+        resumed = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        assert resumed.id == created.id
+        assert statements == []
+
+        await service.add_message(resumed.id, MessageRole.USER, "Hola")
+
+    assert not any(s.lstrip().startswith("SELECT") for s in statements)
+    async with session_factory() as session:
+        stored = await session.get(Conversation, created.id)
+        assert stored.last_message_at > created.last_message_at.replace(tzinfo=None)
+        assert stored.status == ConversationStatus.ACTIVE
+
+
+@pytest.mark.asyncio
+async def test_reset_and_escalation_invalidate(session_factory):
+    """Verify /reset and escalation start a new conversation next time."""
+    async with session_factory() as session:
+        service = ConversationService(session)
+        first = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        await service.escalate_conversation(first.id, "Pide hablar con recepcion")
+        assert conversation_cache.get(PHONE, HOTEL_ID) is None
+
+        second = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        assert second.id != first.id
+        await service.reset_conversation(PHONE, HOTEL_ID)
+        assert conversation_cache.get(PHONE, HOTEL_ID) is None
+
+        third = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        assert third.id not in (first.id, second.id)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_cached_conversation_is_closed(session_factory):
+    """Verify a cached conversation past the timeout is closed, not resumed."""
+    async with session_factory() as session:
+        service = ConversationService(session)
+        old = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        old.last_message_at = datetime.now(timezone.utc) - timedelta(hours=5)
+        await session.commit()
+        conversation_cache.put(old)
+
+    async with session_factory() as session:
+        service = ConversationService(session)
+        new = await service.get_or_create_conversation(PHONE, HOTEL_ID)
+        closed = await session.scalar(
+            select(Conversation.status).where(Conversation.id == old.id)
+        )
+
+    assert new.id != old.id
+    assert closed == ConversationStatus.RESOLVED
+    assert conversation_cache.get(PHONE, HOTEL_ID).id == new.id
@@ -0,0 +1,83 @@
+"""Tests for the token-budgeted history and its rolling summary."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.agent.history import HistorySummarizer, build_history, recent_window
+from src.config import settings
+from src.database.models import MessageRole, Platform
+from src.database.seed import HOTEL_ID
+from src.services.conversation_service import ConversationService
+
+
+def _msg(role: str, content: str) -> dict:
+    return {"role": role, "content": content, "intent": None}
+
+
+class TestBuildHistory:
+    def test_recent_window_respects_budget(self):
+        messages = [_msg("user", "x" * 350) for _ in range(5)]  # ~100 tokens each
+        assert recent_window(messages, 250) == 2
+
+    def test_newest_message_is_always_kept(self):
+        assert recent_window([_msg("user", "x" * 3500)], 10) == 1
+
+    def test_summary_leads_and_summarized_messages_are_skipped(self):
+        window = {
+            "summary": "El huesped pregunto por el WiFi.",
+            "summarized_count": 4,
+            "total": 6,
+            "messages": [_msg("user", f"m{i}") for i in range(2, 6)],
+        }
+        history, stats = build_history(window, budget=1000)
+        assert "WiFi" in history[0]["content"]
+        assert [m["content"] for m in history[2:]] == ["m4", "m5"]
+        assert stats["history_messages"] == 2
+        assert stats["history_summarized"] is True
+
+    def test_no_summary(self):
+        window = {
+            "summary": None,
+            "summarized_count": 0,
+            "total": 2,
+            "messages": [_msg("user", "hola"), _msg("assistant", "Hola!")],
+        }
+        history, stats = build_history(window, budget=1000)
+        assert [m["content"] for m in history] == ["hola", "Hola!"]
+        assert stats["history_dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_summarizer_folds_messages_outside_budget(session_factory, monkeypatch):
+    """Verify old messages are folded into the stored summary."""
+    monkeypatch.setattr(settings, "history_token_budget", 250)
+    async with session_factory() as session:
+        service = ConversationService(session)
+        conv = await service.get_or_create_conversation(
+            guest_phone="+5491112345678",
+            hotel_id=HOTEL_ID,
+            platform=Platform.TELEGRAM,
+        )
+        for i in range(6):
+            role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+            await service.add_message(conv.id, role, f"{i} " + "x" * 350)
+
+    block = MagicMock()
+    block.text = "El huesped consulto por su reserva."
+    client = AsyncMock()
+    client.messages.create = AsyncMock(return_value=MagicMock(content=[block]))
+
+    summarizer = HistorySummarizer(client=client)
+    assert await summarizer.update(conv.id, session_factory) is True
+    # Nothing new fell out of the budget: no second LLM call
+    assert await summarizer.update(conv.id, session_factory) is False
+    assert client.messages.create.await_count == 1
+
+    async with session_factory() as session:
+        window = await ConversationService(session).get_history_window(conv.id)
+    assert window["summary"] == "El huesped consulto por su reserva."
+    assert window["summarized_count"] == 4
+    history, stats = build_history(window)
+    assert stats["history_messages"] == 2
+    assert len(history) == 4
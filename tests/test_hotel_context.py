@@ -0,0 +1,53 @@
+"""Tests for the per-intent hotel prompt fragments."""
+
+from src.agent.hotel_context import HotelContextStore, hotel_data_version
+
+HOTEL = {
+    "id": "hotel-1",
+    "name": "Hotel Palermo Soho",
+    "description": "Boutique hotel",
+    "amenities": {"wifi": {"available": True, "cost": "free"}},
+    "policies": {"checkin": "15:00", "checkout": "11:00"},
+    "faq": [{"question": "Aceptan mascotas?", "answer": "Si, hasta 10kg."}],
+    "contact_phone": "+54 11 4833-1234",
+    "address": "Honduras 5000",
+}
+
+
+class TestHotelPromptFragments:
+    def test_intent_gets_only_its_sections(self):
+        fragments = HotelContextStore().get(HOTEL)
+        block = fragments.for_intent("booking_info")
+        assert "15:00" in block
+        assert "wifi" not in block
+        assert "mascotas" not in block
+
+    def test_faq_intent_includes_faq(self):
+        block = HotelContextStore().get(HOTEL).for_intent("faq_general")
+        assert "P: Aceptan mascotas?" in block
+
+    def test_unknown_intent_gets_everything(self):
+        block = HotelContextStore().get(HOTEL).for_intent("single_call")
+        assert all(text in block for text in ("Boutique", "wifi", "15:00", "10kg"))
+
+    def test_fragments_rebuilt_only_on_change(self):
+        store = HotelContextStore()
+        first = store.get(HOTEL)
+        assert store.get(dict(HOTEL)) is first
+        assert store.builds == 1
+
+        changed = {**HOTEL, "policies": {"checkin": "14:00"}}
+        assert store.get(changed).version == hotel_data_version(changed)
+        assert "14:00" in store.get(changed).for_intent("booking_info")
+        assert store.builds == 2
+
+    def test_known_version_skips_hashing(self, monkeypatch):
+        store = HotelContextStore()
+        version = hotel_data_version(HOTEL)
+        first = store.get(HOTEL, version)
+
+        def fail(hotel_info):
+            raise AssertionError("hotel record hashed again")
+
+        monkeypatch.setattr("src.agent.hotel_context.hotel_data_version", fail)
+        assert store.get(dict(HOTEL), version) is first
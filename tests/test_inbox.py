@@ -0,0 +1,140 @@
+"""Tests for inbound message debouncing and per-guest turn ordering."""
+
+import asyncio
+import time
+
+import pytest
+
+from src.inbox import ConversationMailbox, MessageDebouncer
+
+
+class _Recorder:
+    def __init__(self):
+        self.batches: list[tuple[str, list[str], float]] = []
+
+    async def __call__(self, key: str, items: list[str]) -> None:
+        self.batches.append((key, items, time.monotonic()))
+
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced_into_one_batch():
+    recorder = _Recorder()
+    debouncer = MessageDebouncer(recorder, window=0.05, max_wait=1.0)
+
+    for text in ("hola", "tengo una reserva", "PLR-2024-001"):
+        debouncer.add("guest", text)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    assert [(k, items) for k, items, _ in recorder.batches] == [
+        ("guest", ["hola", "tengo una reserva", "PLR-2024-001"])
+    ]
+    assert debouncer.snapshot() == {"pending_batches": 0, "messages": 3, "turns": 1}
+
+
+@pytest.mark.asyncio
+async def test_max_wait_caps_a_long_burst():
+    recorder = _Recorder()
+    debouncer = MessageDebouncer(recorder, window=0.05, max_wait=0.1)
+
+    start = time.monotonic()
+    for i in range(8):  # keeps arriving inside the window for ~0.2s
+        debouncer.add("guest", f"m{i}")
+        await asyncio.sleep(0.025)
+    await asyncio.sleep(0.1)
+
+    assert len(recorder.batches) == 2
+    assert recorder.batches[0][2] - start < 0.15
+    assert sum(len(items) for _, items, _ in recorder.batches) == 8
+
+
+@pytest.mark.asyncio
+async def test_guests_are_batched_separately():
+    recorder = _Recorder()
+    debouncer = MessageDebouncer(recorder, window=0.05, max_wait=1.0)
+
+    debouncer.add("a", "hola")
+    debouncer.add("b", "buenas")
+    await asyncio.sleep(0.1)
+
+    assert sorted((k, items) for k, items, _ in recorder.batches) == [
+        ("a", ["hola"]),
+        ("b", ["buenas"]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_flush_all_answers_pending_batches_now():
+    recorder = _Recorder()
+    debouncer = MessageDebouncer(recorder, window=10, max_wait=10)
+
+    debouncer.add("guest", "hola")
+    await debouncer.flush_all()
+
+    assert [items for _, items, _ in recorder.batches] == [["hola"]]
+
+
+@pytest.mark.asyncio
+async def test_mailbox_runs_one_guest_in_order_and_guests_in_parallel():
+    mailbox = ConversationMailbox(idle_seconds=1)
+    events: list[str] = []
+
+    def job(name: str, delay: float):
+        async def run() -> str:
+            events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            events.append(f"end {name}")
+            return name
+
+        return run
+
+    start = time.monotonic()
+    results = await asyncio.gather(
+        mailbox.submit("a", job("a1", 0.05)),
+        mailbox.submit("a", job("a2", 0.01)),
+        mailbox.submit("b", job("b1", 0.05)),
+    )
+
+    assert results == ["a1", "a2", "b1"]
+    # a2 waited for a1 even though it is shorter; b1 overlapped with a1
+    assert events.index("end a1") < events.index("start a2")
+    assert events.index("start b1") < events.index("end a1")
+    assert time.monotonic() - start < 0.1
+    await mailbox.close()
+
+
+@pytest.mark.asyncio
+async def test_mailbox_propagates_errors_and_keeps_going():
+    mailbox = ConversationMailbox(idle_seconds=1)
+
+    async def fail() -> None:
+        raise ValueError("boom")
+
+    async def ok() -> str:
+        return "ok"
+
+    failed = mailbox.submit("a", fail)
+    after = mailbox.submit("a", ok)
+    with pytest.raises(ValueError):
+        await failed
+    assert await after == "ok"
+    await mailbox.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_mailboxes_are_evicted():
+    mailbox = ConversationMailbox(idle_seconds=0.05)
+
+    async def ok() -> None:
+        return None
+
+    await mailbox.submit("a", ok)
+    assert mailbox.snapshot()["active"] == 1
+    await asyncio.sleep(0.1)
+    assert mailbox.snapshot()["active"] == 0
+    assert mailbox.snapshot()["evicted"] == 1
+
+    # A new message after eviction gets a fresh mailbox
+    await mailbox.submit("a", ok)
+    assert mailbox.snapshot()["jobs_run"] == 2
+    await mailbox.close()
@@ -2,7 +2,14 @@
 
 import pytest
 
-from src.agent.intents import Intent, classify_intent_fallback, parse_llm_intent
+from src.agent.intents import (
+    Intent,
+    IntentClassifierStats,
+    classify_intent_fallback,
+    extract_intent_tag,
+    parse_llm_intent,
+    score_intent,
+)
 
 
 class TestClassifyIntentFallback:
@@ -70,3 +77,84 @@ class TestParseLlmIntent:
 
     def test_invalid_returns_out_of_scope(self):
         assert parse_llm_intent("completely_invalid_thing") == Intent.OUT_OF_SCOPE
+
+
+class TestScoreIntent:
+    def test_short_keyword_message_is_confident(self):
+        intent, confidence = score_intent("wifi?")
+        assert intent == Intent.AMENITIES_QUERY
+        assert confidence == 1.0
+
+    def test_greeting_is_confident(self):
+        intent, confidence = score_intent("Hola, buenas tardes!")
+        assert intent == Intent.GREETING
+        assert confidence >= 0.9
+
+    def test_greeting_with_question_uses_question(self):
+        intent, _ = score_intent("Hola, tienen wifi?")
+        assert intent == Intent.AMENITIES_QUERY
+
+    def test_accents_are_ignored(self):
+        intent, confidence = score_intent("¿A qué hora es el desayuno?")
+        assert intent == Intent.AMENITIES_QUERY
+        assert confidence >= 0.75
+
+    def test_ambiguous_message_has_low_confidence(self):
+        _, confidence = score_intent("Quiero reservar una mesa en un restaurante")
+        assert confidence < 0.75
+
+    @pytest.mark.parametrize(
+        "message",
+        ["tienen habitacion para esta noche?", "quiero cancelar", "necesito ayuda"],
+    )
+    def test_generic_keywords_are_not_confident(self, message):
+        _, confidence = score_intent(message)
+        assert confidence < 0.75
+
+    def test_distinctive_keyword_outweighs_generic(self):
+        intent, confidence = score_intent("necesito toallas")
+        assert intent == Intent.SERVICE_REQUEST
+        assert confidence >= 0.75
+
+    def test_no_keywords_is_zero_confidence(self):
+        assert score_intent("Cual es el sentido de la vida?") == (Intent.OUT_OF_SCOPE, 0.0)
+
+    def test_follow_up_carries_previous_intent(self):
+        history = [
+            {"role": "user", "content": "Tienen piscina?", "intent": None},
+            {"role": "assistant", "content": "Si!", "intent": "amenities_query"},
+        ]
+        intent, confidence = score_intent("y a que hora cierra?", history)
+        assert intent == Intent.AMENITIES_QUERY
+        assert 0 < confidence < 0.75
+
+
+class TestIntentClassifierStats:
+    def test_hit_rate_and_latency_saved(self):
+        stats = IntentClassifierStats()
+        stats.record_local()
+        stats.record_local()
+        stats.record_local()
+        stats.record_llm(800.0)
+
+        snapshot = stats.snapshot()
+        assert snapshot["hit_rate"] == 0.75
+        assert snapshot["avg_llm_latency_ms"] == 800
+        assert snapshot["latency_saved_ms"] == 2400
+
+
+class TestExtractIntentTag:
+    def test_tag_is_parsed_and_stripped(self):
+        intent, text = extract_intent_tag(
+            "<intent>amenities_query</intent> Si! Tenemos WiFi gratuito."
+        )
+        assert intent == Intent.AMENITIES_QUERY
+        assert text == "Si! Tenemos WiFi gratuito."
+
+    def test_missing_tag(self):
+        assert extract_intent_tag("Hola!") == (None, "Hola!")
+
+    def test_unknown_intent_is_stripped(self):
+        intent, text = extract_intent_tag("<intent>weather</intent>Llueve.")
+        assert intent is None
+        assert text == "Llueve."
@@ -0,0 +1,30 @@
+"""Tests for the shared Anthropic client pool."""
+
+import pytest
+
+from src.agent import llm_client
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused():
+    """Verify that every caller gets the same pooled client."""
+    first = llm_client.get_llm_client()
+    second = llm_client.get_llm_client()
+    assert first is second
+
+    await llm_client.close_llm_client()
+    assert llm_client._client is None
+
+
+@pytest.mark.asyncio
+async def test_client_pool_uses_configured_limits(monkeypatch):
+    """Verify that timeouts and retries come from settings."""
+    monkeypatch.setattr(llm_client.settings, "llm_timeout_seconds", 12.5)
+    monkeypatch.setattr(llm_client.settings, "llm_max_retries", 4)
+
+    client = llm_client.create_llm_client()
+    try:
+        assert client.max_retries == 4
+        assert client.timeout.read == 12.5
+    finally:
+        await client.close()
@@ -0,0 +1,79 @@
+"""Tests for LLM record/replay and the deterministic perf suite."""
+
+import uuid
+
+import anthropic
+import pytest
+
+from benchmarks import perf_suite
+from benchmarks.stub_llm_server import StubLLMServer
+from src.agent.recording import (
+    LLMRecorder,
+    MissingRecording,
+    ReplayClient,
+    request_fingerprint,
+)
+
+
+def _request(conversation_id: uuid.UUID, checkin: str) -> dict:
+    return {
+        "model": "claude-test",
+        "max_tokens": 100,
+        "messages": [
+            {
+                "role": "user",
+                "content": f"Conversacion {conversation_id}, check-in {checkin}",
+            }
+        ],
+    }
+
+
+def test_fingerprint_ignores_ids_and_dates():
+    """Verify fixtures survive fresh ids and seeded dates moving with today."""
+    first = request_fingerprint(_request(uuid.uuid4(), "2026-03-15"))
+    second = request_fingerprint(_request(uuid.uuid4(), "2026-10-16"))
+    other = _request(uuid.uuid4(), "2026-03-15")
+    other["max_tokens"] = 200
+
+    assert first == second
+    assert request_fingerprint(other) != first
+
+
+@pytest.mark.asyncio
+async def test_recorder_round_trip(tmp_path):
+    """Verify recorded create and stream calls replay offline, in order."""
+    request = _request(uuid.uuid4(), "2026-03-15")
+    async with StubLLMServer() as server:
+        client = anthropic.AsyncAnthropic(
+            api_key="test", base_url=server.base_url, max_retries=0
+        )
+        recorder = LLMRecorder(client)
+        created = await recorder.messages.create(**request)
+        async with recorder.messages.stream(**request) as stream:
+            streamed = await stream.get_final_message()
+        await client.close()
+    recorder.save(tmp_path / "recordings.json")
+
+    replay = ReplayClient.from_file(tmp_path / "recordings.json")
+    assert (await replay.messages.create(**request)).id == created.id
+    async with replay.messages.stream(**request) as stream:
+        text = "".join([delta async for delta in stream.text_stream])
+        final = await stream.get_final_message()
+    assert final.id == streamed.id
+    assert text == streamed.content[0].text
+    assert len(replay.requests) == 2
+
+    with pytest.raises(MissingRecording):
+        await replay.messages.create(**{**request, "max_tokens": 5})
+
+
+@pytest.mark.asyncio
+async def test_perf_suite_within_baseline(session_factory):
+    """Verify LLM calls, prompt size and DB queries per scenario don't regress."""
+    client = ReplayClient.from_file(perf_suite.RECORDINGS_PATH)
+
+    results = await perf_suite.run_suite(client, session_factory)
+
+    assert perf_suite.compare(results, perf_suite.load_baseline()) == []
+    assert results["booking_checkin"]["llm_calls"] == 2
+    assert results["greeting"]["llm_calls"] == 0
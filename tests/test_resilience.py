@@ -0,0 +1,280 @@
+"""Tests for the LLM resilience layer (breaker, retries, hedging, deadlines)."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import anthropic
+import httpx
+import pytest
+
+from src.agent.admission import AdmissionController
+from src.agent.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ResilientLLM,
+    llm_stats,
+)
+from src.config import settings
+
+
+def _status_error(status: int) -> anthropic.APIStatusError:
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, request=request)
+    return anthropic.APIStatusError("upstream error", response=response, body=None)
+
+
+def _client(*effects) -> MagicMock:
+    client = MagicMock()
+    client.messages.create = AsyncMock(side_effect=list(effects))
+    return client
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_rejects(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=60)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.snapshot()["rejected_calls"] == 1
+
+    def test_half_open_probe_closes_on_success(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()  # the probe
+        assert not breaker.allow()  # only one probe at a time
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retries_overloaded_then_succeeds(monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_seconds", 0.01)
+    breaker = CircuitBreaker(failure_threshold=5, recovery_seconds=60)
+    llm = ResilientLLM(_client(_status_error(529), "ok"), breaker)
+
+    assert await llm.create(model="m", messages=[]) == "ok"
+    assert llm_stats.retries == 1
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_connection_errors_and_5xx(monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_seconds", 0.01)
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    reset = anthropic.APIConnectionError(request=request)
+    llm = ResilientLLM(_client(reset, _status_error(502), "ok"), CircuitBreaker(5, 60))
+
+    assert await llm.create(model="m", messages=[]) == "ok"
+    assert llm_stats.retries == 2
+
+
+def _stream_client(*effects) -> MagicMock:
+    """A client whose ``messages.stream`` fails to open with each error first."""
+    effects = list(effects)
+
+    @asynccontextmanager
+    async def stream(**request):
+        effect = effects.pop(0)
+        if isinstance(effect, Exception):
+            raise effect
+        yield effect
+
+    client = MagicMock()
+    client.messages.stream = stream
+    return client
+
+
+@pytest.mark.asyncio
+async def test_stream_retries_until_it_opens(monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_seconds", 0.01)
+    breaker = CircuitBreaker(failure_threshold=5, recovery_seconds=60)
+    llm = ResilientLLM(_stream_client(_status_error(529), "stream"), breaker)
+
+    async with llm.stream(model="m", messages=[]) as stream:
+        assert stream == "stream"
+    assert llm_stats.retries == 1
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_open_stream_is_not_retried(monkeypatch):
+    """Verify an error after the stream opened (text may be shown) is final."""
+    monkeypatch.setattr(settings, "llm_retry_base_seconds", 0.01)
+    llm = ResilientLLM(_stream_client("stream", "again"), CircuitBreaker(5, 60))
+
+    with pytest.raises(anthropic.APIStatusError):
+        async with llm.stream(model="m", messages=[]):
+            raise _status_error(529)
+    assert llm_stats.retries == 0
+
+
+@pytest.mark.asyncio
+async def test_bad_request_is_not_retried_nor_a_breaker_failure():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=60)
+    llm = ResilientLLM(_client(_status_error(400)), breaker)
+
+    with pytest.raises(anthropic.APIStatusError):
+        await llm.create(model="m", messages=[])
+    assert llm_stats.retries == 0
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_the_call():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=60)
+    breaker.record_failure()
+    client = _client("ok")
+    llm = ResilientLLM(client, breaker)
+
+    with pytest.raises(CircuitOpenError):
+        await llm.create(model="m", messages=[])
+    client.messages.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_exhausted_deadline_raises():
+    llm = ResilientLLM(_client("ok"), CircuitBreaker(5, 60))
+    with pytest.raises(DeadlineExceeded):
+        await llm.create(deadline=time.perf_counter() - 1, model="m", messages=[])
+
+
+@pytest.mark.asyncio
+async def test_probe_out_of_budget_releases_the_breaker():
+    """Verify a half-open probe that never reaches upstream frees the slot."""
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    llm = ResilientLLM(_client("ok"), breaker)
+
+    with pytest.raises(DeadlineExceeded):
+        await llm.create(deadline=time.perf_counter() - 1, model="m", messages=[])
+
+    deadline = time.perf_counter() + 10
+    assert await llm.create(deadline=deadline, model="m", messages=[]) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_the_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_after_seconds", 0)
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=0)
+    breaker.record_failure()
+    client = MagicMock()
+    client.messages.create = _slow_create
+    llm = ResilientLLM(client, breaker)
+
+    probe = asyncio.create_task(llm.create(model="m", messages=[]))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.allow()  # a new probe may go through
+
+
+async def _slow_create(**request):
+    await asyncio.sleep(1)
+    return "slow"
+
+
+@pytest.mark.asyncio
+async def test_budget_bound_timeout_is_not_a_breaker_failure(monkeypatch):
+    """Verify a slow turn running out of budget doesn't open the breaker."""
+    monkeypatch.setattr(settings, "llm_hedge_after_seconds", 0)
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=60)
+    client = MagicMock()
+    client.messages.create = _slow_create
+    llm = ResilientLLM(client, breaker)
+
+    with pytest.raises(DeadlineExceeded):
+        await llm.create(deadline=time.perf_counter() + 0.05, model="m", messages=[])
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert llm_stats.timeouts == 0
+
+
+@pytest.mark.asyncio
+async def test_budget_bound_stream_timeout_is_not_a_breaker_failure():
+    """Verify the same holds for a stream cut short by the turn budget."""
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=60)
+
+    @asynccontextmanager
+    async def stream(**request):
+        await asyncio.sleep(1)
+        yield MagicMock()
+
+    client = MagicMock()
+    client.messages.stream = stream
+    llm = ResilientLLM(client, breaker)
+
+    with pytest.raises(DeadlineExceeded):
+        async with llm.stream(
+            deadline=time.perf_counter() + 0.05, model="m", messages=[]
+        ):
+            pass
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_call_timeout_is_a_breaker_failure(monkeypatch):
+    """Verify the per-call timeout still counts as an upstream failure."""
+    monkeypatch.setattr(settings, "llm_hedge_after_seconds", 0)
+    monkeypatch.setattr(settings, "llm_timeout_seconds", 0.05)
+    breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=60)
+    client = MagicMock()
+    client.messages.create = _slow_create
+    llm = ResilientLLM(client, breaker)
+
+    with pytest.raises(asyncio.TimeoutError) as raised:
+        await llm.create(deadline=time.perf_counter() + 5, model="m", messages=[])
+
+    assert not isinstance(raised.value, DeadlineExceeded)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert llm_stats.timeouts == 1
+
+
+def _slow_first_client() -> MagicMock:
+    """The first call takes a second, later ones answer at once."""
+    calls = 0
+
+    async def create(**request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    client = MagicMock()
+    client.messages.create = create
+    return client
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_after_seconds", 0.05)
+    llm = ResilientLLM(_slow_first_client(), CircuitBreaker(5, 60))
+
+    start = time.perf_counter()
+    assert await llm.create(model="m", messages=[]) == "fast"
+    assert time.perf_counter() - start < 0.5
+    assert llm_stats.hedges == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_needs_its_own_admission_slot(monkeypatch):
+    """Verify the hedge is skipped when the concurrency limit is reached."""
+    monkeypatch.setattr(settings, "llm_hedge_after_seconds", 0.05)
+    admission = AdmissionController(max_concurrency=1)
+    llm = ResilientLLM(_slow_first_client(), CircuitBreaker(5, 60), admission)
+
+    assert await llm.create(model="m", messages=[]) == "slow"
+    assert llm_stats.hedges == 0
+    assert llm_stats.hedges_skipped == 1
+    assert admission.snapshot()["in_flight"] == 0
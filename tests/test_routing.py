@@ -0,0 +1,42 @@
+"""Tests for model tier routing and cost estimates."""
+
+from src.agent.pricing import MODEL_PRICES, estimate_cost_usd
+from src.agent.routing import FAST, LARGE, model_for_tier, select_tier
+from src.agent.usage import TokenUsage
+from src.config import Settings, settings
+
+
+class TestSelectTier:
+    def test_simple_intent_uses_fast_tier(self):
+        assert select_tier("amenities_query") == FAST
+        assert model_for_tier(FAST) == settings.llm_fast_model
+
+    def test_booking_uses_large_tier(self):
+        assert select_tier("new_booking") == LARGE
+        assert model_for_tier(LARGE) == settings.llm_model
+
+    def test_fast_tier_defaults_to_a_supported_model(self):
+        assert Settings.model_fields["llm_fast_model"].default in MODEL_PRICES
+
+    def test_long_history_uses_large_tier(self):
+        assert select_tier("faq_general", settings.model_route_large_history + 1) == LARGE
+
+    def test_unknown_route_uses_large_tier(self):
+        assert select_tier("something_new") == LARGE
+
+    def test_routing_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "model_routing_enabled", False)
+        assert select_tier("amenities_query") == LARGE
+
+
+class TestEstimateCost:
+    def test_cost_uses_model_prices(self):
+        usage = TokenUsage(input_tokens=1_000_000, output_tokens=100_000)
+        assert estimate_cost_usd("claude-haiku-4-5", usage) == 1.5
+        assert estimate_cost_usd("claude-sonnet-4-20250514", usage) == 4.5
+
+    def test_cache_reads_are_cheaper(self):
+        cached = TokenUsage(cache_read_tokens=1_000_000)
+        uncached = TokenUsage(input_tokens=1_000_000)
+        model = "claude-sonnet-4-20250514"
+        assert estimate_cost_usd(model, cached) < estimate_cost_usd(model, uncached)